@@ -0,0 +1,112 @@
+"""
+Tool-result encoding for the LLM context: ``json.dumps(result)`` vs ``format_tool_result``.
+
+Builds the result each tool returns for files of 1 KB – 1 MB (same shapes
+as ``tool_executor`` / ``E2BSandboxManager.read_file``) and compares the
+bytes and estimated tokens stored in the context per call.
+
+Usage (from backend/):
+    python -m benchmarks.bench_result_format --sizes 1k,16k,128k,1m
+"""
+
+import argparse
+import json
+import random
+
+from src.agent.result_format import format_tool_result
+from src.services.token_estimator import estimate_text_tokens
+
+PATH = "/home/user/app/src/App.tsx"
+
+
+def build_file(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ["const ", "value", " = ", "useState", "(", ");", "  return ", "<div>", "</div>", '"', "props", ".", "é"]
+    lines, total = [], 0
+    while total < size:
+        line = "".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def build_results(content: str) -> dict:
+    lines = content.split("\n")
+    numbered = "\n".join(f"{i + 1:6d}\t{line}" for i, line in enumerate(lines))
+    old = "\n".join(lines[len(lines) // 2 : len(lines) // 2 + 20])
+    new = old.replace("value", "nextValue")
+    return {
+        "file_read": {
+            "success": True,
+            "content": numbered,
+            "raw_content": content,
+            "file_path": PATH,
+            "file_name": "App.tsx",
+            "total_lines": len(lines),
+            "lines_read": len(lines),
+        },
+        "file_write": {"success": True, "message": f"File written: {PATH}", "file_path": PATH},
+        "replace_in_file": {
+            "success": True,
+            "message": f"Replaced 1 occurrence(s) in {PATH}",
+            "file_path": PATH,
+            "old_string": old,
+            "new_string": new,
+            "occurrences": 1,
+        },
+        "insert_line": {
+            "success": True,
+            "message": f"Inserted 20 line(s) after line 10 in {PATH}",
+            "file_path": PATH,
+            "insert_line": 10,
+            "new_str": new,
+            "lines_inserted": 20,
+        },
+        "delete_lines": {
+            "success": True,
+            "message": f"Deleted lines 10-29 from {PATH}",
+            "file_path": PATH,
+            "deleted_lines": old,
+            "start_line": 10,
+            "end_line": 29,
+            "lines_deleted": 20,
+        },
+        "delete_str": {"success": True, "message": f"Deleted text from {PATH}", "file_path": PATH, "target_str": old},
+    }
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    units = {"k": 1024, "m": 1024 * 1024}
+    return int(float(value[:-1]) * units[value[-1]]) if value[-1] in units else int(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1k,16k,128k,1m")
+    args = parser.parse_args()
+
+    print(f"{'tool':<16} {'size':>6} {'json bytes':>11} {'compact':>9} {'json tok':>9} {'compact tok':>12} {'saved':>7}")
+    totals = {}
+    for label in args.sizes.split(","):
+        results = build_results(build_file(parse_size(label)))
+        for tool, result in results.items():
+            before = json.dumps(result)
+            after = format_tool_result(tool, result)
+            before_bytes, after_bytes = len(before.encode()), len(after.encode())
+            before_tok, after_tok = estimate_text_tokens(before), estimate_text_tokens(after)
+            saved = 1 - after_tok / before_tok
+            totals.setdefault(tool, [0, 0])
+            totals[tool][0] += before_tok
+            totals[tool][1] += after_tok
+            print(
+                f"{tool:<16} {label:>6} {before_bytes:11d} {after_bytes:9d} "
+                f"{before_tok:9d} {after_tok:12d} {saved:6.0%}"
+            )
+    print()
+    for tool, (before_tok, after_tok) in totals.items():
+        print(f"{tool:<16} total tokens {before_tok:>9d} -> {after_tok:>9d}  ({1 - after_tok / before_tok:.0%} saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+SSE decoding microbenchmark: aiter_lines()+json.loads vs SSEDecoder.
+
+Replays streams shaped like real OpenRouter, Groq and Fireworks responses
+for a long ``file_write`` tool call (one SSE event per token, comment
+keep-alives, usage chunk at the end) and splits them into network-sized
+byte chunks. Reports decoded chunks/sec and CPU microseconds per token for
+the old line-based path and the byte-level decoder.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sse --tokens 20000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from httpx._decoders import LineDecoder, TextDecoder
+
+from src.services.sse import DONE_SENTINEL, JSON_BACKEND, JSON_DECODE_ERRORS, SSEDecoder, json_loads
+
+
+def _tool_delta(provider: str, i: int, token: str) -> dict:
+    chunk = {
+        "id": "gen-bench",
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": "bench-model",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"tool_calls": [{"index": 0, "function": {"arguments": token}}]},
+                "finish_reason": None,
+            }
+        ],
+    }
+    if provider == "openrouter":
+        chunk["provider"] = "Anthropic"
+    elif provider == "groq":
+        chunk["system_fingerprint"] = "fp_bench"
+        chunk["x_groq"] = {"id": "req_bench"}
+    if i == 0:
+        chunk["choices"][0]["delta"]["tool_calls"][0].update(
+            {"id": "call_0", "type": "function", "function": {"name": "file_write", "arguments": token}}
+        )
+    return chunk
+
+
+def build_stream(provider: str, tokens: int) -> bytes:
+    rng = random.Random(provider)
+    words = ["const ", "value", " = ", "useState", "(", ");\\n", "  return ", "<div>", "</div>", "\\\"", "props", "."]
+    parts = []
+    for i in range(tokens):
+        if provider == "openrouter" and i % 500 == 0:
+            parts.append(b": OPENROUTER PROCESSING\n\n")
+        parts.append(b"data: " + json.dumps(_tool_delta(provider, i, rng.choice(words))).encode() + b"\n\n")
+    usage = {"choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}],
+             "usage": {"prompt_tokens": 5000, "completion_tokens": tokens, "total_tokens": 5000 + tokens}}
+    parts.append(b"data: " + json.dumps(usage).encode() + b"\n\n")
+    parts.append(b"data: [DONE]\n\n")
+    return b"".join(parts)
+
+
+def split_network_chunks(stream: bytes, seed: int = 0) -> list[bytes]:
+    rng = random.Random(seed)
+    chunks, pos = [], 0
+    while pos < len(stream):
+        size = rng.randint(64, 4096)
+        chunks.append(stream[pos : pos + size])
+        pos += size
+    return chunks
+
+
+def decode_lines(chunks: list[bytes]) -> int:
+    """The previous path: text decode + line split + startswith + json.loads."""
+    text_decoder, line_decoder = TextDecoder("utf-8"), LineDecoder()
+    count = 0
+    for raw in chunks:
+        for line in line_decoder.decode(text_decoder.decode(raw)):
+            if line.startswith("data: "):
+                data = line[6:]
+                if data == "[DONE]":
+                    return count
+                try:
+                    json.loads(data)
+                    count += 1
+                except json.JSONDecodeError:
+                    continue
+    return count
+
+
+def decode_bytes(chunks: list[bytes]) -> int:
+    decoder = SSEDecoder()
+    count = 0
+    for raw in chunks:
+        for data in decoder.feed(raw):
+            if data == DONE_SENTINEL:
+                return count
+            try:
+                json_loads(data)
+                count += 1
+            except JSON_DECODE_ERRORS:
+                continue
+    return count
+
+
+def measure(fn, chunks: list[bytes], repeat: int) -> tuple[float, float, int]:
+    best_wall, best_cpu, count = float("inf"), float("inf"), 0
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        count = fn(chunks)
+        best_wall = min(best_wall, time.perf_counter() - wall)
+        best_cpu = min(best_cpu, time.process_time() - cpu)
+    return best_wall, best_cpu, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'provider':<11} {'decoder':<8} {'chunks/s':>12} {'cpu us/token':>13}")
+    for provider in ("openrouter", "groq", "fireworks"):
+        chunks = split_network_chunks(build_stream(provider, args.tokens))
+        for label, fn in (("lines", decode_lines), ("bytes", decode_bytes)):
+            wall, cpu, count = measure(fn, chunks, args.repeat)
+            print(f"{provider:<11} {label:<8} {count / wall:12.0f} {cpu / args.tokens * 1e6:13.2f}")
+
+
+if __name__ == "__main__":
+    main()
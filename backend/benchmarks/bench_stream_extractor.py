@@ -0,0 +1,187 @@
+"""
+Streaming tool-argument extraction: legacy regex rescans vs IncrementalJSONParser.
+
+Builds ``file_write`` arguments of 1 KB – 1 MB, splits them into
+token-sized deltas and replays them through:
+
+- ``legacy``: the previous ``arguments_so_far`` concatenation plus
+  ``ContentStreamExtractor.process_delta`` (two regex scans over the whole
+  accumulated string per delta, O(n²))
+- ``incremental``: ``StreamingToolParser`` + ``ContentStreamExtractor`` on
+  top of ``IncrementalJSONParser`` (O(n))
+
+Legacy runs are skipped above ``--legacy-max`` bytes because they take
+minutes at 1 MB.
+
+Usage (from backend/):
+    python -m benchmarks.bench_stream_extractor --sizes 1k,16k,128k,1m
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+from src.agent.react_agent import ContentStreamExtractor, StreamingToolParser
+
+
+class LegacyStreamingToolParser:
+    """Tool-call accumulation as it was before: ``arguments_so_far`` by concatenation."""
+
+    def __init__(self):
+        self.tool_calls: dict[int, dict] = {}
+
+    def process_chunk(self, chunk: dict) -> dict:
+        result = {"content_delta": "", "tool_updates": {}, "finish_reason": None}
+        choice = chunk["choices"][0]
+        for tc in choice.get("delta", {}).get("tool_calls", []):
+            index = tc.get("index", 0)
+            if index not in self.tool_calls:
+                self.tool_calls[index] = {"id": tc.get("id") or f"call_{index}", "name": "", "arguments": ""}
+            fn = tc.get("function", {})
+            if "name" in fn:
+                self.tool_calls[index]["name"] = fn["name"]
+            if "arguments" in fn:
+                self.tool_calls[index]["arguments"] += fn["arguments"]
+                result["tool_updates"][index] = {
+                    "id": self.tool_calls[index]["id"],
+                    "name": self.tool_calls[index]["name"],
+                    "arguments_delta": fn["arguments"],
+                    "arguments_so_far": self.tool_calls[index]["arguments"],
+                }
+        return result
+
+
+class LegacyContentStreamExtractor:
+    """The extractor this benchmark replaces, kept verbatim for comparison."""
+
+    def __init__(self):
+        self.content_extracted = ""
+        self.escape_next = False
+        self.file_path = ""
+        self.file_path_extracted = False
+
+    def _extract_file_path(self, json_str: str) -> str:
+        match = re.search(r'"file_path"\s*:\s*"([^"]*)"', json_str)
+        return match.group(1) if match else ""
+
+    def process_delta(self, arguments_so_far: str) -> tuple[str, str]:
+        if not self.file_path_extracted:
+            self.file_path = self._extract_file_path(arguments_so_far)
+            if self.file_path:
+                self.file_path_extracted = True
+
+        content_match = re.search(r'"content"\s*:\s*"', arguments_so_far)
+        if not content_match:
+            return "", self.file_path
+
+        start_idx = content_match.end()
+        new_content = ""
+        i = start_idx + len(self.content_extracted)
+
+        while i < len(arguments_so_far):
+            char = arguments_so_far[i]
+            if self.escape_next:
+                esc_map = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "/": "/"}
+                new_content += esc_map.get(char, char)
+                self.escape_next = False
+            elif char == "\\":
+                self.escape_next = True
+            elif char == '"':
+                break
+            else:
+                new_content += char
+            i += 1
+
+        self.content_extracted += new_content
+        return new_content, self.file_path
+
+
+def build_deltas(size: int, seed: int = 0, content_first: bool = False) -> list[str]:
+    rng = random.Random(seed)
+    words = ["const ", "value", " = ", "useState", "(", ");\n", "  return ", "<div>", "</div>", '"', "props", ".", "é", "😀"]
+    parts, total = [], 0
+    while total < size:
+        word = rng.choice(words)
+        parts.append(word)
+        total += len(word)
+    fields = {"file_path": "/home/user/app/src/App.tsx", "content": "".join(parts)}
+    if content_first:
+        fields = {"content": fields["content"], "file_path": fields["file_path"]}
+    arguments = json.dumps(fields)
+    deltas, pos = [], 0
+    while pos < len(arguments):
+        step = rng.randint(2, 24)
+        deltas.append(arguments[pos : pos + step])
+        pos += step
+    return deltas
+
+
+def _chunk(delta: str) -> dict:
+    return {"choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"arguments": delta}}]}}]}
+
+
+_HEADER = {"choices": [{"delta": {"tool_calls": [{"index": 0, "id": "call_0", "function": {"name": "file_write"}}]}}]}
+
+
+def run_legacy(deltas: list[str]) -> int:
+    parser, extractor, emitted = LegacyStreamingToolParser(), LegacyContentStreamExtractor(), 0
+    parser.process_chunk(_HEADER)
+    for delta in deltas:
+        update = parser.process_chunk(_chunk(delta))["tool_updates"][0]
+        content, _ = extractor.process_delta(update["arguments_so_far"])
+        emitted += len(content)
+    return emitted
+
+
+def run_incremental(deltas: list[str]) -> int:
+    parser, extractor, emitted = StreamingToolParser(), ContentStreamExtractor(), 0
+    parser.process_chunk(_HEADER)
+    for delta in deltas:
+        content, _ = extractor.process_update(parser.process_chunk(_chunk(delta))["tool_updates"][0])
+        emitted += len(content)
+    return emitted
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    units = {"k": 1024, "m": 1024 * 1024}
+    return int(float(value[:-1]) * units[value[-1]]) if value[-1] in units else int(value)
+
+
+def measure(fn, deltas: list[str], repeat: int) -> tuple[float, int]:
+    best, emitted = float("inf"), 0
+    for _ in range(repeat):
+        started = time.process_time()
+        emitted = fn(deltas)
+        best = min(best, time.process_time() - started)
+    return best, emitted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1k,16k,128k,1m")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max", default="256k")
+    args = parser.parse_args()
+    legacy_max = parse_size(args.legacy_max)
+
+    print(f"{'order':<14} {'size':>6} {'deltas':>8} {'legacy ms':>11} {'incremental ms':>15} {'us/delta':>9} {'speedup':>8}")
+    for order in ("path_first", "content_first"):
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            deltas = build_deltas(size, content_first=order == "content_first")
+            new_cpu, new_emitted = measure(run_incremental, deltas, args.repeat)
+            assert new_emitted > 0
+            if size <= legacy_max:
+                old_cpu, _ = measure(run_legacy, deltas, 1 if size > 64 * 1024 else args.repeat)
+                old_ms, speedup = f"{old_cpu * 1000:11.1f}", f"{old_cpu / new_cpu:7.1f}x"
+            else:
+                old_ms, speedup = f"{'skipped':>11}", f"{'-':>8}"
+            per_delta = new_cpu / len(deltas) * 1e6
+            print(f"{order:<14} {label:>6} {len(deltas):8d} {old_ms} {new_cpu * 1000:15.1f} {per_delta:9.2f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Time-to-first-token benchmark: fresh client per request vs pooled client.
+
+Sends the same short streaming chat completion several times and measures
+the time until the first SSE ``data:`` line arrives. The "before" run opens
+a new ``httpx.AsyncClient`` per request (the old behaviour); the "after" run
+reuses the process-wide provider pool.
+
+Usage (from backend/):
+    PROVIDER_API_KEY=... python -m benchmarks.bench_ttft --provider openrouter \\
+        --model openai/gpt-4o-mini --runs 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from src.services.http_pool import ProviderClientPool
+from src.services.providers import get_provider, list_providers
+
+
+async def _ttft(client: httpx.AsyncClient, base_url: str, api_key: str, model: str) -> float:
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": "Say hi."}],
+        "stream": True,
+        "max_tokens": 8,
+    }
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    started = time.perf_counter()
+    async with client.stream("POST", f"{base_url}/chat/completions", json=payload, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+async def run_fresh(base_url: str, api_key: str, model: str, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            samples.append(await _ttft(client, base_url, api_key, model))
+    return samples
+
+
+async def run_pooled(base_url: str, api_key: str, model: str, runs: int) -> list[float]:
+    pool = ProviderClientPool()
+    await pool.warmup([base_url])
+    samples = []
+    try:
+        for _ in range(runs):
+            samples.append(await _ttft(pool.get_client(base_url), base_url, api_key, model))
+    finally:
+        await pool.close()
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{label:<8} n={len(ms):<3} mean={statistics.mean(ms):8.1f} ms  "
+          f"median={statistics.median(ms):8.1f} ms  p95={p95:8.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", choices=sorted(p.name for p in list_providers()), default="openrouter")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    api_key = os.environ["PROVIDER_API_KEY"]
+    base_url = get_provider(args.provider).base_url
+
+    _report("before", await run_fresh(base_url, api_key, args.model, args.runs))
+    _report("after", await run_pooled(base_url, api_key, args.model, args.runs))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
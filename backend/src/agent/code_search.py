@@ -0,0 +1,225 @@
+"""
+Code search for the ``search_files`` / ``glob_files`` tools.
+
+Each call is one shell command in the sandbox (run through
+``E2BSandboxManager.execute_command``): ripgrep when it is installed,
+``grep -r`` / ``find`` otherwise. Both skip ``SEARCH_IGNORE_DIRS`` and
+binary files; output is capped in the sandbox (``head``/``cut``) so a
+broad pattern cannot flood the response.
+
+Matches come back grouped per file, paths relative to the search root:
+
+    src/App.tsx
+      12: const [count, setCount] = useState(0)
+      13- return (
+
+(``:`` marks a matching line, ``-`` a context line, as in grep.)
+
+Configuration (environment variables):
+- SEARCH_IGNORE_DIRS    Directory names never searched (comma-separated)
+- SEARCH_MAX_RESULTS    Default match limit of search_files (default: 100)
+- GLOB_MAX_RESULTS      Default file limit of glob_files (default: 200)
+- SEARCH_LINE_CHARS     Longest output line kept (default: 300)
+- SEARCH_TIMEOUT        Command timeout in seconds (default: 30)
+"""
+
+import os
+import re
+import shlex
+from typing import List, Optional
+
+SEARCH_IGNORE_DIRS = [
+    name.strip()
+    for name in os.getenv(
+        "SEARCH_IGNORE_DIRS", "node_modules,.git,dist,build,.next,__pycache__,.venv,venv,coverage"
+    ).split(",")
+    if name.strip()
+]
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "100"))
+GLOB_MAX_RESULTS = int(os.getenv("GLOB_MAX_RESULTS", "200"))
+SEARCH_LINE_CHARS = int(os.getenv("SEARCH_LINE_CHARS", "300"))
+SEARCH_TIMEOUT = int(os.getenv("SEARCH_TIMEOUT", "30"))
+
+# File list lines read back for glob_files when the pattern is filtered here (find fallback)
+_GLOB_SCAN_LINES = 20000
+_ENGINE_PREFIX = "engine:"
+_RESULT_LINE = re.compile(r"(\d+)([:-])(.*)", re.S)
+
+
+def _engine_switch(rg: str, fallback: str, fallback_name: str, root: str, cap: int) -> str:
+    """``rg`` if installed, else ``fallback``; first output line names the engine."""
+    return (
+        f"cd {shlex.quote(root)} && "
+        f"{{ if command -v rg >/dev/null 2>&1; "
+        f"then echo {_ENGINE_PREFIX}rg; {rg}; "
+        f"else echo {_ENGINE_PREFIX}{fallback_name}; {fallback}; fi; }} 2>&1 "
+        f"| head -n {cap} | cut -c1-{SEARCH_LINE_CHARS}"
+    )
+
+
+def build_search_command(
+    pattern: str,
+    root: str,
+    glob: Optional[str] = None,
+    ignore_case: bool = False,
+    fixed_strings: bool = False,
+    context_lines: int = 0,
+    max_results: int = SEARCH_MAX_RESULTS,
+) -> str:
+    rg = ["rg", "--null", "--line-number", "--no-heading", "--color", "never", "--hidden", "-m", str(max_results)]
+    grep = ["grep", "-rnIZ", "-m", str(max_results)]
+    for name in SEARCH_IGNORE_DIRS:
+        rg += ["-g", f"!{name}"]
+        grep.append(f"--exclude-dir={name}")
+    if ignore_case:
+        rg.append("-i")
+        grep.append("-i")
+    if fixed_strings:
+        rg.append("-F")
+    grep.append("-F" if fixed_strings else "-E")
+    if context_lines:
+        rg += ["-C", str(context_lines)]
+        grep += ["-C", str(context_lines)]
+    if glob:
+        rg += ["-g", glob]
+        grep.append(f"--include={glob}")
+    rg += ["-e", pattern, "."]
+    grep += ["-e", pattern, "."]
+
+    # Every match can bring 2 * context lines and a "--" separator
+    cap = max_results * (2 * context_lines + 2) + 50
+    return _engine_switch(shlex.join(rg), shlex.join(grep), "grep", root, cap)
+
+
+def build_glob_command(pattern: str, root: str, max_results: int = GLOB_MAX_RESULTS) -> str:
+    rg = ["rg", "--files", "--hidden"]
+    for name in SEARCH_IGNORE_DIRS:
+        rg += ["-g", f"!{name}"]
+    rg += ["-g", pattern, "."]
+    pruned = " -o ".join(f"-name {shlex.quote(name)}" for name in SEARCH_IGNORE_DIRS)
+    find = f"find . \\( {pruned} \\) -prune -o -type f -print"
+    # rg filters by the glob itself; find lists everything and is filtered in parse_glob_output
+    return _engine_switch(shlex.join(rg), find, "find", root, max(max_results + 1, _GLOB_SCAN_LINES))
+
+
+def _split_engine(output: str):
+    lines = output.split("\n")
+    engine = ""
+    if lines and lines[0].startswith(_ENGINE_PREFIX):
+        engine = lines.pop(0)[len(_ENGINE_PREFIX):].strip()
+    return engine, lines
+
+
+def _relative(path: str) -> str:
+    return path[2:] if path.startswith("./") else path
+
+
+def parse_search_output(output: str, max_results: int = SEARCH_MAX_RESULTS) -> dict:
+    """Group ``path\\0line:text`` / ``path\\0line-text`` lines per file."""
+    engine, lines = _split_engine(output)
+    blocks: List[str] = []
+    files: List[str] = []
+    errors: List[str] = []
+    matches = 0
+    truncated = False
+    current = None
+    for line in lines:
+        if "\0" not in line:
+            if line.strip() and line != "--":
+                errors.append(line)
+            continue
+        path, rest = line.split("\0", 1)
+        found = _RESULT_LINE.match(rest)
+        if not found:
+            continue
+        number, kind, text = found.groups()
+        if kind == ":":
+            if matches >= max_results:
+                truncated = True
+                break
+            matches += 1
+        path = _relative(path)
+        if path != current:
+            current = path
+            files.append(path)
+            blocks.append(path)
+        blocks.append(f"  {number}{kind} {text}")
+
+    # A file that reached the per-file limit may have more matches
+    if matches >= max_results:
+        truncated = True
+    return {
+        "engine": engine,
+        "matches": matches,
+        "files": len(files),
+        "truncated": truncated,
+        "results": "\n".join(blocks),
+        "errors": errors,
+    }
+
+
+def glob_regex(pattern: str) -> "re.Pattern":
+    """
+    Compile a glob: ``**`` spans directories, ``*`` / ``?`` / ``[...]`` stay
+    within one path segment. A pattern without ``/`` matches file names.
+    """
+    out, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end < 0:
+                out.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+                i = end
+        elif char == "{":
+            end = pattern.find("}", i + 1)
+            if end < 0:
+                out.append(re.escape(char))
+            else:
+                options = pattern[i + 1:end].split(",")
+                out.append("(?:" + "|".join(glob_regex(option).pattern[:-2] for option in options) + ")")
+                i = end
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+def parse_glob_output(output: str, pattern: str, max_results: int = GLOB_MAX_RESULTS) -> dict:
+    engine, lines = _split_engine(output)
+    regex = glob_regex(pattern)
+    by_name = "/" not in pattern
+    files, errors = [], []
+    for line in lines:
+        if not line.strip():
+            continue
+        path = _relative(line)
+        if line.startswith("./") or engine == "rg":
+            target = path.rsplit("/", 1)[-1] if by_name else path
+            if regex.match(target):
+                files.append(path)
+        else:
+            errors.append(line)
+    files.sort()
+    return {
+        "engine": engine,
+        "count": len(files),
+        "truncated": len(files) > max_results,
+        "files": files[:max_results],
+        "errors": errors,
+    }
@@ -0,0 +1,348 @@
+"""
+Context compaction — keep the prompt under the model's context window.
+
+Before each LLM call the request is estimated with the local token
+estimator. When it crosses ``CONTEXT_COMPACTION_THRESHOLD`` of the model's
+``context_length`` (from the cached ``fetch_models`` catalogue, or
+``CONTEXT_DEFAULT_LENGTH`` when the provider does not report one), the
+older part of the history is replaced by a summary:
+
+- the last ``CONTEXT_KEEP_TURNS`` assistant turns (each with its tool
+  results) are kept verbatim, fewer if they alone do not fit
+- tool calls without all of their results and the latest user message are
+  pinned verbatim, even when older
+- everything else is summarized by ``CONTEXT_SUMMARY_MODEL`` when one is
+  configured, otherwise (or if that call fails) by an extractive,
+  rule-based summarizer
+
+The full history stays in ``ContextWindow.conversation_history`` (stats and
+``/api/memory`` still see everything); only the messages sent to the model
+change. Each compaction records its before/after token counts.
+"""
+
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .models import ContextWindow
+from ..services.model_cache import model_cache
+from ..services.providers import get_provider, has_provider
+from ..services.resilience import resilient_client
+from ..services.token_estimator import CHARS_PER_TOKEN, estimate_messages_tokens
+
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "true").strip().lower() in ("1", "true", "yes", "on")
+CONTEXT_COMPACTION_THRESHOLD = float(os.getenv("CONTEXT_COMPACTION_THRESHOLD", "0.75"))
+CONTEXT_COMPACTION_TARGET = float(os.getenv("CONTEXT_COMPACTION_TARGET", "0.5"))
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "4"))
+CONTEXT_DEFAULT_LENGTH = int(os.getenv("CONTEXT_DEFAULT_LENGTH", "32768"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "1500"))
+CONTEXT_SUMMARY_PROVIDER = os.getenv("CONTEXT_SUMMARY_PROVIDER", "").strip()
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "").strip()
+CONTEXT_SUMMARY_API_KEY = os.getenv("CONTEXT_SUMMARY_API_KEY", "").strip()
+
+_SNIPPET_CHARS = 300
+_TRANSCRIPT_CHARS = 1200
+_SUMMARY_PROMPT = (
+    "You compress the history of a coding agent working in a sandbox. Write a concise summary "
+    "that lets the agent continue the task: the user's requests, decisions made, files created or "
+    "changed (with paths) and their current purpose, errors still unresolved, and what was about "
+    "to happen next. Use short bullet points. Do not invent anything."
+)
+
+# (provider, model) -> context_length
+_context_lengths: Dict[Tuple[str, str], int] = {}
+
+
+async def resolve_context_length(provider: str, api_key: str, model: str) -> int:
+    """The model's context window from the model catalogue, cached per model."""
+    key = (provider, model)
+    if key not in _context_lengths:
+        length = 0
+        try:
+            catalogue = await model_cache.get(get_provider(provider), api_key)
+            for entry in catalogue.get("models", []) if catalogue.get("success") else []:
+                if entry.get("id") == model:
+                    length = int(entry.get("context_length") or 0)
+                    break
+        except Exception:
+            length = 0
+        if length <= 0:
+            # Unknown models are not cached so a later catalogue fetch can fill them in
+            return CONTEXT_DEFAULT_LENGTH
+        _context_lengths[key] = length
+    return _context_lengths[key]
+
+
+# ---------------------------------------------------------------------------
+# History segmentation
+# ---------------------------------------------------------------------------
+
+def split_units(history: list, start: int) -> List[Tuple[int, int, bool]]:
+    """
+    Split ``history[start:]`` into ``(begin, end, resolved)`` units: an
+    assistant message with its tool results, or a single message.
+    ``resolved`` is False for tool calls missing a result.
+    """
+    units = []
+    i, n = start, len(history)
+    while i < n:
+        msg = history[i]
+        j = i + 1
+        resolved = True
+        if msg.get("role") == "assistant" and msg.get("tool_calls"):
+            answered = set()
+            while j < n and history[j].get("role") == "tool":
+                answered.add(history[j].get("tool_call_id"))
+                j += 1
+            resolved = all(tc.get("id") in answered for tc in msg["tool_calls"])
+        units.append((i, j, resolved))
+        i = j
+    return units
+
+
+# ---------------------------------------------------------------------------
+# Summarizers
+# ---------------------------------------------------------------------------
+
+def _snippet(text: Optional[str], limit: int = _SNIPPET_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _arguments(tool_call: dict) -> dict:
+    try:
+        arguments = json.loads(tool_call.get("function", {}).get("arguments") or "{}")
+    except json.JSONDecodeError:
+        return {}
+    return arguments if isinstance(arguments, dict) else {}
+
+
+def _result(message: dict) -> dict:
+    try:
+        result = json.loads(message.get("content") or "{}")
+    except json.JSONDecodeError:
+        return {"success": True}
+    return result if isinstance(result, dict) else {"success": True}
+
+
+def extractive_summary(messages: list, previous: Optional[str], max_tokens: int) -> str:
+    """Rule-based summary: user requests, files touched, tool outcomes, assistant notes."""
+    requests: List[str] = []
+    notes: List[str] = []
+    actions: List[str] = []
+    files: Dict[str, List[str]] = {}
+    # Tool call ids are only unique within a turn for some providers
+    pending: Dict[str, dict] = {}
+
+    for msg in messages:
+        role = msg.get("role")
+        if role == "user":
+            requests.append(_snippet(msg.get("content")))
+        elif role == "assistant":
+            if msg.get("content"):
+                notes.append(_snippet(msg["content"]))
+            pending = {tc.get("id"): tc for tc in msg.get("tool_calls") or []}
+        elif role == "tool" and msg.get("tool_call_id") in pending:
+            tc = pending.pop(msg["tool_call_id"])
+            name = tc.get("function", {}).get("name", "")
+            result = _result(msg)
+            path = result.get("file_path") or _arguments(tc).get("file_path") or ""
+            outcome = "ok" if result.get("success") else f"error: {_snippet(result.get('error'), 160)}"
+            actions.append(f"- {name} {path} → {outcome}".replace("  ", " "))
+            if path and result.get("success"):
+                files.setdefault(path, [])
+                if name not in files[path]:
+                    files[path].append(name)
+
+    budget = max(200, int(max_tokens * CHARS_PER_TOKEN))
+    sections = []
+    if previous:
+        sections.append("Earlier:\n" + (previous if len(previous) <= budget // 3 else previous[: budget // 3] + "…"))
+    if requests:
+        sections.append("User messages:\n" + "\n".join(f"- {r}" for r in requests))
+    if files:
+        sections.append("Files touched:\n" + "\n".join(f"- {p}: {', '.join(ops)}" for p, ops in files.items()))
+    if notes:
+        sections.append("Assistant notes:\n" + "\n".join(f"- {n}" for n in notes[-5:]))
+
+    head = "\n\n".join(sections)
+    remaining = budget - len(head) - 40
+    kept: List[str] = []
+    for line in reversed(actions):
+        if remaining - len(line) - 1 < 0:
+            break
+        kept.append(line)
+        remaining -= len(line) + 1
+    if kept:
+        omitted = len(actions) - len(kept)
+        lines = ([f"- … {omitted} earlier tool calls omitted"] if omitted else []) + list(reversed(kept))
+        head += "\n\nTool calls:\n" + "\n".join(lines)
+    return head[:budget]
+
+
+def _transcript(messages: list) -> str:
+    lines = []
+    for msg in messages:
+        role = msg.get("role")
+        if role == "tool":
+            lines.append(f"[tool {msg.get('name', '')} result] {_snippet(msg.get('content'), _TRANSCRIPT_CHARS)}")
+            continue
+        if msg.get("content"):
+            lines.append(f"[{role}] {_snippet(msg['content'], _TRANSCRIPT_CHARS)}")
+        for tc in msg.get("tool_calls") or []:
+            fn = tc.get("function", {})
+            lines.append(f"[tool call {fn.get('name', '')}] {_snippet(fn.get('arguments'), _TRANSCRIPT_CHARS)}")
+    return "\n".join(lines)
+
+
+async def llm_summary(
+    messages: list, previous: Optional[str], provider: str, api_key: str, model: str, max_tokens: int
+) -> Optional[str]:
+    """Summary written by a (cheaper) model; None if the call fails."""
+    prompt = ""
+    if previous:
+        prompt += f"Summary so far:\n{previous}\n\n"
+    prompt += f"New conversation to fold into the summary:\n{_transcript(messages)}"
+    parts: List[str] = []
+    async for event in resilient_client.chat_completion(
+        provider=provider,
+        api_key=api_key,
+        model=model,
+        messages=[{"role": "system", "content": _SUMMARY_PROMPT}, {"role": "user", "content": prompt}],
+    ):
+        if event.get("type") == "error":
+            return None
+        if event.get("type") == "done":
+            break
+        if event.get("type") == "chunk":
+            for choice in event["data"].get("choices", []):
+                parts.append((choice.get("delta") or {}).get("content") or "")
+    summary = "".join(parts).strip()
+    return summary[: int(max_tokens * CHARS_PER_TOKEN)] or None
+
+
+# ---------------------------------------------------------------------------
+# Compactor
+# ---------------------------------------------------------------------------
+
+class ContextCompactor:
+    """Per-agent compaction policy; see the module docstring."""
+
+    def __init__(
+        self,
+        provider: str,
+        api_key: str,
+        model: str,
+        threshold: Optional[float] = None,
+        target: Optional[float] = None,
+        keep_turns: Optional[int] = None,
+        summary_max_tokens: Optional[int] = None,
+    ):
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.threshold = threshold or CONTEXT_COMPACTION_THRESHOLD
+        self.target = min(target or CONTEXT_COMPACTION_TARGET, self.threshold)
+        self.keep_turns = max(1, keep_turns or CONTEXT_KEEP_TURNS)
+        self.summary_max_tokens = summary_max_tokens or CONTEXT_SUMMARY_MAX_TOKENS
+        self.context_length: Optional[int] = None
+
+    def use_model(self, provider: str, api_key: str, model: str) -> None:
+        """Follow the agent's current provider/key/model; a different model re-resolves the context length."""
+        if (provider, model) != (self.provider, self.model):
+            self.context_length = None
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+
+    async def maybe_compact(
+        self,
+        context: ContextWindow,
+        fixed_tokens: int,
+        view: Optional[Callable[[list], list]] = None,
+    ) -> Optional[dict]:
+        """
+        Compact ``context`` if the request would cross the threshold.
+        ``fixed_tokens`` covers what compaction cannot shrink (system prompt
+        and tool schemas); ``view`` is applied to the messages before they
+        are sized, as it is before they are sent. Returns the compaction
+        record, or None.
+        """
+        view = view or (lambda messages: messages)
+        if self.context_length is None:
+            # Resolved once per agent, so an unlisted model does not refetch the catalogue every turn
+            self.context_length = await resolve_context_length(self.provider, self.api_key, self.model)
+        limit = self.context_length
+        tokens_before = fixed_tokens + estimate_messages_tokens(view(context.get_active_messages()))
+        if tokens_before < limit * self.threshold:
+            return None
+
+        started = time.perf_counter()
+        summary_max_tokens = min(self.summary_max_tokens, limit // 10)
+        plan = self._plan(context, fixed_tokens, limit, summary_max_tokens)
+        if plan is None:
+            return None
+        cut, pinned, kept_turns = plan
+
+        history = context.conversation_history
+        pinned_set = set(pinned)
+        folded = [history[i] for i in range(context.summary_upto, cut) if i not in pinned_set]
+        summary, method = None, "extractive"
+        if CONTEXT_SUMMARY_MODEL:
+            provider = CONTEXT_SUMMARY_PROVIDER if has_provider(CONTEXT_SUMMARY_PROVIDER) else self.provider
+            try:
+                summary = await llm_summary(
+                    folded, context.summary, provider, CONTEXT_SUMMARY_API_KEY or self.api_key,
+                    CONTEXT_SUMMARY_MODEL, summary_max_tokens,
+                )
+            except Exception:
+                summary = None
+            method = "model" if summary else "extractive_fallback"
+        if not summary:
+            summary = extractive_summary(folded, context.summary, summary_max_tokens)
+
+        context.apply_compaction(summary, cut, pinned)
+        record = {
+            "tokens_before": tokens_before,
+            "tokens_after": fixed_tokens + estimate_messages_tokens(view(context.get_active_messages())),
+            "context_length": limit,
+            "messages_compacted": len(folded),
+            "messages_kept": len(history) - cut + len(pinned),
+            "kept_turns": kept_turns,
+            "pinned": len(pinned),
+            "method": method,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        context.compactions.append(record)
+        return record
+
+    def _plan(
+        self, context: ContextWindow, fixed_tokens: int, limit: int, summary_max_tokens: int
+    ) -> Optional[Tuple[int, list, int]]:
+        """Choose the cut index and pinned messages; None if nothing can be folded."""
+        history = context.conversation_history
+        units = split_units(history, context.summary_upto)
+        turns = [u for u in units if history[u[0]].get("role") == "assistant"]
+        if len(turns) <= 1:
+            return None
+
+        last_user = max((i for i, m in enumerate(history) if m.get("role") == "user"), default=None)
+        budget = limit * self.target - fixed_tokens - summary_max_tokens
+        keep = min(self.keep_turns, len(turns) - 1)
+        while True:
+            cut = turns[-keep][0]
+            pinned = list(context.pinned)
+            for begin, end, resolved in units:
+                if begin >= cut:
+                    break
+                if not resolved or (last_user is not None and begin <= last_user < end):
+                    pinned.extend(range(begin, end))
+            kept = [history[i] for i in pinned] + history[cut:]
+            if keep == 1 or estimate_messages_tokens(kept) <= budget:
+                break
+            keep -= 1
+
+        if all(i in pinned for i in range(context.summary_upto, cut)):
+            return None
+        return cut, pinned, keep
@@ -0,0 +1,96 @@
+"""
+Continuation of generations cut off by the output token limit.
+
+When a stream ends before a tool call's JSON arguments close (typically
+``finish_reason == "length"`` in the middle of a big ``file_write``), the
+call is not discarded:
+
+- ``file_write`` / ``file_append`` with a complete ``file_path``: the
+  content streamed so far is saved, and the tool result tells the model to
+  carry on with ``file_append`` from exactly where the text stops.
+- any other truncated call is recorded with the fields that did complete
+  and answered with an error instead of running with broken arguments.
+
+Text-only answers cut off by the limit are kept, and the model is asked
+to continue them (at most ``TRUNCATION_MAX_CONTINUATIONS`` times in a row).
+"""
+
+import json
+import os
+
+from .streaming_json import IncrementalJSONParser
+
+TRUNCATION_MAX_CONTINUATIONS = int(os.getenv("TRUNCATION_MAX_CONTINUATIONS", "3"))
+
+CONTINUE_TEXT_MESSAGE = (
+    "[Your previous response was cut off by the output token limit. "
+    "Continue exactly where it stopped, without repeating anything.]"
+)
+
+PARTIAL_CONTENT = "partial_content"
+INCOMPLETE_ARGUMENTS = "incomplete_arguments"
+
+_CONTENT_TOOLS = ("file_write", "file_append")
+_TAIL_CHARS = 200
+
+
+def is_truncated(args: IncrementalJSONParser) -> bool:
+    """A well-formed prefix whose top-level object never closed."""
+    return not args.complete and args.error is None and args.consumed > 0
+
+
+def salvage_truncated_call(tool_call: dict, args: IncrementalJSONParser) -> dict:
+    """
+    Rewrite a truncated call (parsed form) so it can be recorded in the
+    context with valid JSON arguments and, where possible, executed.
+    """
+    name = tool_call["function"]["name"]
+    file_path = args.values.get("file_path")
+    has_content = args.has_field("content") or args.in_string("content")
+
+    if name in _CONTENT_TOOLS and isinstance(file_path, str) and file_path and has_content:
+        arguments = {"file_path": file_path, "content": args.get_string("content")}
+        kind = PARTIAL_CONTENT
+    else:
+        arguments = dict(args.values)
+        kind = INCOMPLETE_ARGUMENTS
+
+    return {
+        **tool_call,
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+        "parsed_arguments": arguments,
+        "truncated": kind,
+    }
+
+
+def incomplete_arguments_result(tool_call: dict) -> dict:
+    return {
+        "success": False,
+        "truncated": True,
+        "error": (
+            f"The arguments of this {tool_call['function']['name']} call were cut off by the output "
+            "token limit, so it was not run. Call it again; split very large content into a "
+            "file_write followed by file_append calls."
+        ),
+    }
+
+
+def truncated_result(tool_call: dict, result: dict) -> dict:
+    """Annotate the result of a salvaged call with continuation instructions."""
+    if tool_call.get("truncated") != PARTIAL_CONTENT or not result.get("success"):
+        return {**result, "truncated": True}
+
+    content = tool_call["parsed_arguments"]["content"]
+    file_path = result.get("file_path") or tool_call["parsed_arguments"]["file_path"]
+    return {
+        **result,
+        "truncated": True,
+        "saved_bytes": len(content.encode("utf-8", "surrogatepass")),
+        "saved_lines": content.count("\n") + 1 if content else 0,
+        "saved_tail": content[-_TAIL_CHARS:],
+        "message": (
+            f"Output limit reached while writing {file_path}; the part generated so far was saved. "
+            "Continue with file_append on the same path, starting exactly after saved_tail. "
+            "Do not repeat text that was already saved."
+        ),
+    }
@@ -0,0 +1,241 @@
+"""
+History view — elide superseded file contents from the model-facing context.
+
+File contents end up in the history many times over: ``file_write``
+arguments, ``file_read`` results and the strings of every edit (each edit
+of a ``multi_edit`` call counts on its own). Once a path has a newer full
+copy (a successful ``file_write`` or ``file_read``), every earlier copy of
+that path — full or partial, including failed edits — is dead weight. ``HistoryView.apply`` returns the messages with those
+fields replaced by a short placeholder such as
+``[contents of /home/user/app.py at version 3 superseded]``; only the
+latest full copy and the edits after it stay verbatim.
+
+The stored ``ContextWindow`` is never modified (``/api/memory`` still shows
+everything); messages that need eliding are copied and re-encoded like
+tool results (``result_format.dump_compact``). A placeholder depends only
+on the copy it replaces, so an elided message is byte-identical on every
+later turn and prompt-cache prefixes across it keep matching.
+"""
+
+import json
+import posixpath
+from typing import Dict, List, Optional, Tuple
+
+from .result_format import dump_compact
+from .tool_executor import ensure_home_path
+
+# Fields holding (part of) a file's contents, per tool
+ARGUMENT_FIELDS = {
+    "file_write": ("content",),
+    "file_append": ("content",),
+    "replace_in_file": ("old_string", "new_string"),
+    "insert_line": ("new_str",),
+    "delete_str": ("target_str",),
+}
+RESULT_FIELDS = {
+    "file_read": ("content", "raw_content"),
+    "replace_in_file": ("old_string", "new_string"),
+    "insert_line": ("new_str",),
+    "delete_lines": ("deleted_lines",),
+    "delete_str": ("target_str",),
+}
+# Successful calls of these tools leave a full copy of the file in the history
+# (``file_read`` unless its result is ``truncated``)
+FULL_COPY_TOOLS = {"file_write", "file_read"}
+MUTATING_TOOLS = {"file_write", "file_append", "replace_in_file", "insert_line", "delete_lines", "delete_str"}
+# ``multi_edit`` is tracked per edit: each edit's ``type`` is one of MUTATING_TOOLS
+_TRACKED_TOOLS = FULL_COPY_TOOLS | MUTATING_TOOLS | {"multi_edit"}
+
+# Shorter strings are left alone: the placeholder would not be much smaller
+_MIN_ELIDE_CHARS = 120
+
+
+def _normalize(file_path) -> Optional[str]:
+    if not isinstance(file_path, str) or not file_path:
+        return None
+    return posixpath.normpath(ensure_home_path(file_path))
+
+
+def _loads(text) -> Optional[dict]:
+    try:
+        value = json.loads(text or "")
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, dict) else None
+
+
+class _Op:
+    __slots__ = ("call_msg", "call_pos", "result_msg", "name", "path", "success", "full", "version", "edit_index")
+
+    def __init__(self, call_msg, call_pos, result_msg, name, path, success, full, version, edit_index=None):
+        self.call_msg = call_msg
+        self.call_pos = call_pos
+        self.result_msg = result_msg
+        self.name = name
+        self.path = path
+        self.success = success
+        self.full = full
+        self.version = version
+        self.edit_index = edit_index  # position in a multi_edit call's ``edits``
+
+
+class HistoryView:
+    """Per-agent view; parsed arguments/results are cached per message."""
+
+    def __init__(self, min_elide_chars: int = _MIN_ELIDE_CHARS):
+        self.min_elide_chars = min_elide_chars
+        self._parsed: Dict[int, Tuple[object, Optional[dict]]] = {}
+        self.elided_copies = 0
+        self.saved_chars = 0
+
+    def apply(self, messages: list) -> list:
+        """Return ``messages`` with superseded copies elided (the list itself if nothing changes)."""
+        if len(self._parsed) > 4 * len(messages) + 64:
+            self._parsed.clear()
+        ops = self._collect(messages)
+        latest_full: Dict[str, int] = {}
+        for i, op in enumerate(ops):
+            if op.full:
+                latest_full[op.path] = i
+
+        # message index -> {call position or None (result): {field or (edit, field): placeholder}}
+        edits: Dict[int, Dict[Optional[int], Dict[str, str]]] = {}
+        for i, op in enumerate(ops):
+            if i >= latest_full.get(op.path, -1):
+                continue
+            if op.success and op.name in FULL_COPY_TOOLS:
+                placeholder = f"[contents of {op.path} at version {op.version} superseded]"
+            elif op.success:
+                placeholder = f"[edit of {op.path} at version {op.version} superseded]"
+            else:
+                placeholder = f"[failed edit of {op.path} superseded]"
+            for field in ARGUMENT_FIELDS.get(op.name, ()):
+                key = field if op.edit_index is None else (op.edit_index, field)
+                edits.setdefault(op.call_msg, {}).setdefault(op.call_pos, {})[key] = placeholder
+            if op.result_msg is not None and op.edit_index is None:
+                for field in RESULT_FIELDS.get(op.name, ()):
+                    edits.setdefault(op.result_msg, {}).setdefault(None, {})[field] = placeholder
+
+        self.elided_copies = self.saved_chars = 0
+        if not edits:
+            return messages
+        view = list(messages)
+        for index, changes in edits.items():
+            view[index] = self._rewrite(messages[index], changes)
+        return view
+
+    def get_stats(self) -> dict:
+        return {"elided_copies": self.elided_copies, "saved_chars": self.saved_chars}
+
+    # ------------------------------------------------------------------
+
+    def _parse(self, message: dict, text) -> Optional[dict]:
+        key = id(message)
+        cached = self._parsed.get(key)
+        if cached is None or cached[0] is not message:
+            cached = (message, _loads(text))
+            self._parsed[key] = cached
+        return cached[1]
+
+    def _arguments(self, tool_call: dict) -> Optional[dict]:
+        return self._parse(tool_call, tool_call.get("function", {}).get("arguments"))
+
+    def _collect(self, messages: list) -> List[_Op]:
+        ops: List[_Op] = []
+        versions: Dict[str, int] = {}
+        pending: Dict[str, Tuple[int, int, dict]] = {}
+        for index, msg in enumerate(messages):
+            role = msg.get("role")
+            if role == "assistant":
+                pending = {
+                    tc.get("id"): (index, pos, tc)
+                    for pos, tc in enumerate(msg.get("tool_calls") or [])
+                    if tc.get("function", {}).get("name") in _TRACKED_TOOLS
+                }
+            elif role == "tool" and msg.get("tool_call_id") in pending:
+                call_msg, call_pos, tc = pending.pop(msg["tool_call_id"])
+                name = tc["function"]["name"]
+                arguments = self._arguments(tc) or {}
+                result = self._parse(msg, msg.get("content")) or {}
+                if name == "multi_edit":
+                    ops.extend(self._multi_edit_ops(call_msg, call_pos, arguments, result, versions))
+                    continue
+                path = _normalize(result.get("file_path") or arguments.get("file_path"))
+                if path is None:
+                    continue
+                success = bool(result.get("success"))
+                if success and name in MUTATING_TOOLS:
+                    versions[path] = versions.get(path, 0) + 1
+                elif success:
+                    versions.setdefault(path, 1)
+                ops.append(_Op(
+                    call_msg, call_pos, index, name, path, success,
+                    # A ranged/truncated read is only part of the file
+                    full=success and name in FULL_COPY_TOOLS and not result.get("truncated"),
+                    version=versions.get(path, 0),
+                ))
+        return ops
+
+    def _multi_edit_ops(self, call_msg, call_pos, arguments: dict, result: dict, versions: Dict[str, int]) -> List[_Op]:
+        edits = arguments.get("edits")
+        outcomes = result.get("results")
+        if not isinstance(edits, list):
+            return []
+        ops = []
+        for i, edit in enumerate(edits):
+            if not isinstance(edit, dict) or edit.get("type") not in MUTATING_TOOLS:
+                continue
+            path = _normalize(edit.get("file_path"))
+            if path is None:
+                continue
+            outcome = outcomes[i] if isinstance(outcomes, list) and i < len(outcomes) else None
+            success = isinstance(outcome, dict) and bool(outcome.get("success"))
+            if success:
+                versions[path] = versions.get(path, 0) + 1
+            ops.append(_Op(
+                call_msg, call_pos, None, edit["type"], path, success,
+                full=False, version=versions.get(path, 0), edit_index=i,
+            ))
+        return ops
+
+    def _replace(self, data: dict, fields: Dict[str, str]) -> Optional[dict]:
+        changed = None
+        for field, placeholder in fields.items():
+            value = data.get(field)
+            if isinstance(value, str) and len(value) >= self.min_elide_chars:
+                changed = changed or dict(data)
+                changed[field] = placeholder
+                self.saved_chars += len(value) - len(placeholder)
+        if changed is not None:
+            self.elided_copies += 1
+        return changed
+
+    def _replace_edits(self, arguments: dict, fields: Dict[Tuple[int, str], str]) -> Optional[dict]:
+        """``_replace`` for the items of a multi_edit call's ``edits``."""
+        per_edit: Dict[int, Dict[str, str]] = {}
+        for (index, field), placeholder in fields.items():
+            per_edit.setdefault(index, {})[field] = placeholder
+        edits = list(arguments["edits"])
+        changed = False
+        for index, edit_fields in per_edit.items():
+            replaced = self._replace(edits[index], edit_fields)
+            if replaced is not None:
+                edits[index] = replaced
+                changed = True
+        return {**arguments, "edits": edits} if changed else None
+
+    def _rewrite(self, message: dict, changes: Dict[Optional[int], Dict[str, str]]) -> dict:
+        if message.get("role") == "tool":
+            result = self._replace(self._parse(message, message.get("content")) or {}, changes[None])
+            return message if result is None else {**message, "content": dump_compact(result)}
+
+        tool_calls = list(message.get("tool_calls") or [])
+        for pos, fields in changes.items():
+            if any(isinstance(key, tuple) for key in fields):
+                arguments = self._replace_edits(self._arguments(tool_calls[pos]) or {}, fields)
+            else:
+                arguments = self._replace(self._arguments(tool_calls[pos]) or {}, fields)
+            if arguments is not None:
+                tc = tool_calls[pos]
+                tool_calls[pos] = {**tc, "function": {**tc["function"], "arguments": dump_compact(arguments)}}
+        return {**message, "tool_calls": tool_calls}
@@ -0,0 +1,270 @@
+"""
+Loop and no-progress detection for the ReAct loop.
+
+Every tool call is fingerprinted together with its result, and every turn
+is classified as progress or not. A turn makes no progress when all of its
+calls are:
+
+- repeats: the same call with the same result seen before in the window
+  (re-reading an unchanged file, retrying the same failing edit, undoing
+  and redoing the same edit)
+- failures, or
+- no-op edits: a ``replace_in_file`` whose old and new strings are equal
+  (or a ``multi_edit`` made only of those), a ``file_write`` of the
+  content the file already has, an empty ``file_append``
+
+A loop is reported when one call/result pair repeats
+``LOOP_REPEAT_THRESHOLD`` times, when the calls of the last stalled turns
+form a cycle of period up to ``LOOP_MAX_CYCLE`` repeated
+``LOOP_CYCLE_REPEATS`` times (results may differ, e.g. an error message
+quoting changing content), or after ``LOOP_NO_PROGRESS_TURNS`` turns in a
+row without progress.
+
+Each detection escalates one step (see ``LoopDetector.observe_turn``):
+corrective feedback to the model, then feedback plus a backoff delay, then
+stop. A turn with progress resets the escalation.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+LOOP_DETECTION = os.getenv("LOOP_DETECTION", "true").strip().lower() in ("1", "true", "yes", "on")
+LOOP_REPEAT_THRESHOLD = int(os.getenv("LOOP_REPEAT_THRESHOLD", "3"))
+LOOP_MAX_CYCLE = int(os.getenv("LOOP_MAX_CYCLE", "4"))
+LOOP_CYCLE_REPEATS = int(os.getenv("LOOP_CYCLE_REPEATS", "3"))
+LOOP_NO_PROGRESS_TURNS = int(os.getenv("LOOP_NO_PROGRESS_TURNS", "6"))
+LOOP_WINDOW = int(os.getenv("LOOP_WINDOW", "30"))
+LOOP_BACKOFF_SECONDS = float(os.getenv("LOOP_BACKOFF_SECONDS", "2"))
+
+FEEDBACK = "feedback"
+BACKOFF = "backoff"
+STOP = "stop"
+_ESCALATION = (FEEDBACK, BACKOFF, STOP)
+
+_MUTATING_TOOLS = {"file_write", "file_append", "replace_in_file", "insert_line", "delete_lines", "delete_str", "multi_edit"}
+# Result fields that change between otherwise identical runs
+_VOLATILE_RESULT_FIELDS = {"streamed", "truncated", "saved_tail"}
+
+
+def _digest(value) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+
+
+def call_fingerprint(tool_name: str, arguments: dict) -> str:
+    return _digest([tool_name, arguments])
+
+
+def result_fingerprint(result: dict) -> str:
+    if not isinstance(result, dict):
+        return _digest(result)
+    return _digest({k: v for k, v in result.items() if k not in _VOLATILE_RESULT_FIELDS})
+
+
+@dataclass
+class LoopVerdict:
+    """What the agent should do after a turn flagged as looping."""
+
+    action: str
+    reason: str
+    detail: str
+    level: int
+    backoff: float = 0.0
+    repeated_calls: List[str] = field(default_factory=list)
+
+    def feedback_message(self) -> str:
+        tools = ", ".join(self.repeated_calls) or "the same tools"
+        return (
+            f"[Loop detector] {self.detail} You have been repeating {tools} without making progress. "
+            "Stop repeating it: re-read the relevant file once if you need its current content, "
+            "then try a different approach, or finish with a final answer explaining what is blocking you."
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "action": self.action,
+            "reason": self.reason,
+            "detail": self.detail,
+            "level": self.level,
+            "backoff": self.backoff,
+            "repeated_calls": self.repeated_calls,
+        }
+
+
+class LoopDetector:
+    """Per-run state; feed it every finished tool turn via ``observe_turn``."""
+
+    def __init__(
+        self,
+        repeat_threshold: Optional[int] = None,
+        max_cycle: Optional[int] = None,
+        cycle_repeats: Optional[int] = None,
+        no_progress_turns: Optional[int] = None,
+        window: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+    ):
+        self.repeat_threshold = repeat_threshold or LOOP_REPEAT_THRESHOLD
+        self.max_cycle = max_cycle or LOOP_MAX_CYCLE
+        self.cycle_repeats = cycle_repeats or LOOP_CYCLE_REPEATS
+        self.no_progress_turns = no_progress_turns or LOOP_NO_PROGRESS_TURNS
+        self.window = window or LOOP_WINDOW
+        self.backoff_seconds = LOOP_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+
+        self.turns: Deque[Tuple[str, ...]] = deque(maxlen=self.window)
+        self.pairs: Deque[str] = deque(maxlen=self.window * 4)
+        self.pair_counts: Counter = Counter()
+        self.pair_tools: Dict[str, str] = {}
+        self.content: Dict[str, str] = {}  # path -> digest of its last known content
+        self.stalled_turns = 0
+        self.level = 0
+        self.detections = 0
+        self.noop_edits = 0
+
+    # ------------------------------------------------------------------
+
+    def observe_turn(self, calls: List[Tuple[str, dict, dict]]) -> Optional[LoopVerdict]:
+        """
+        Record one turn of ``(tool_name, arguments, result)`` and return a
+        verdict if it continues a loop, else None.
+        """
+        if not calls:
+            return None
+        turn: List[str] = []
+        pairs: List[str] = []
+        repeated: List[str] = []
+        progress = False
+        noop = False
+
+        for tool_name, arguments, result in calls:
+            call = call_fingerprint(tool_name, arguments)
+            pair = f"{call}:{result_fingerprint(result)}"
+            turn.append(call)
+            pairs.append(pair)
+            seen = self.pair_counts[pair] > 0
+            self._remember(pair, tool_name)
+
+            is_noop = self._is_noop(tool_name, arguments, result)
+            noop |= is_noop
+            self._track_content(tool_name, arguments, result)
+            if not seen and not is_noop and isinstance(result, dict) and result.get("success"):
+                progress = True
+            if seen or is_noop:
+                repeated.append(tool_name)
+
+        if noop:
+            self.noop_edits += 1
+        self.turns.append(tuple(turn))
+        self.stalled_turns = 0 if progress else self.stalled_turns + 1
+        if progress:
+            self.level = 0
+            self.turns.clear()
+            return None
+
+        detection = self._detect(pairs, noop)
+        if detection is None:
+            return None
+        reason, detail = detection
+
+        self.detections += 1
+        self.level += 1
+        action = _ESCALATION[min(self.level, len(_ESCALATION)) - 1]
+        # Start counting again so the model gets a few turns to act on the feedback
+        self.stalled_turns = 0
+        self.turns.clear()
+        return LoopVerdict(
+            action=action,
+            reason=reason,
+            detail=detail,
+            level=self.level,
+            backoff=self.backoff_seconds * (self.level - 1) if action == BACKOFF else 0.0,
+            repeated_calls=sorted(set(repeated)),
+        )
+
+    def get_stats(self) -> dict:
+        return {
+            "level": self.level,
+            "detections": self.detections,
+            "stalled_turns": self.stalled_turns,
+            "noop_edits": self.noop_edits,
+        }
+
+    # ------------------------------------------------------------------
+
+    def _remember(self, pair: str, tool_name: str) -> None:
+        if len(self.pairs) == self.pairs.maxlen:
+            old = self.pairs[0]
+            self.pair_counts[old] -= 1
+            if self.pair_counts[old] <= 0:
+                del self.pair_counts[old]
+                self.pair_tools.pop(old, None)
+        self.pairs.append(pair)
+        self.pair_counts[pair] += 1
+        self.pair_tools[pair] = tool_name
+
+    def _detect(self, pairs: List[str], noop: bool) -> Optional[Tuple[str, str]]:
+        for pair in pairs:
+            if self.pair_counts[pair] >= self.repeat_threshold:
+                return (
+                    "repeated_call",
+                    f"The same {self.pair_tools[pair]} call returned the same result "
+                    f"{self.pair_counts[pair]} times.",
+                )
+        period = self._cycle_period()
+        if period:
+            return (
+                "cycle",
+                f"The last {period * self.cycle_repeats} turns repeat a cycle of {period} turn(s).",
+            )
+        if self.stalled_turns >= self.no_progress_turns:
+            kind = "no-op edits, failures or repeated reads" if noop else "failures or repeated reads"
+            return ("no_progress", f"{self.stalled_turns} turns in a row made no progress ({kind}).")
+        return None
+
+    def _cycle_period(self) -> int:
+        turns = list(self.turns)
+        for period in range(1, self.max_cycle + 1):
+            span = period * self.cycle_repeats
+            if len(turns) < span:
+                break
+            tail = turns[-span:]
+            if all(tail[i] == tail[i - period] for i in range(period, span)):
+                return period
+        return 0
+
+    def _is_noop(self, tool_name: str, arguments: dict, result: dict) -> bool:
+        if not isinstance(result, dict) or not result.get("success"):
+            return False
+        if tool_name == "replace_in_file":
+            return arguments.get("old_string") == arguments.get("new_string")
+        if tool_name == "multi_edit":
+            edits = arguments.get("edits") or []
+            return all(
+                isinstance(e, dict) and e.get("type") == "replace_in_file" and e.get("old_string") == e.get("new_string")
+                for e in edits
+            )
+        if tool_name == "file_append":
+            return not arguments.get("content")
+        if tool_name == "file_write":
+            path = result.get("file_path") or arguments.get("file_path")
+            return self.content.get(path) == _digest(arguments.get("content", ""))
+        return False
+
+    def _track_content(self, tool_name: str, arguments: dict, result: dict) -> None:
+        if not isinstance(result, dict) or not result.get("success"):
+            return
+        path = result.get("file_path") or arguments.get("file_path")
+        if tool_name == "file_write":
+            self.content[path] = _digest(arguments.get("content", ""))
+        elif tool_name == "file_read" and not result.get("truncated"):
+            content = result.get("raw_content", result.get("content"))
+            if isinstance(content, str):
+                self.content[path] = _digest(content)
+        elif tool_name == "multi_edit":
+            for edited in result.get("files") or []:
+                self.content.pop(edited.get("file_path"), None)
+        elif tool_name in _MUTATING_TOOLS:
+            self.content.pop(path, None)
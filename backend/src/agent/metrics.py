@@ -0,0 +1,104 @@
+"""
+Per-iteration usage and latency accounting.
+
+Each ReAct iteration records token usage (prompt / completion / cached),
+time-to-first-token, stream duration, rate-limit queue time and tool
+execution time. Records are stored on the ContextWindow and aggregated per
+session for ``/api/memory``; each one is also emitted as an
+``iteration_metrics`` SSE event.
+"""
+
+import time
+from typing import Optional
+
+from ..services.prompt_cache import extract_cache_tokens
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class IterationMetrics:
+    """Timing and usage collector for one iteration."""
+
+    def __init__(self, iteration: int, provider: str, model: str):
+        self.iteration = iteration
+        self.provider = provider
+        self.model = model
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.stream_ended_at: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+        self.usage_reported = False
+        self.queue_wait = 0.0
+        self.retries = 0
+        self.tool_time = 0.0
+        self.tool_calls = 0
+        self.finish_reason: Optional[str] = None
+
+    def mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def mark_stream_end(self) -> None:
+        if self.stream_ended_at is None:
+            self.stream_ended_at = time.perf_counter()
+
+    def record_usage(self, usage: dict) -> None:
+        self.usage_reported = True
+        self.prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        self.completion_tokens = usage.get("completion_tokens", 0) or 0
+        self.cached_tokens, self.cache_write_tokens = extract_cache_tokens(usage)
+
+    def add_tool_time(self, seconds: float, calls: int = 1) -> None:
+        self.tool_time += seconds
+        self.tool_calls += calls
+
+    def to_dict(self) -> dict:
+        ended = time.perf_counter()
+        stream_end = self.stream_ended_at or ended
+        return {
+            "iteration": self.iteration,
+            "provider": self.provider,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "usage_reported": self.usage_reported,
+            "queue_wait_ms": _ms(self.queue_wait),
+            "ttft_ms": _ms(self.first_token_at - self.started) if self.first_token_at else None,
+            "stream_ms": _ms(stream_end - self.started),
+            "tool_ms": _ms(self.tool_time),
+            "tool_calls": self.tool_calls,
+            "total_ms": _ms(ended - self.started),
+            "retries": self.retries,
+            "finish_reason": self.finish_reason,
+        }
+
+
+def aggregate_metrics(records: list) -> dict:
+    """Summarize a session's iteration records."""
+    ttfts = sorted(r["ttft_ms"] for r in records if r.get("ttft_ms") is not None)
+    prompt_tokens = sum(r.get("prompt_tokens", 0) for r in records)
+    cached_tokens = sum(r.get("cached_tokens", 0) for r in records)
+    slowest = max(records, key=lambda r: r.get("total_ms", 0), default=None)
+    return {
+        "iterations": len(records),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": sum(r.get("completion_tokens", 0) for r in records),
+        "cached_tokens": cached_tokens,
+        "cache_write_tokens": sum(r.get("cache_write_tokens", 0) for r in records),
+        "cache_hit_rate": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+        "avg_ttft_ms": round(sum(ttfts) / len(ttfts), 1) if ttfts else None,
+        "p95_ttft_ms": ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))] if ttfts else None,
+        "stream_ms": round(sum(r.get("stream_ms", 0) for r in records), 1),
+        "tool_ms": round(sum(r.get("tool_ms", 0) for r in records), 1),
+        "queue_wait_ms": round(sum(r.get("queue_wait_ms", 0) for r in records), 1),
+        "total_ms": round(sum(r.get("total_ms", 0) for r in records), 1),
+        "retries": sum(r.get("retries", 0) for r in records),
+        "slowest_iteration": slowest.get("iteration") if slowest else None,
+    }
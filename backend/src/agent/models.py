@@ -2,6 +2,10 @@ from pydantic import BaseModel
 from typing import Optional, Any
 import uuid
 
+from .metrics import aggregate_metrics
+
+SUMMARY_PREFIX = "[Summary of the earlier conversation, compacted to fit the context window]\n"
+
 
 class UserMessage(BaseModel):
     content: str
@@ -48,6 +52,13 @@ class ThoughtMessage(BaseModel):
 
 class ContextWindow(BaseModel):
     conversation_history: list = []
+    iteration_metrics: list = []
+    # Compaction state (see agent/compaction.py): messages before
+    # ``summary_upto`` are replaced by ``summary`` except ``pinned`` indices
+    summary: Optional[str] = None
+    summary_upto: int = 0
+    pinned: list = []
+    compactions: list = []
     
     def add(self, message: dict):
         """Add a message to the conversation history."""
@@ -85,13 +96,38 @@ class ContextWindow(BaseModel):
             "content": content
         })
     
+    def add_iteration_metrics(self, metrics: dict):
+        """Record usage/latency metrics for one agent iteration."""
+        self.iteration_metrics.append(metrics)
+
     def get_messages(self) -> list:
         """Get all messages in the context window."""
         return self.conversation_history
+
+    def get_active_messages(self) -> list:
+        """Messages sent to the model: the compaction summary (if any) plus what was kept verbatim."""
+        if self.summary is None:
+            return self.conversation_history
+        return (
+            [{"role": "user", "content": SUMMARY_PREFIX + self.summary}]
+            + [self.conversation_history[i] for i in self.pinned]
+            + self.conversation_history[self.summary_upto:]
+        )
+
+    def apply_compaction(self, summary: str, upto: int, pinned: list):
+        """Fold everything before ``upto`` (except ``pinned``) into ``summary``."""
+        self.summary = summary
+        self.summary_upto = upto
+        self.pinned = pinned
     
     def clear(self):
         """Clear the conversation history."""
         self.conversation_history = []
+        self.iteration_metrics = []
+        self.summary = None
+        self.summary_upto = 0
+        self.pinned = []
+        self.compactions = []
     
     def get_stats(self) -> dict:
         """Get statistics about the context window."""
@@ -133,7 +169,9 @@ class ContextWindow(BaseModel):
             "tool_calls": tool_calls,
             "files_created": files_created,
             "files_in_context": files_in_context,
-            "file_types": file_types
+            "file_types": file_types,
+            "usage": aggregate_metrics(self.iteration_metrics),
+            "compactions": self.compactions,
         }
     
     def _get_file_type_category(self, ext: str) -> str:
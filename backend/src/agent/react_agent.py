@@ -15,18 +15,35 @@ The LLM decides tool usage via API protocol, not prompt tricks.
 """
 
 import json
-import re
+import time
 import asyncio
-from typing import AsyncGenerator, Optional, Callable
+from typing import AsyncGenerator, AsyncIterator, Optional, Callable
 
 from .models import ContextWindow
 from .system_prompt import get_system_prompt
 from .tool_schemas import TOOL_SCHEMAS
 from .tool_executor import TOOL_EXECUTORS
-from ..services.openrouter import chat_completion as openrouter_chat_completion
-from ..services.groq import chat_completion as groq_chat_completion
-from ..services.fireworks import chat_completion as fireworks_chat_completion
+from .tool_scheduler import ToolScheduler
+from .tool_validation import tool_validator
+from .loop_detector import LOOP_DETECTION, STOP, LoopDetector
+from .compaction import CONTEXT_COMPACTION, ContextCompactor
+from .history_view import HistoryView
+from .result_format import format_tool_result
+from .stream_writer import STREAM_FILE_WRITES, StreamingFileWrite
+from .continuation import (
+    CONTINUE_TEXT_MESSAGE,
+    INCOMPLETE_ARGUMENTS,
+    TRUNCATION_MAX_CONTINUATIONS,
+    incomplete_arguments_result,
+    is_truncated,
+    salvage_truncated_call,
+    truncated_result,
+)
+from ..services.resilience import FallbackTarget, resilient_client
+from .metrics import IterationMetrics
+from .streaming_json import IncrementalJSONParser
 from ..services.e2b_sandbox import sandbox_manager
+from ..services.token_estimator import estimate_messages_tokens
 
 
 class StreamingToolParser:
@@ -39,6 +56,7 @@ class StreamingToolParser:
         self.tool_calls: dict[int, dict] = {}
         self.current_content = ""
         self.finished = False
+        self.next_ready = 0
 
     def process_chunk(self, chunk: dict) -> dict:
         result = {
@@ -64,87 +82,115 @@ class StreamingToolParser:
             tool_id = tc.get("id")
 
             if index not in self.tool_calls:
-                self.tool_calls[index] = {"id": tool_id or f"call_{index}", "name": "", "arguments": ""}
+                self.tool_calls[index] = {
+                    "id": tool_id or f"call_{index}",
+                    "name": "",
+                    "argument_parts": [],
+                    "args": IncrementalJSONParser(),
+                }
+            call = self.tool_calls[index]
             if tool_id:
-                self.tool_calls[index]["id"] = tool_id
+                call["id"] = tool_id
 
             fn = tc.get("function", {})
             if "name" in fn:
-                self.tool_calls[index]["name"] = fn["name"]
+                call["name"] = fn["name"]
             if "arguments" in fn:
-                args_delta = fn["arguments"]
-                self.tool_calls[index]["arguments"] += args_delta
+                args_delta = fn["arguments"] or ""
+                call["argument_parts"].append(args_delta)
                 result["tool_updates"][index] = {
-                    "id": self.tool_calls[index]["id"],
-                    "name": self.tool_calls[index]["name"],
+                    "id": call["id"],
+                    "name": call["name"],
                     "arguments_delta": args_delta,
-                    "arguments_so_far": self.tool_calls[index]["arguments"],
+                    "field_deltas": call["args"].feed(args_delta),
+                    "args": call["args"],
                 }
 
         return result
 
+    def get_arguments(self, index: int) -> str:
+        return "".join(self.tool_calls[index]["argument_parts"])
+
+    def _parse_tool_call(self, index: int, strict: bool = False) -> Optional[dict]:
+        tc = self.tool_calls[index]
+        raw_arguments = self.get_arguments(index)
+        parsed = {
+            "id": tc["id"],
+            "function": {"name": tc["name"], "arguments": raw_arguments},
+        }
+        try:
+            parsed["parsed_arguments"] = json.loads(raw_arguments) if raw_arguments.strip() else {}
+        except json.JSONDecodeError as e:
+            if strict:
+                return None
+            parsed["parsed_arguments"] = {}
+            parsed["arguments_error"] = str(e)
+        return parsed
+
     def get_parsed_tool_calls(self) -> list:
-        parsed = []
-        for index in sorted(self.tool_calls.keys()):
+        return [self._parse_tool_call(index) for index in sorted(self.tool_calls.keys())]
+
+    def pop_ready_tool_calls(self) -> list:
+        """
+        Return calls whose arguments are complete while the stream is still
+        running, in index order and each only once. A call is complete when
+        its JSON object has closed, or when a later index has started and
+        its arguments parse. Stops at the first call that is not ready.
+        """
+        ready = []
+        while self.next_ready in self.tool_calls:
+            index = self.next_ready
             tc = self.tool_calls[index]
-            try:
-                arguments = json.loads(tc["arguments"])
-            except json.JSONDecodeError:
-                arguments = {}
-            parsed.append({
-                "id": tc["id"],
-                "function": {"name": tc["name"], "arguments": tc["arguments"]},
-                "parsed_arguments": arguments,
-            })
-        return parsed
+            if not tc["name"]:
+                break
+            if not tc["args"].complete and (index + 1) not in self.tool_calls:
+                break
+            parsed = self._parse_tool_call(index, strict=True)
+            if parsed is None:
+                break
+            ready.append(parsed)
+            self.next_ready += 1
+        return ready
 
 
 class ContentStreamExtractor:
-    """Extracts `content` field in real-time from streaming JSON arguments (for file_write)."""
+    """Turns a streaming file_write's decoded argument fields into code-stream deltas."""
 
     def __init__(self):
         self.reset()
 
     def reset(self):
-        self.content_extracted = ""
-        self.escape_next = False
         self.file_path = ""
-        self.file_path_extracted = False
+        self.pending = []
+
+    def process_update(self, update: dict) -> tuple[str, str]:
+        """
+        Return ``(content_delta, file_path)`` for one tool update.
+
+        Content that streams before ``file_path`` is complete is held back
+        and released together with the path.
+        """
+        if not self.file_path and update["args"].has_field("file_path"):
+            self.file_path = str(update["args"].values["file_path"])
+
+        content_delta = update["field_deltas"].get("content")
+        if content_delta:
+            self.pending.append(content_delta)
+        if not self.file_path or not self.pending:
+            return "", self.file_path
 
-    def _extract_file_path(self, json_str: str) -> str:
-        match = re.search(r'"file_path"\s*:\s*"([^"]*)"', json_str)
-        return match.group(1) if match else ""
+        content_delta = "".join(self.pending)
+        self.pending = []
+        return content_delta, self.file_path
 
-    def process_delta(self, arguments_so_far: str) -> tuple[str, str]:
-        if not self.file_path_extracted:
-            self.file_path = self._extract_file_path(arguments_so_far)
-            if self.file_path:
-                self.file_path_extracted = True
 
-        content_match = re.search(r'"content"\s*:\s*"', arguments_so_far)
-        if not content_match:
-            return "", self.file_path
+CANCELLED_TOOL_RESULT = {
+    "success": False,
+    "error": "Cancelled by user before the result was received; the change may or may not have been applied.",
+    "cancelled": True,
+}
 
-        start_idx = content_match.end()
-        new_content = ""
-        i = start_idx + len(self.content_extracted)
-
-        while i < len(arguments_so_far):
-            char = arguments_so_far[i]
-            if self.escape_next:
-                esc_map = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "/": "/"}
-                new_content += esc_map.get(char, char)
-                self.escape_next = False
-            elif char == "\\":
-                self.escape_next = True
-            elif char == '"':
-                break
-            else:
-                new_content += char
-            i += 1
-
-        self.content_extracted += new_content
-        return new_content, self.file_path
+_STREAM_END = object()
 
 
 class ReActAgent:
@@ -156,7 +202,8 @@ class ReActAgent:
       2. LLM returns either:
          a) A tool_call → execute it, append tool result, loop
          b) Final text   → emit complete, stop
-      3. One tool call per iteration (sequential execution)
+      3. All tool calls of a turn are executed before the next LLM call;
+         independent ones run concurrently (see ToolScheduler)
     """
 
     def __init__(
@@ -168,6 +215,9 @@ class ReActAgent:
         session_id: str = "default",
         e2b_template_id: str = "",
         provider: str = "openrouter",
+        fallback: Optional[FallbackTarget] = None,
+        prompt_caching: bool = False,
+        pipelined_tools: bool = False,
     ):
         self.api_key = api_key
         self.model = model
@@ -175,11 +225,21 @@ class ReActAgent:
         self.e2b_api_key = e2b_api_key
         self.e2b_template_id = e2b_template_id
         self.provider = provider
+        self.fallback = fallback
+        self.prompt_caching = prompt_caching
+        self.pipelined_tools = pipelined_tools
         self.context = ContextWindow()
         self.current_iteration = 0
         self.is_running = False
         self.session_id = session_id
         self.sandbox_ready = False
+        self.tool_scheduler = ToolScheduler()
+        self._stop_event = asyncio.Event()
+        self._stop_requested_at: Optional[float] = None
+        self.last_stop_to_idle_ms: Optional[float] = None
+        self.loop_detector = LoopDetector()
+        self.compactor = ContextCompactor(provider, api_key, model)
+        self.history_view = HistoryView()
 
     # ------------------------------------------------------------------
     # Sandbox lifecycle
@@ -209,7 +269,138 @@ class ReActAgent:
     # ------------------------------------------------------------------
 
     def _get_messages(self) -> list:
-        return [{"role": "system", "content": get_system_prompt()}] + self.context.get_messages()
+        messages = self.history_view.apply(self.context.get_active_messages())
+        return [{"role": "system", "content": get_system_prompt()}] + messages
+
+    async def _compact_context(self) -> Optional[dict]:
+        """Compact the context if the next request would come close to the model's context window."""
+        if not CONTEXT_COMPACTION:
+            return None
+        fixed_tokens = estimate_messages_tokens([{"role": "system", "content": get_system_prompt()}], TOOL_SCHEMAS)
+        # The agent may be reused with another provider/model (see main.chat)
+        self.compactor.use_model(self.provider, self.api_key, self.model)
+        return await self.compactor.maybe_compact(self.context, fixed_tokens, view=self.history_view.apply)
+
+    async def _execute_tool(self, tool_name: str, arguments: dict) -> dict:
+        if tool_name in TOOL_EXECUTORS:
+            return await TOOL_EXECUTORS[tool_name](self.session_id, arguments)
+        return {"success": False, "error": f"Unknown tool: {tool_name}"}
+
+    async def _until_stopped(self, stream: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """
+        Iterate ``stream`` until it ends or ``stop()`` is called.
+
+        The stream is driven by its own task so a stop can cancel it while it
+        is waiting on the network; cancellation closes the generator chain
+        down to the httpx response, which aborts the upstream request.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+
+        async def pump():
+            try:
+                async for item in stream:
+                    await queue.put(item)
+            except Exception as e:
+                await queue.put(e)
+            await queue.put(_STREAM_END)
+
+        producer = asyncio.create_task(pump())
+        stop_waiter = asyncio.create_task(self._stop_event.wait())
+        try:
+            while True:
+                if queue.empty():
+                    getter = asyncio.create_task(queue.get())
+                    await asyncio.wait({getter, stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        return
+                    item = getter.result()
+                elif self._stop_event.is_set():
+                    return
+                else:
+                    item = queue.get_nowait()
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop_waiter.cancel()
+            if not producer.done():
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+    async def _wait_unless_stopped(self, task: asyncio.Task) -> bool:
+        """Wait for ``task``; return False if ``stop()`` was called first."""
+        if not task.done():
+            stop_waiter = asyncio.create_task(self._stop_event.wait())
+            try:
+                await asyncio.wait({task, stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                stop_waiter.cancel()
+        return task.done()
+
+    async def _sleep_unless_stopped(self, seconds: float) -> bool:
+        """Sleep up to ``seconds``; return True if ``stop()`` was called meanwhile."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        return self._stop_event.is_set()
+
+    @staticmethod
+    def _task_result(task: asyncio.Task) -> dict:
+        """Result of a finished tool task, or the cancellation placeholder."""
+        if task.done() and not task.cancelled() and task.exception() is None:
+            return task.result()[0]
+        return CANCELLED_TOOL_RESULT
+
+    def _record_cancelled_turn(self, tool_calls: list, tasks: list, content: str) -> None:
+        """
+        Keep the context consistent after a stop mid-stream: calls that were
+        already dispatched are recorded together with a result for each one
+        (real if it finished, a cancellation placeholder otherwise).
+        """
+        dispatched = tool_calls[: len(tasks)]
+        if dispatched:
+            self.context.add_tool_call(
+                [{"id": tc["id"], "function": tc["function"], "type": "function"} for tc in dispatched],
+                content,
+            )
+            for tc, task in zip(dispatched, tasks):
+                name = tc["function"]["name"]
+                self.context.add_tool_result(tc["id"], name, format_tool_result(name, self._task_result(task)))
+        elif content:
+            self.context.add_assistant_message(content)
+
+    def _runner_for(self, stream_writes: dict, tool_call: dict):
+        """Per-call runner override: skip invalid or truncated calls, finish streamed writes."""
+        if tool_call.get("invalid") or tool_call.get("truncated") == INCOMPLETE_ARGUMENTS:
+            result = tool_call.get("invalid") or incomplete_arguments_result(tool_call)
+            # Its content may already be streaming into a temp file that will never be committed
+            writer = stream_writes.pop(tool_call["id"], None)
+            if writer is not None:
+                writer.discard()
+
+            async def skip(tool_name: str, arguments: dict) -> dict:
+                return result
+
+            return skip
+        return self._stream_write_runner(stream_writes, tool_call)
+
+    @staticmethod
+    def _stream_write_runner(stream_writes: dict, tool_call: dict):
+        """Runner that finishes an in-flight streaming write for this call, if any."""
+        writer = stream_writes.get(tool_call["id"])
+        if writer is None or tool_call["function"]["name"] != "file_write":
+            return None
+        return writer.commit
+
+    def _finish_iteration(self, metrics: IterationMetrics) -> dict:
+        """Store the iteration's metrics and build the SSE event for them."""
+        record = metrics.to_dict()
+        self.context.add_iteration_metrics(record)
+        return {"type": "iteration_metrics", **record}
 
     # ------------------------------------------------------------------
     # Main agent loop
@@ -218,6 +409,8 @@ class ReActAgent:
     async def run(self, user_message: str, on_event: Optional[Callable] = None) -> AsyncGenerator:
         self.is_running = True
         self.current_iteration = 0
+        self._stop_event.clear()
+        self._stop_requested_at = None
 
         # --- Sandbox setup ---
         yield {"type": "sandbox_creating", "message": "Creating sandbox..."}
@@ -229,13 +422,20 @@ class ReActAgent:
         yield {"type": "sandbox_ready", "message": "Sandbox ready"}
 
         self.context.add_user_message(user_message)
+        self.loop_detector = LoopDetector()
         yield {"type": "iteration_start", "iteration": 0, "max_iterations": self.max_iterations}
 
+        batch = None
+        stream_writes: dict[str, StreamingFileWrite] = {}
+        continued_text: list[str] = []
         try:
             while self.is_running and self.current_iteration < self.max_iterations:
                 self.current_iteration += 1
                 yield {"type": "iteration", "iteration": self.current_iteration, "max_iterations": self.max_iterations}
 
+                compaction = await self._compact_context()
+                if compaction is not None:
+                    yield {"type": "context_compacted", **compaction, "iteration": self.current_iteration}
                 messages = self._get_messages()
 
                 # --- Stream LLM response (with native tool schemas) ---
@@ -245,23 +445,40 @@ class ReActAgent:
                 has_tool_calls = False
                 finish_reason = None
                 streaming_started: dict[int, bool] = {}
+                batch = self.tool_scheduler.batch(self._execute_tool)
+                # Writers of the previous turn are committed by now; anything left was never dispatched
+                for writer in stream_writes.values():
+                    writer.discard()
+                stream_writes = {}
                 thought_stream_started = False
+                metrics = IterationMetrics(self.current_iteration, self.provider, self.model)
 
-                if self.provider == "groq":
-                    chat_fn = groq_chat_completion
-                elif self.provider == "fireworks":
-                    chat_fn = fireworks_chat_completion
-                else:
-                    chat_fn = openrouter_chat_completion
-
-                async for chunk_event in chat_fn(
+                async for chunk_event in self._until_stopped(resilient_client.chat_completion(
+                    provider=self.provider,
                     api_key=self.api_key,
                     model=self.model,
                     messages=messages,
                     tools=TOOL_SCHEMAS,
-                    stream=True,
-                ):
+                    fallback=self.fallback,
+                    prompt_cache_key=f"vibe-{self.session_id}" if self.prompt_caching else None,
+                )):
+                    if chunk_event.get("type") in ("retry", "failover"):
+                        if chunk_event["type"] == "retry":
+                            metrics.retries += 1
+                        yield {**chunk_event, "type": f"provider_{chunk_event['type']}", "iteration": self.current_iteration}
+                        continue
+
+                    if chunk_event.get("type") == "admission":
+                        metrics.queue_wait += chunk_event["queue_wait"]
+                        yield {
+                            "type": "rate_limit_wait",
+                            "queue_wait": round(chunk_event["queue_wait"], 3),
+                            "iteration": self.current_iteration,
+                        }
+                        continue
+
                     if chunk_event.get("type") == "error":
+                        yield self._finish_iteration(metrics)
                         yield {"type": "error", "error": chunk_event.get("error", "Unknown error")}
                         self.is_running = False
                         return
@@ -272,7 +489,12 @@ class ReActAgent:
                     if chunk_event.get("type") != "chunk":
                         continue
 
+                    if chunk_event["data"].get("usage"):
+                        metrics.record_usage(chunk_event["data"]["usage"])
+
                     parsed = parser.process_chunk(chunk_event["data"])
+                    if parsed["content_delta"] or parsed["tool_updates"]:
+                        metrics.mark_first_token()
 
                     # --- Stream thought/content tokens ---
                     if parsed["content_delta"]:
@@ -292,10 +514,12 @@ class ReActAgent:
                             if index not in content_extractors:
                                 content_extractors[index] = ContentStreamExtractor()
                             extractor = content_extractors[index]
-                            content_delta, file_path = extractor.process_delta(update["arguments_so_far"])
+                            content_delta, file_path = extractor.process_update(update)
 
                             if file_path and index not in streaming_started:
                                 streaming_started[index] = True
+                                if STREAM_FILE_WRITES:
+                                    stream_writes[update["id"]] = StreamingFileWrite(self.session_id, file_path)
                                 yield {
                                     "type": "code_stream_start",
                                     "tool_id": update["id"],
@@ -304,6 +528,8 @@ class ReActAgent:
                                     "iteration": self.current_iteration,
                                 }
                             if content_delta:
+                                if update["id"] in stream_writes:
+                                    stream_writes[update["id"]].feed(content_delta)
                                 yield {
                                     "type": "code_stream_chunk",
                                     "tool_id": update["id"],
@@ -312,15 +538,53 @@ class ReActAgent:
                                     "iteration": self.current_iteration,
                                 }
 
+                    # --- Pipelined mode: start calls whose arguments are complete ---
+                    if self.pipelined_tools and parsed["tool_updates"]:
+                        for tc in parser.pop_ready_tool_calls():
+                            tc = tool_validator.check(tc, self.model)
+                            batch.submit(tc, run=self._runner_for(stream_writes, tc))
+
+                metrics.mark_stream_end()
+                stopped = self._stop_event.is_set()
+                metrics.finish_reason = "cancelled" if stopped else finish_reason
+
                 # --- End thought stream ---
                 if thought_stream_started:
                     yield {"type": "thought_stream_end", "content": accumulated_content, "iteration": self.current_iteration}
                 elif accumulated_content:
                     yield {"type": "thought", "content": accumulated_content, "iteration": self.current_iteration}
 
+                # === STOPPED mid-stream: nothing new is executed ===
+                if stopped:
+                    batch.cancel()
+                    self._record_cancelled_turn(parser.get_parsed_tool_calls(), batch.tasks, accumulated_content)
+                    yield self._finish_iteration(metrics)
+                    break
+
                 # === TOOL CALLS: Execute each tool returned by the API ===
                 if has_tool_calls:
                     tool_calls = parser.get_parsed_tool_calls()
+                    continued_text = []
+
+                    # --- Salvage calls cut off mid-JSON by the output limit; validate the rest ---
+                    for pos, index in enumerate(sorted(parser.tool_calls)):
+                        args = parser.tool_calls[index]["args"]
+                        if pos < len(batch.tasks):
+                            tool_calls[pos] = batch.calls[pos]
+                            continue
+                        if finish_reason != "length" or not is_truncated(args):
+                            tool_calls[pos] = tool_validator.check(tool_calls[pos], self.model)
+                            continue
+                        tool_calls[pos] = salvage_truncated_call(tool_calls[pos], args)
+                        yield {
+                            "type": "generation_truncated",
+                            "kind": "tool_call",
+                            "tool_id": tool_calls[pos]["id"],
+                            "tool_name": tool_calls[pos]["function"]["name"],
+                            "salvaged": tool_calls[pos]["truncated"],
+                            "finish_reason": finish_reason,
+                            "iteration": self.current_iteration,
+                        }
 
                     # Record assistant message with tool_calls in context
                     formatted_tc = [
@@ -328,8 +592,14 @@ class ReActAgent:
                         for tc in tool_calls
                     ]
                     self.context.add_tool_call(formatted_tc, accumulated_content)
-
-                    for i, tc in enumerate(tool_calls):
+                    observed = []
+
+                    # Independent calls run concurrently (calls already started
+                    # in pipelined mode keep their tasks); events and context
+                    # messages are still produced in the order the model issued them.
+                    for tc in tool_calls[len(batch.tasks):]:
+                        batch.submit(tc, run=self._runner_for(stream_writes, tc))
+                    for i, (tc, task) in enumerate(zip(tool_calls, batch.tasks)):
                         tool_name = tc["function"]["name"]
                         tool_id = tc["id"]
                         arguments = tc["parsed_arguments"]
@@ -357,14 +627,17 @@ class ReActAgent:
                         for evt in self._emit_tool_start_events(tool_name, tool_id, arguments):
                             yield evt
 
-                        # --- Execute tool ---
-                        if tool_name in TOOL_EXECUTORS:
-                            result = await TOOL_EXECUTORS[tool_name](self.session_id, arguments)
-                        else:
-                            result = {"success": False, "error": f"Unknown tool: {tool_name}"}
+                        finished = await self._wait_unless_stopped(task)
+                        if not finished:
+                            batch.cancel()
+                            await asyncio.gather(*batch.tasks, return_exceptions=True)
+                        result = self._task_result(task)
+                        if tc.get("truncated"):
+                            result = truncated_result(tc, result)
 
-                        result_str = json.dumps(result)
-                        self.context.add_tool_result(tool_id, tool_name, result_str)
+                        # The context gets a compact encoding; SSE events carry the full result
+                        self.context.add_tool_result(tool_id, tool_name, format_tool_result(tool_name, result))
+                        observed.append((tool_name, arguments, result))
 
                         # --- Emit tool-specific end events for frontend ---
                         for evt in self._emit_tool_end_events(tool_name, tool_id, arguments, result):
@@ -379,12 +652,55 @@ class ReActAgent:
                             "iteration": self.current_iteration,
                         }
 
+                        if not finished:
+                            # Stopped: close every remaining call so no tool_call is left without a result
+                            for later_tc, later_task in zip(tool_calls[i + 1:], batch.tasks[i + 1:]):
+                                later_name = later_tc["function"]["name"]
+                                self.context.add_tool_result(
+                                    later_tc["id"], later_name, format_tool_result(later_name, self._task_result(later_task))
+                                )
+                            break
+
+                    metrics.add_tool_time(batch.elapsed(), calls=len(batch.tasks))
+
+                    yield self._finish_iteration(metrics)
+
+                    # --- Loop detection: feedback, then backoff, then stop ---
+                    verdict = self.loop_detector.observe_turn(observed) if LOOP_DETECTION else None
+                    if verdict is not None:
+                        yield {"type": "loop_detected", **verdict.to_dict(), "iteration": self.current_iteration}
+                        if verdict.action == STOP:
+                            self.is_running = False
+                            break
+                        self.context.add_user_message(verdict.feedback_message())
+                        if verdict.backoff and await self._sleep_unless_stopped(verdict.backoff):
+                            break
+
+                # === TRUNCATED TEXT: keep it and ask the model to continue ===
+                elif (
+                    accumulated_content
+                    and finish_reason == "length"
+                    and len(continued_text) < TRUNCATION_MAX_CONTINUATIONS
+                ):
+                    continued_text.append(accumulated_content)
+                    self.context.add_assistant_message(accumulated_content)
+                    self.context.add_user_message(CONTINUE_TEXT_MESSAGE)
+                    yield {
+                        "type": "generation_truncated",
+                        "kind": "text",
+                        "continuation": len(continued_text),
+                        "finish_reason": finish_reason,
+                        "iteration": self.current_iteration,
+                    }
+                    yield self._finish_iteration(metrics)
+
                 # === FINAL ANSWER: No tool calls, model returned text ===
-                elif accumulated_content and finish_reason == "stop":
+                elif accumulated_content and finish_reason in ("stop", "length"):
                     self.context.add_assistant_message(accumulated_content)
+                    yield self._finish_iteration(metrics)
                     yield {
                         "type": "complete",
-                        "content": accumulated_content,
+                        "content": "".join(continued_text) + accumulated_content,
                         "iteration": self.current_iteration,
                         "total_iterations": self.current_iteration,
                     }
@@ -392,6 +708,7 @@ class ReActAgent:
                     break
 
                 elif not has_tool_calls and not accumulated_content:
+                    yield self._finish_iteration(metrics)
                     yield {
                         "type": "complete",
                         "content": "Task completed.",
@@ -401,9 +718,19 @@ class ReActAgent:
                     self.is_running = False
                     break
 
+                else:
+                    yield self._finish_iteration(metrics)
+
                 await asyncio.sleep(0.05)
 
-            if self.current_iteration >= self.max_iterations:
+            if self._stop_requested_at is not None:
+                self.last_stop_to_idle_ms = round((time.perf_counter() - self._stop_requested_at) * 1000, 1)
+                yield {
+                    "type": "stopped",
+                    "iteration": self.current_iteration,
+                    "stop_to_idle_ms": self.last_stop_to_idle_ms,
+                }
+            elif self.current_iteration >= self.max_iterations:
                 yield {
                     "type": "max_iterations_reached",
                     "iteration": self.current_iteration,
@@ -414,6 +741,10 @@ class ReActAgent:
         except Exception as e:
             yield {"type": "error", "error": str(e), "iteration": self.current_iteration}
         finally:
+            if batch is not None:
+                batch.cancel()
+            for writer in stream_writes.values():
+                writer.discard()
             self.is_running = False
 
     # ------------------------------------------------------------------
@@ -532,7 +863,15 @@ class ReActAgent:
     # ------------------------------------------------------------------
 
     def stop(self):
+        """
+        Request cancellation. Takes effect immediately, not just at the next
+        iteration: the provider stream is closed and in-flight tools are
+        cancelled.
+        """
+        if self.is_running and self._stop_requested_at is None:
+            self._stop_requested_at = time.perf_counter()
         self.is_running = False
+        self._stop_event.set()
 
     async def reset(self):
         self.context.clear()
@@ -548,4 +887,9 @@ class ReActAgent:
             "is_running": self.is_running,
             "messages": self.context.get_messages(),
             "stats": stats,
+            "usage": stats["usage"],
+            "prompt_caching": self.prompt_caching,
+            "last_stop_to_idle_ms": self.last_stop_to_idle_ms,
+            "loop_detection": self.loop_detector.get_stats(),
+            "history_view": self.history_view.get_stats(),
         }
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Compact tool-result encoding for the LLM context.
+
+The SSE ``tool_result`` event carries the full structured result; what is
+stored in the context for the model is formatted per tool:
+
+- ``file_read``: the line-numbered ``content`` only (``raw_content`` is the
+  same file again); contents longer than ``TOOL_RESULT_MAX_CHARS`` keep a
+  head and a tail window of whole lines around an explicit
+  ``[... lines a-b of n omitted; file_read with offset/limit to see them ...]``
+  marker (line numbers are the file's, also for ranged reads)
+- edits: the strings the model just sent (``old_string``, ``new_string``,
+  ``new_str``, ``target_str``) are not echoed back; ``deleted_lines`` is
+  capped at ``TOOL_RESULT_ECHO_CHARS``
+- every other string field is capped at ``TOOL_RESULT_MAX_CHARS`` with a
+  truncation marker
+
+Results stay JSON objects (``success``, ``file_path`` and ``error`` are
+always kept, ``ContextWindow.get_stats`` parses them), encoded without
+whitespace and without ASCII escaping.
+"""
+
+import json
+import os
+
+TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", "16000"))
+TOOL_RESULT_ECHO_CHARS = int(os.getenv("TOOL_RESULT_ECHO_CHARS", "300"))
+
+# Fields that only echo the call's own arguments back
+ECHOED_FIELDS = {
+    "file_read": ("raw_content", "file_name", "lines_read"),
+    "replace_in_file": ("old_string", "new_string"),
+    "insert_line": ("new_str",),
+    "delete_str": ("target_str",),
+}
+CAPPED_FIELDS = {"delete_lines": ("deleted_lines",)}
+
+_HEAD_SHARE = 0.75
+
+
+def _cap(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"\n[... truncated {len(text) - limit} of {len(text)} chars ...]"
+
+
+def window_lines(content: str, limit: int, total_lines: int = 0, first_line: int = 1) -> tuple:
+    """
+    Keep whole lines from the head and the tail of ``content`` within
+    ``limit`` chars. ``first_line`` is the file line number of the first
+    line of ``content``. Returns ``(text, omitted_range)``; ``omitted_range``
+    is None when nothing was cut.
+    """
+    if len(content) <= limit:
+        return content, None
+    lines = content.split("\n")
+    total_lines = total_lines or len(lines)
+
+    head, used = 0, 0
+    while head < len(lines) and used + len(lines[head]) + 1 <= limit * _HEAD_SHARE:
+        used += len(lines[head]) + 1
+        head += 1
+    tail = len(lines)
+    while tail > head and used + len(lines[tail - 1]) + 1 <= limit:
+        used += len(lines[tail - 1]) + 1
+        tail -= 1
+    if head == 0 and tail == len(lines):
+        # A single line longer than the limit: plain truncation marker
+        return _cap(content, limit), None
+
+    omitted = (first_line + head, first_line + tail - 1)
+    marker = f"[... lines {omitted[0]}-{omitted[1]} of {total_lines} omitted; file_read with offset/limit to see them ...]"
+    return "\n".join(lines[:head] + [marker] + lines[tail:]), omitted
+
+
+def compact_result(tool_name: str, result: dict, max_chars: int = 0, echo_chars: int = 0) -> dict:
+    """The model-facing version of ``result`` as a dict."""
+    if not isinstance(result, dict):
+        return {"success": True, "result": _cap(str(result), max_chars or TOOL_RESULT_MAX_CHARS)}
+    max_chars = max_chars or TOOL_RESULT_MAX_CHARS
+    echo_chars = echo_chars or TOOL_RESULT_ECHO_CHARS
+
+    dropped = ECHOED_FIELDS.get(tool_name, ())
+    capped = CAPPED_FIELDS.get(tool_name, ())
+    compact = {}
+    for key, value in result.items():
+        if key in dropped:
+            continue
+        if isinstance(value, str):
+            if key in capped:
+                value = _cap(value, echo_chars)
+            elif tool_name == "file_read" and key == "content":
+                value, omitted = window_lines(
+                    value, max_chars, result.get("total_lines") or 0, result.get("start_line") or 1
+                )
+                if omitted:
+                    compact["omitted_lines"] = f"{omitted[0]}-{omitted[1]}"
+            else:
+                value = _cap(value, max_chars)
+        compact[key] = value
+    return compact
+
+
+def dump_compact(value) -> str:
+    """JSON without whitespace or ASCII escaping; the encoding of everything rewritten in the context."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def format_tool_result(tool_name: str, result: dict) -> str:
+    """Serialized model-facing result, stored in the context instead of ``json.dumps(result)``."""
+    return dump_compact(compact_result(tool_name, result))
@@ -0,0 +1,167 @@
+"""
+Streaming file writes — push ``file_write`` content into the sandbox while
+the LLM is still generating it.
+
+Once a streamed file grows past ``STREAM_WRITE_MIN_BYTES`` a background
+writer is opened in the sandbox (see
+``E2BSandboxManager.open_streaming_write``) and decoded content is sent in
+batches of ``STREAM_WRITE_BATCH_BYTES``. When the tool call executes,
+``commit`` compares the SHA-256 of what was streamed with the final parsed
+``content``: on a match only the tail is sent and the temp file is renamed
+into place; otherwise the temp file is discarded and the normal
+``file_write`` executor runs. Small files never open a writer.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Awaitable, Callable, Optional, Set
+
+from .tool_executor import ensure_home_path, execute_file_write
+from ..services.e2b_sandbox import sandbox_manager
+
+STREAM_FILE_WRITES = os.getenv("STREAM_FILE_WRITES", "true").strip().lower() in ("1", "true", "yes", "on")
+STREAM_WRITE_MIN_BYTES = int(os.getenv("STREAM_WRITE_MIN_BYTES", "16384"))
+STREAM_WRITE_BATCH_BYTES = int(os.getenv("STREAM_WRITE_BATCH_BYTES", "16384"))
+
+# Keeps fire-and-forget aborts alive until they finish
+_background: Set[asyncio.Task] = set()
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+class StreamingFileWrite:
+    """Incremental sandbox write for one streaming ``file_write`` call."""
+
+    def __init__(
+        self,
+        session_id: str,
+        file_path: str,
+        min_bytes: Optional[int] = None,
+        batch_bytes: Optional[int] = None,
+    ):
+        self.session_id = session_id
+        self.file_path = ensure_home_path(file_path)
+        self.min_bytes = STREAM_WRITE_MIN_BYTES if min_bytes is None else min_bytes
+        self.batch_bytes = batch_bytes or STREAM_WRITE_BATCH_BYTES
+
+        self.streamed_bytes = 0
+        self.sent_bytes = 0
+        self.failed = False
+        self.closed = False
+        self._digest = hashlib.sha256()
+        self._buffer: list = []
+        self._buffered = 0
+        self._opened = False
+        self._handle = None
+        self._temp_path: Optional[str] = None
+        self._tail: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Streaming side
+    # ------------------------------------------------------------------
+
+    def feed(self, chunk: str) -> None:
+        """Add decoded content; sandbox I/O is queued, never awaited here."""
+        if self.closed or self.failed or not chunk:
+            return
+        data = _encode(chunk)
+        self._digest.update(data)
+        self.streamed_bytes += len(data)
+        self._buffer.append(chunk)
+        self._buffered += len(data)
+
+        if not self._opened and self.streamed_bytes >= self.min_bytes:
+            self._opened = True
+            self._enqueue(self._open)
+        if self._opened and self._buffered >= self.batch_bytes:
+            self._enqueue(self._flush_buffer())
+
+    def _enqueue(self, step: Callable[[], Awaitable[None]]) -> None:
+        self._tail = asyncio.create_task(self._chain(self._tail, step))
+
+    async def _chain(self, previous: Optional[asyncio.Task], step: Callable[[], Awaitable[None]]) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        if self.failed:
+            return
+        try:
+            await step()
+        except Exception:
+            self.failed = True
+
+    def _flush_buffer(self) -> Callable[[], Awaitable[None]]:
+        data = "".join(self._buffer)
+        self._buffer, self._buffered = [], 0
+
+        async def send() -> None:
+            result = await sandbox_manager.append_streaming_write(self.session_id, self._handle, data)
+            if not result.get("success"):
+                self.failed = True
+            else:
+                self.sent_bytes += result.get("bytes", 0)
+
+        return send
+
+    async def _open(self) -> None:
+        result = await sandbox_manager.open_streaming_write(self.session_id, self.file_path)
+        if not result.get("success"):
+            self.failed = True
+            return
+        self._handle = result["handle"]
+        self._temp_path = result["temp_path"]
+
+    async def _drain(self) -> None:
+        if self._tail is not None:
+            await asyncio.wait([self._tail])
+
+    # ------------------------------------------------------------------
+    # Tool execution side
+    # ------------------------------------------------------------------
+
+    def matches(self, arguments: dict) -> bool:
+        content = arguments.get("content", "")
+        if not isinstance(content, str):
+            return False
+        if ensure_home_path(arguments.get("file_path", "")) != self.file_path:
+            return False
+        data = _encode(content)
+        return len(data) == self.streamed_bytes and hashlib.sha256(data).digest() == self._digest.digest()
+
+    async def commit(self, tool_name: str, arguments: dict) -> dict:
+        """
+        Tool runner for this call: finish the streamed write if it matches
+        the final arguments, otherwise fall back to a regular write.
+        """
+        if self._opened and not self.failed and self.matches(arguments):
+            if self._buffer:
+                self._enqueue(self._flush_buffer())
+            await self._drain()
+            if not self.failed:
+                self.closed = True
+                result = await sandbox_manager.finish_streaming_write(self.session_id, self._handle, self.file_path)
+                if result.get("success"):
+                    self._handle = None
+                    return {**result, "streamed": True}
+                self.failed = True
+        await self.abort()
+        return await execute_file_write(self.session_id, arguments)
+
+    async def abort(self) -> None:
+        """Discard the temp file (if any); the target file is left untouched."""
+        self.closed = True
+        self._buffer = []
+        await self._drain()
+        if self._handle is not None:
+            handle, self._handle = self._handle, None
+            await sandbox_manager.abort_streaming_write(self.session_id, handle, self._temp_path)
+
+    def discard(self) -> None:
+        """Schedule ``abort`` without waiting (used when a run ends early)."""
+        if self._opened and not (self.closed and self._handle is None):
+            task = asyncio.create_task(self.abort())
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        self.closed = True
@@ -0,0 +1,337 @@
+"""
+Incremental JSON parser for streaming tool-call arguments.
+
+Tool-call arguments arrive as many small JSON text deltas. Instead of
+re-scanning the whole accumulated string on every delta (O(n²) over a long
+``file_write``), ``IncrementalJSONParser`` keeps its position and state
+between deltas and decodes the top-level object exactly once:
+
+- string fields are decoded as they stream and reported as deltas
+- ``\\uXXXX`` escapes (including surrogate pairs) are handled even when
+  split across deltas
+- non-string values (numbers, booleans, nested objects/arrays) are
+  collected as raw JSON and decoded when they end
+- ``complete`` flips to True as soon as the closing ``}`` arrives
+
+The parser is lenient in the ways streamed model output needs: raw control
+characters inside strings are kept as-is, and anything after the top-level
+object is ignored.
+"""
+
+import json
+import re
+from json.decoder import scanstring
+from typing import Dict, List, Optional
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+_SPECIAL = re.compile(r'["\\]')
+_HIGH_SURROGATE_PREFIXES = ("d8", "d9", "da", "db")
+_WHITESPACE = " \t\r\n"
+_HEX = frozenset("0123456789abcdefABCDEF")
+
+def _could_be_unicode_escape(tail: str) -> bool:
+    """``tail`` (at most 6 chars) is ``\\uXXXX`` or could still become one."""
+    return "\\u"[:len(tail)] == tail[:2] and all(c in _HEX for c in tail[2:])
+
+
+def _decode(chunk: str) -> str:
+    """Decode the body of a JSON string (no surrounding quotes)."""
+    try:
+        return scanstring(chunk + '"', 0, False)[0]
+    except ValueError:
+        return _decode_lenient(chunk)
+
+
+def _decode_lenient(chunk: str) -> str:
+    """Slow path for invalid escapes: keep what cannot be decoded verbatim."""
+    out, i, n = [], 0, len(chunk)
+    while i < n:
+        ch = chunk[i]
+        if ch != "\\" or i + 1 >= n:
+            out.append(ch)
+            i += 1
+            continue
+        esc = chunk[i + 1]
+        if esc == "u":
+            try:
+                out.append(chr(int(chunk[i + 2 : i + 6], 16)))
+                i += 6
+                continue
+            except ValueError:
+                pass
+        out.append(_ESCAPES.get(esc, esc))
+        i += 2
+    return "".join(out).encode("utf-16", "surrogatepass").decode("utf-16", "surrogatepass")
+
+
+# Parser states
+_EXPECT_OBJECT = 0
+_EXPECT_KEY = 1
+_IN_KEY = 2
+_EXPECT_COLON = 3
+_EXPECT_VALUE = 4
+_IN_STRING = 5
+_IN_RAW = 6
+_EXPECT_COMMA = 7
+_DONE = 8
+
+
+class IncrementalJSONParser:
+    """Single-pass incremental parser for one top-level JSON object."""
+
+    def __init__(self):
+        self.state = _EXPECT_OBJECT
+        self.values: Dict[str, object] = {}
+        self.current_key: Optional[str] = None
+        self.complete = False
+        self.error: Optional[str] = None
+        self.consumed = 0
+
+        self._key_parts: List[str] = []
+        self._string_parts: Dict[str, List[str]] = {}
+        self._raw_parts: List[str] = []
+        self._raw_depth = 0
+        self._raw_in_string = False
+        self._raw_escape = False
+
+        # Raw tail of a string whose escape was split across deltas
+        self._carry = ""
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def feed(self, delta: str) -> Dict[str, str]:
+        """
+        Consume the next chunk of JSON text.
+
+        Returns the newly decoded text of every string field that grew
+        during this chunk, keyed by field name.
+        """
+        self.consumed += len(delta)
+
+        # Fast path: the delta is plain text in the middle of a string value
+        if self.state == _IN_STRING and not self._carry and '"' not in delta and "\\" not in delta:
+            if not delta:
+                return {}
+            self._string_parts[self.current_key].append(delta)
+            return {self.current_key: delta}
+
+        deltas: Dict[str, List[str]] = {}
+        i, n = 0, len(delta)
+
+        while i < n and self.state != _DONE:
+            state = self.state
+            if state == _IN_STRING:
+                key = self.current_key
+                out = deltas.setdefault(key, [])
+                i = self._scan_string(delta, i, out)
+                if self.state != _IN_STRING:
+                    value = "".join(self._string_parts.get(key, ()))
+                    self.values[key] = value
+                continue
+
+            if state == _IN_KEY:
+                i = self._scan_string(delta, i, self._key_parts)
+                if self.state != _IN_KEY:
+                    self.current_key = "".join(self._key_parts)
+                    self._key_parts = []
+                continue
+
+            if state == _IN_RAW:
+                i = self._scan_raw(delta, i)
+                continue
+
+            ch = delta[i]
+            i += 1
+            if ch in _WHITESPACE:
+                continue
+
+            if state == _EXPECT_OBJECT:
+                if ch == "{":
+                    self.state = _EXPECT_KEY
+                else:
+                    self._fail(f"expected '{{', got {ch!r}")
+            elif state == _EXPECT_KEY:
+                if ch == '"':
+                    self.state = _IN_KEY
+                elif ch == "}":
+                    self._finish()
+                elif ch != ",":
+                    self._fail(f"expected key, got {ch!r}")
+            elif state == _EXPECT_COLON:
+                if ch == ":":
+                    self.state = _EXPECT_VALUE
+                else:
+                    self._fail(f"expected ':', got {ch!r}")
+            elif state == _EXPECT_VALUE:
+                if ch == '"':
+                    self.state = _IN_STRING
+                    self._string_parts[self.current_key] = []
+                else:
+                    self.state = _IN_RAW
+                    self._raw_parts = []
+                    self._raw_depth = 0
+                    self._raw_in_string = False
+                    self._raw_escape = False
+                    i -= 1
+            elif state == _EXPECT_COMMA:
+                if ch == ",":
+                    self.state = _EXPECT_KEY
+                elif ch == "}":
+                    self._finish()
+                else:
+                    self._fail(f"expected ',' or '}}', got {ch!r}")
+
+        return {k: "".join(v) for k, v in deltas.items() if v}
+
+    def get_string(self, key: str) -> str:
+        """Decoded value of a string field so far (complete or still streaming)."""
+        parts = self._string_parts.get(key)
+        return "".join(parts) if parts is not None else ""
+
+    def has_field(self, key: str) -> bool:
+        return key in self.values
+
+    def in_string(self, key: str) -> bool:
+        return self.state == _IN_STRING and self.current_key == key
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _fail(self, message: str) -> None:
+        self.error = message
+        self.state = _DONE
+
+    def _finish(self) -> None:
+        self.complete = True
+        self.state = _DONE
+
+    def _after_value(self) -> None:
+        self.state = _EXPECT_COMMA
+
+    def _scan_string(self, text: str, i: int, out: List[str]) -> int:
+        """
+        Decode string content from ``text[i:]`` into ``out`` until the closing quote.
+
+        Complete escapes are decoded in bulk by the C ``scanstring``; an
+        escape cut off by the end of the delta (``\\``, ``\\u12``, or a high
+        surrogate whose low half may follow) is carried into the next feed.
+        """
+        shift = 0
+        if self._carry:
+            shift = len(self._carry) - i
+            text = self._carry + text[i:]
+            i = 0
+            self._carry = ""
+        n = len(text)
+        pos = i
+        has_escape = False
+        closed_at = -1
+        safe = n
+
+        while True:
+            match = _SPECIAL.search(text, pos)
+            if match is None:
+                break
+            b = match.start()
+            if text[b] == '"':
+                closed_at = safe = b
+                break
+            has_escape = True
+            if b + 1 >= n:
+                safe = b
+                break
+            if text[b + 1] != "u":
+                pos = b + 2
+                continue
+            if b + 6 > n:
+                if _could_be_unicode_escape(text[b:]):
+                    safe = b
+                    break
+                pos = b + 2
+                continue
+            if not _could_be_unicode_escape(text[b:b + 6]):
+                # Malformed escape, decoded leniently; it must not swallow a closing quote
+                pos = b + 2
+                continue
+            # A high surrogate is held back only while its low half may still follow
+            if text[b + 2 : b + 4].lower() in _HIGH_SURROGATE_PREFIXES and n - (b + 6) < 6 and (
+                _could_be_unicode_escape(text[b + 6:])
+            ):
+                safe = b
+                break
+            pos = b + 6
+
+        if safe > i:
+            chunk = text[i:safe]
+            decoded = _decode(chunk) if has_escape else chunk
+            out.append(decoded)
+            if self.state == _IN_STRING:
+                self._string_parts[self.current_key].append(decoded)
+
+        if closed_at >= 0:
+            if self.state == _IN_KEY:
+                self.state = _EXPECT_COLON
+            else:
+                self._after_value()
+            return closed_at + 1 - shift
+
+        self._carry = text[safe:]
+        return n - shift
+
+    def _scan_raw(self, text: str, i: int) -> int:
+        """Collect a non-string value until it ends at depth 0."""
+        start = i
+        n = len(text)
+        while i < n:
+            ch = text[i]
+            if self._raw_in_string:
+                if self._raw_escape:
+                    self._raw_escape = False
+                elif ch == "\\":
+                    self._raw_escape = True
+                elif ch == '"':
+                    self._raw_in_string = False
+            elif ch == '"':
+                self._raw_in_string = True
+            elif ch in "{[":
+                self._raw_depth += 1
+            elif ch in "}]":
+                if self._raw_depth == 0:
+                    self._raw_parts.append(text[start:i])
+                    self._end_raw()
+                    if ch == "}":
+                        self._finish()
+                        return i + 1
+                    self._fail("unexpected ']'")
+                    return i + 1
+                self._raw_depth -= 1
+            elif ch == "," and self._raw_depth == 0:
+                self._raw_parts.append(text[start:i])
+                self._end_raw()
+                self.state = _EXPECT_KEY
+                return i + 1
+            i += 1
+        self._raw_parts.append(text[start:i])
+        return i
+
+    def _end_raw(self) -> None:
+        raw = "".join(self._raw_parts).strip()
+        self._raw_parts = []
+        try:
+            self.values[self.current_key] = json.loads(raw)
+        except ValueError:
+            self.values[self.current_key] = raw
+        self._after_value()
@@ -8,80 +8,112 @@ No prompt parsing. No manual routing. Called directly from the agent loop
 after the API returns a structured tool_call object.
 """
 
-from typing import Dict, Optional, Callable, Awaitable
+import asyncio
+import posixpath
+from typing import Dict, List, Optional, Tuple, Callable, Awaitable
 
 from ..services.e2b_sandbox import sandbox_manager
+from .code_search import (
+    GLOB_MAX_RESULTS,
+    SEARCH_MAX_RESULTS,
+    SEARCH_TIMEOUT,
+    build_glob_command,
+    build_search_command,
+    parse_glob_output,
+    parse_search_output,
+)
 
 
 # ---------------------------------------------------------------------------
 # Path helper
 # ---------------------------------------------------------------------------
 
-def _ensure_home_path(file_path: str) -> str:
+def ensure_home_path(file_path: str) -> str:
+    """``file_path`` inside /home/user/; other paths are taken as relative to it."""
     if not file_path.startswith("/home/user/"):
         return f"/home/user/{file_path.lstrip('/')}"
     return file_path
 
 
+def _search_root(path: Optional[str]) -> str:
+    if not path or posixpath.normpath(path) == "/home/user":
+        return "/home/user"
+    return posixpath.normpath(ensure_home_path(path))
+
+
 # ---------------------------------------------------------------------------
 # Individual tool executors
 # ---------------------------------------------------------------------------
 
 async def execute_file_write(session_id: str, arguments: dict) -> dict:
-    file_path = _ensure_home_path(arguments.get("file_path", ""))
+    file_path = ensure_home_path(arguments.get("file_path", ""))
     content = arguments.get("content", "")
     return await sandbox_manager.write_file(session_id, file_path, content)
 
 
+async def execute_file_append(session_id: str, arguments: dict) -> dict:
+    file_path = ensure_home_path(arguments.get("file_path", ""))
+    content = arguments.get("content", "")
+
+    result = await sandbox_manager.edit_file(session_id, file_path, [{"op": "append", "text": content}], missing_ok=True)
+    if not result.get("success"):
+        return _edit_error(result, file_path)
+
+    return {
+        "success": True,
+        "message": f"Appended {len(content.splitlines())} line(s) to {file_path}",
+        "file_path": file_path,
+        "total_lines": result["total_lines"],
+    }
+
+
 async def execute_file_read(session_id: str, arguments: dict) -> dict:
-    file_path = _ensure_home_path(arguments.get("file_path", ""))
-    return await sandbox_manager.read_file(session_id, file_path)
+    file_path = ensure_home_path(arguments.get("file_path", ""))
+    return await sandbox_manager.read_file(
+        session_id,
+        file_path,
+        window=True,
+        offset=arguments.get("offset"),
+        limit=arguments.get("limit"),
+        max_bytes=arguments.get("max_bytes"),
+    )
+
+
+def _parse_target_line(target_line) -> Tuple[int, int, Optional[str]]:
+    """``15`` / ``"15"`` / ``"20-22"`` → ``(start, end, None)``; ``(0, 0, error)`` if invalid."""
+    if isinstance(target_line, int):
+        return target_line, target_line, None
+    if isinstance(target_line, str):
+        target_line = target_line.strip()
+        if "-" in target_line:
+            parts = target_line.split("-", 1)
+            try:
+                return int(parts[0].strip()), int(parts[1].strip()), None
+            except ValueError:
+                return 0, 0, f"Invalid range: '{target_line}'"
+        try:
+            return int(target_line), int(target_line), None
+        except ValueError:
+            return 0, 0, f"Invalid target_line: '{target_line}'"
+    return 0, 0, f"target_line must be int or string"
 
 
-async def _read_raw_content(session_id: str, file_path: str) -> Optional[str]:
-    """Read raw file content (no line numbers) for edit operations."""
-    result = await sandbox_manager.read_file(session_id, file_path)
-    if not result.get("success"):
-        return None
-    raw = result.get("raw_content", "")
-    if raw:
-        return raw
-    content = result.get("content", "")
-    if not content:
-        return None
-    lines = content.split("\n")
-    raw_lines = []
-    for line in lines:
-        if "\t" in line:
-            raw_lines.append(line.split("\t", 1)[1])
-        else:
-            raw_lines.append(line)
-    return "\n".join(raw_lines)
+def _edit_error(result: dict, file_path: str) -> dict:
+    return {"success": False, "error": result.get("error", "Edit failed"), "file_path": file_path}
 
 
 async def execute_replace_in_file(session_id: str, arguments: dict) -> dict:
-    file_path = _ensure_home_path(arguments.get("file_path", ""))
+    file_path = ensure_home_path(arguments.get("file_path", ""))
     old_string = arguments.get("old_string", "")
     new_string = arguments.get("new_string", "")
 
-    raw = await _read_raw_content(session_id, file_path)
-    if raw is None:
-        return {"success": False, "error": f"Could not read {file_path}", "file_path": file_path}
-
-    occurrences = raw.count(old_string)
-    if occurrences == 0:
-        return {
-            "success": False,
-            "error": f"old_string not found in {file_path}",
-            "file_path": file_path,
-        }
-
-    new_content = raw.replace(old_string, new_string)
-    write_result = await sandbox_manager.write_file(session_id, file_path, new_content)
-
-    if not write_result.get("success"):
-        return {"success": False, "error": f"Write failed: {write_result.get('error')}", "file_path": file_path}
+    result = await sandbox_manager.edit_file(
+        session_id, file_path, [{"op": "replace", "old": old_string, "new": new_string}]
+    )
+    if not result.get("success"):
+        return _edit_error(result, file_path)
 
+    occurrences = result["results"][0]["occurrences"]
     return {
         "success": True,
         "message": f"Replaced {occurrences} occurrence(s) in {file_path}",
@@ -93,86 +125,46 @@ async def execute_replace_in_file(session_id: str, arguments: dict) -> dict:
 
 
 async def execute_insert_line(session_id: str, arguments: dict) -> dict:
-    file_path = _ensure_home_path(arguments.get("file_path", ""))
+    file_path = ensure_home_path(arguments.get("file_path", ""))
     insert_at = arguments.get("insert_line", 0)
     new_str = arguments.get("new_str", "")
 
-    raw = await _read_raw_content(session_id, file_path)
-    if raw is None:
-        return {"success": False, "error": f"Could not read {file_path}", "file_path": file_path}
-
-    lines = raw.split("\n")
-    if insert_at < 0 or insert_at > len(lines):
-        return {"success": False, "error": f"Line {insert_at} out of range (0-{len(lines)})", "file_path": file_path}
-
-    new_lines = new_str.split("\n")
-    if insert_at == 0:
-        new_content = new_str + "\n" + raw
-    else:
-        before = "\n".join(lines[:insert_at])
-        after = "\n".join(lines[insert_at:])
-        new_content = before + "\n" + new_str + ("\n" + after if after else "")
-
-    write_result = await sandbox_manager.write_file(session_id, file_path, new_content)
-    if not write_result.get("success"):
-        return {"success": False, "error": f"Write failed: {write_result.get('error')}", "file_path": file_path}
+    result = await sandbox_manager.edit_file(
+        session_id, file_path, [{"op": "insert", "line": insert_at, "text": new_str}]
+    )
+    if not result.get("success"):
+        return _edit_error(result, file_path)
 
+    lines_inserted = result["results"][0]["lines_inserted"]
     return {
         "success": True,
-        "message": f"Inserted {len(new_lines)} line(s) after line {insert_at} in {file_path}",
+        "message": f"Inserted {lines_inserted} line(s) after line {insert_at} in {file_path}",
         "file_path": file_path,
         "insert_line": insert_at,
         "new_str": new_str,
-        "lines_inserted": len(new_lines),
+        "lines_inserted": lines_inserted,
     }
 
 
 async def execute_delete_lines(session_id: str, arguments: dict) -> dict:
-    file_path = _ensure_home_path(arguments.get("file_path", ""))
+    file_path = ensure_home_path(arguments.get("file_path", ""))
     target_line = arguments.get("target_line")
 
-    raw = await _read_raw_content(session_id, file_path)
-    if raw is None:
-        return {"success": False, "error": f"Could not read {file_path}", "file_path": file_path}
+    start, end, error = _parse_target_line(target_line)
+    if error:
+        return {"success": False, "error": error, "file_path": file_path}
 
-    # Parse target_line into start/end
-    if isinstance(target_line, int):
-        start, end = target_line, target_line
-    elif isinstance(target_line, str):
-        target_line = target_line.strip()
-        if "-" in target_line:
-            parts = target_line.split("-", 1)
-            try:
-                start, end = int(parts[0].strip()), int(parts[1].strip())
-            except ValueError:
-                return {"success": False, "error": f"Invalid range: '{target_line}'", "file_path": file_path}
-        else:
-            try:
-                start = end = int(target_line)
-            except ValueError:
-                return {"success": False, "error": f"Invalid target_line: '{target_line}'", "file_path": file_path}
-    else:
-        return {"success": False, "error": f"target_line must be int or string", "file_path": file_path}
-
-    lines = raw.split("\n")
-    total = len(lines)
-
-    if start < 1 or end < start or start > total or end > total:
-        return {"success": False, "error": f"Line range {start}-{end} out of bounds (1-{total})", "file_path": file_path}
-
-    deleted = lines[start - 1 : end]
-    remaining = lines[: start - 1] + lines[end:]
-    new_content = "\n".join(remaining)
-
-    write_result = await sandbox_manager.write_file(session_id, file_path, new_content)
-    if not write_result.get("success"):
-        return {"success": False, "error": f"Write failed: {write_result.get('error')}", "file_path": file_path}
+    result = await sandbox_manager.edit_file(
+        session_id, file_path, [{"op": "delete_lines", "start": start, "end": end}]
+    )
+    if not result.get("success"):
+        return _edit_error(result, file_path)
 
     return {
         "success": True,
         "message": f"Deleted lines {start}-{end} from {file_path}",
         "file_path": file_path,
-        "deleted_lines": "\n".join(deleted),
+        "deleted_lines": result["results"][0]["deleted_lines"],
         "start_line": start,
         "end_line": end,
         "lines_deleted": end - start + 1,
@@ -180,23 +172,12 @@ async def execute_delete_lines(session_id: str, arguments: dict) -> dict:
 
 
 async def execute_delete_str(session_id: str, arguments: dict) -> dict:
-    file_path = _ensure_home_path(arguments.get("file_path", ""))
+    file_path = ensure_home_path(arguments.get("file_path", ""))
     target_str = arguments.get("target_str", "")
 
-    raw = await _read_raw_content(session_id, file_path)
-    if raw is None:
-        return {"success": False, "error": f"Could not read {file_path}", "file_path": file_path}
-
-    count = raw.count(target_str)
-    if count == 0:
-        return {"success": False, "error": f"target_str not found in {file_path}", "file_path": file_path}
-    if count > 1:
-        return {"success": False, "error": f"Multiple occurrences ({count}) found — aborting", "file_path": file_path}
-
-    new_content = raw.replace(target_str, "", 1)
-    write_result = await sandbox_manager.write_file(session_id, file_path, new_content)
-    if not write_result.get("success"):
-        return {"success": False, "error": f"Write failed: {write_result.get('error')}", "file_path": file_path}
+    result = await sandbox_manager.edit_file(session_id, file_path, [{"op": "delete_str", "target": target_str}])
+    if not result.get("success"):
+        return _edit_error(result, file_path)
 
     return {
         "success": True,
@@ -206,15 +187,182 @@ async def execute_delete_str(session_id: str, arguments: dict) -> dict:
     }
 
 
+# Edit type → required fields (same names as the single-edit tools)
+MULTI_EDIT_FIELDS = {
+    "replace_in_file": ("old_string", "new_string"),
+    "insert_line": ("insert_line", "new_str"),
+    "delete_lines": ("target_line",),
+    "delete_str": ("target_str",),
+}
+
+
+def _edit_op(edit: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """One ``multi_edit`` edit → ``(helper op, None)`` or ``(None, error)``."""
+    edit_type = edit.get("type")
+    if edit_type not in MULTI_EDIT_FIELDS:
+        return None, f"Unknown edit type {edit_type!r} (expected one of {', '.join(MULTI_EDIT_FIELDS)})"
+    missing = [name for name in MULTI_EDIT_FIELDS[edit_type] if name not in edit]
+    if missing:
+        return None, f"{edit_type} edit needs {', '.join(missing)}"
+    if edit_type == "replace_in_file":
+        return {"op": "replace", "old": edit["old_string"], "new": edit["new_string"]}, None
+    if edit_type == "insert_line":
+        return {"op": "insert", "line": edit["insert_line"], "text": edit["new_str"]}, None
+    if edit_type == "delete_lines":
+        start, end, error = _parse_target_line(edit["target_line"])
+        return (None, error) if error else ({"op": "delete_lines", "start": start, "end": end}, None)
+    return {"op": "delete_str", "target": edit["target_str"]}, None
+
+
+async def execute_multi_edit(session_id: str, arguments: dict) -> dict:
+    """
+    Apply an ordered list of edits across files. Edits of one file are
+    applied together (one sandbox round trip, all or nothing); files are
+    edited concurrently and independently.
+    """
+    edits = arguments.get("edits")
+    if not isinstance(edits, list) or not edits:
+        return {"success": False, "error": "edits must be a non-empty list"}
+
+    # path → indexes of its edits, in batch order
+    files: Dict[str, List[int]] = {}
+    ops: List[Optional[dict]] = []
+    errors = []
+    for index, edit in enumerate(edits):
+        op, error = _edit_op(edit) if isinstance(edit, dict) else (None, "edit must be an object")
+        file_path = edit.get("file_path") if isinstance(edit, dict) else None
+        if not error and (not isinstance(file_path, str) or not file_path.strip()):
+            error = "missing file_path"
+        if error:
+            errors.append(f"edits[{index}]: {error}")
+            continue
+        ops.append(op)
+        files.setdefault(posixpath.normpath(ensure_home_path(file_path)), []).append(index)
+    if errors:
+        return {"success": False, "error": "Invalid edits, nothing applied: " + "; ".join(errors)}
+
+    outcomes = await asyncio.gather(*(
+        sandbox_manager.edit_file(session_id, path, [ops[i] for i in indexes])
+        for path, indexes in files.items()
+    ))
+
+    results: List[dict] = [{} for _ in edits]
+    file_results = []
+    for (path, indexes), outcome in zip(files.items(), outcomes):
+        ok = bool(outcome.get("success"))
+        failed = outcome.get("failed_op")
+        for position, index in enumerate(indexes):
+            entry = {"index": index, "type": edits[index]["type"], "file_path": path, "success": ok}
+            if ok:
+                op_result = outcome["results"][position]
+                if "deleted_lines" in op_result:
+                    op_result = {"lines_deleted": len(op_result["deleted_lines"].split("\n"))}
+                entry.update(op_result)
+            elif failed is None or failed == position:
+                entry["error"] = outcome.get("error", "Edit failed")
+            else:
+                entry["error"] = f"Not applied: edit {indexes[failed]} in this file failed"
+            results[index] = entry
+        file_results.append({
+            "file_path": path,
+            "success": ok,
+            "edits": len(indexes),
+            **({"total_lines": outcome.get("total_lines")} if ok else {"error": outcome.get("error", "Edit failed")}),
+        })
+
+    applied = sum(1 for entry in results if entry["success"])
+    edited = sum(1 for entry in file_results if entry["success"])
+    result = {
+        "success": applied == len(edits),
+        "message": f"Applied {applied} of {len(edits)} edit(s) in {edited} of {len(files)} file(s)",
+        "files": file_results,
+        "results": results,
+    }
+    if not result["success"]:
+        result["error"] = "; ".join(f"{f['file_path']}: {f['error']}" for f in file_results if not f["success"])
+    return result
+
+
+MAX_CONTEXT_LINES = 10
+
+
+async def _run_search(session_id: str, command: str) -> Tuple[Optional[str], Optional[str]]:
+    """Run a read-only search command → ``(output, None)`` or ``(None, error)``."""
+    result = await sandbox_manager.execute_command(session_id, command, timeout=SEARCH_TIMEOUT, read_only=True)
+    if not result.get("success"):
+        return None, f"Search failed: {result.get('error') or result.get('output', '')}".strip()
+    return result.get("output", ""), None
+
+
+async def execute_search_files(session_id: str, arguments: dict) -> dict:
+    pattern = arguments.get("pattern", "")
+    root = _search_root(arguments.get("path"))
+    max_results = arguments.get("max_results") or SEARCH_MAX_RESULTS
+    command = build_search_command(
+        pattern,
+        root,
+        glob=arguments.get("glob") or None,
+        ignore_case=bool(arguments.get("ignore_case")),
+        fixed_strings=bool(arguments.get("fixed_strings")),
+        context_lines=min(arguments.get("context_lines") or 0, MAX_CONTEXT_LINES),
+        max_results=max_results,
+    )
+    output, error = await _run_search(session_id, command)
+    if error:
+        return {"success": False, "error": error, "pattern": pattern, "path": root}
+
+    parsed = parse_search_output(output, max_results)
+    errors = parsed.pop("errors")
+    if errors and not parsed["matches"]:
+        return {"success": False, "error": "\n".join(errors), "pattern": pattern, "path": root}
+
+    if not parsed["matches"]:
+        message = f"No matches for {pattern!r} in {root}"
+    else:
+        message = f"Found {parsed['matches']} match(es) in {parsed['files']} file(s)"
+        if parsed["truncated"]:
+            message += f" (stopped at {max_results}; narrow the pattern, path or glob, or raise max_results)"
+    result = {"success": True, "message": message, "pattern": pattern, "path": root, **parsed}
+    if errors:
+        result["warnings"] = errors[:5]
+    return result
+
+
+async def execute_glob_files(session_id: str, arguments: dict) -> dict:
+    pattern = arguments.get("pattern", "")
+    root = _search_root(arguments.get("path"))
+    max_results = arguments.get("max_results") or GLOB_MAX_RESULTS
+    output, error = await _run_search(session_id, build_glob_command(pattern, root, max_results))
+    if error:
+        return {"success": False, "error": error, "pattern": pattern, "path": root}
+
+    parsed = parse_glob_output(output, pattern, max_results)
+    errors = parsed.pop("errors")
+    if errors and not parsed["count"]:
+        return {"success": False, "error": "\n".join(errors), "pattern": pattern, "path": root}
+
+    if not parsed["count"]:
+        message = f"No files match {pattern!r} in {root}"
+    else:
+        message = f"Found {parsed['count']} file(s)"
+        if parsed["truncated"]:
+            message += f" (showing the first {max_results}; narrow the pattern or path, or raise max_results)"
+    return {"success": True, "message": message, "pattern": pattern, "path": root, **parsed}
+
+
 # ---------------------------------------------------------------------------
 # Tool registry — maps tool name → executor function
 # ---------------------------------------------------------------------------
 
 TOOL_EXECUTORS: Dict[str, Callable[..., Awaitable[dict]]] = {
     "file_write": execute_file_write,
+    "file_append": execute_file_append,
     "file_read": execute_file_read,
     "replace_in_file": execute_replace_in_file,
     "insert_line": execute_insert_line,
     "delete_lines": execute_delete_lines,
     "delete_str": execute_delete_str,
+    "multi_edit": execute_multi_edit,
+    "search_files": execute_search_files,
+    "glob_files": execute_glob_files,
 }
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Tool Scheduler — runs the tool calls of one assistant turn concurrently.
+
+Each call is classified by the file it touches and whether it reads or
+writes it. Calls that do not conflict run in parallel (bounded per
+session); a call waits for every earlier call it conflicts with:
+
+- two calls on the same path conflict unless both are reads
+- a scan (code search) reads every file: it conflicts with all writes
+- a call whose tool is not classified is exclusive: it waits for all
+  earlier calls and all later calls wait for it
+
+The caller awaits the returned tasks in the original order, so context
+messages and SSE start/end events keep the order the model issued them in.
+In pipelined mode calls are submitted one by one while the LLM is still
+streaming later calls of the same turn.
+"""
+
+import asyncio
+import os
+import posixpath
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from .tool_executor import ensure_home_path
+
+READ = "read"
+WRITE = "write"
+SCAN = "scan"
+EXCLUSIVE = "exclusive"
+
+# Tool name → access mode on its ``file_path`` argument
+TOOL_ACCESS = {
+    "file_read": READ,
+    "file_write": WRITE,
+    "file_append": WRITE,
+    "replace_in_file": WRITE,
+    "insert_line": WRITE,
+    "delete_lines": WRITE,
+    "delete_str": WRITE,
+    "search_files": SCAN,
+    "glob_files": SCAN,
+}
+
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+
+
+@dataclass(frozen=True)
+class ToolAccess:
+    mode: str
+    path: Optional[str] = None
+
+    def conflicts_with(self, other: "ToolAccess") -> bool:
+        if self.mode == EXCLUSIVE or other.mode == EXCLUSIVE:
+            return True
+        if self.mode == SCAN or other.mode == SCAN:
+            return self.mode == WRITE or other.mode == WRITE
+        if self.path != other.path:
+            return False
+        return self.mode == WRITE or other.mode == WRITE
+
+
+def classify_tool_call(tool_name: str, arguments: dict) -> ToolAccess:
+    mode = TOOL_ACCESS.get(tool_name)
+    if mode == SCAN:
+        return ToolAccess(SCAN)
+    file_path = arguments.get("file_path") if isinstance(arguments, dict) else None
+    if mode is None or not isinstance(file_path, str) or not file_path:
+        return ToolAccess(EXCLUSIVE)
+    return ToolAccess(mode, posixpath.normpath(ensure_home_path(file_path)))
+
+
+ToolRunner = Callable[[str, dict], Awaitable[dict]]
+
+
+class ToolBatch:
+    """The calls of one assistant turn; calls may be submitted while the turn still streams."""
+
+    def __init__(self, scheduler: "ToolScheduler", run: ToolRunner):
+        self.scheduler = scheduler
+        self.run = run
+        self.calls: List[dict] = []
+        self.tasks: List[asyncio.Task] = []
+        self.accesses: List[ToolAccess] = []
+        self.started: Optional[float] = None
+
+    def submit(self, tool_call: dict, run: Optional[ToolRunner] = None) -> asyncio.Task:
+        """
+        Start ``tool_call`` (parsed form, see
+        ``StreamingToolParser.get_parsed_tool_calls``) after the earlier
+        calls it conflicts with. ``run`` overrides the batch's runner for
+        this call. The task resolves to ``(result, seconds)``.
+        """
+        if self.started is None:
+            self.started = time.perf_counter()
+        tool_name = tool_call["function"]["name"]
+        arguments = tool_call["parsed_arguments"]
+        access = classify_tool_call(tool_name, arguments)
+        deps = [task for task, prior in zip(self.tasks, self.accesses) if access.conflicts_with(prior)]
+        task = asyncio.create_task(self.scheduler._run_after(deps, run or self.run, tool_name, arguments))
+        self.calls.append(tool_call)
+        self.tasks.append(task)
+        self.accesses.append(access)
+        return task
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started if self.started is not None else 0.0
+
+    def cancel(self) -> None:
+        for task in self.tasks:
+            if not task.done():
+                task.cancel()
+
+
+class ToolScheduler:
+    """Per-session scheduler; ``max_concurrency`` bounds calls in flight."""
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max(1, max_concurrency or TOOL_MAX_CONCURRENCY)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def batch(self, run: ToolRunner) -> ToolBatch:
+        return ToolBatch(self, run)
+
+    def launch(self, tool_calls: List[dict], run: ToolRunner) -> ToolBatch:
+        """Start every call of a finished turn at once."""
+        batch = self.batch(run)
+        for tc in tool_calls:
+            batch.submit(tc)
+        return batch
+
+    async def _run_after(self, deps: List[asyncio.Task], run: ToolRunner, tool_name: str, arguments: dict):
+        if deps:
+            await asyncio.wait(deps)
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                result = await run(tool_name, arguments)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            return result, time.perf_counter() - started
@@ -30,17 +30,53 @@ TOOL_SCHEMAS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "file_append",
+            "description": "Append content to the end of a file (created if missing). Use to continue a file whose write was cut off, or to write a very large file in several parts.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Absolute path starting with /home/user/."
+                    },
+                    "content": {
+                        "type": "string",
+                        "description": "Text to append, starting exactly where the file currently ends."
+                    }
+                },
+                "required": ["file_path", "content"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
             "name": "file_read",
-            "description": "Read the content of an existing file from the sandbox. Returns content with line numbers.",
+            "description": "Read the content of an existing file from the sandbox. Returns content with line numbers and total_lines. Large files return only the first lines (truncated: true); use offset/limit to read the rest. Binary files are reported by size and type.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "file_path": {
                         "type": "string",
                         "description": "Absolute path starting with /home/user/. Example: /home/user/project/src/main.py"
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "First line to read (1-based). Default: 1."
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Number of lines to read. Default: the whole file if small, else a window of first lines."
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum bytes of content to return (whole lines). Raise it to read a large window at once."
                     }
                 },
                 "required": ["file_path"]
@@ -139,4 +175,129 @@ TOOL_SCHEMAS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "multi_edit",
+            "description": "Apply several edits, across one or more files, in a single call. Prefer this over many separate replace_in_file/insert_line/delete_lines/delete_str calls (refactors, renames, multi-file fixes). Edits run in order; the edits of each file are applied all-or-nothing. Line numbers always refer to the file as it was before this call (as shown by file_read), even after earlier edits in the batch added or removed lines.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "edits": {
+                        "type": "array",
+                        "description": "Ordered list of edits.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "file_path": {
+                                    "type": "string",
+                                    "description": "Absolute path starting with /home/user/."
+                                },
+                                "type": {
+                                    "type": "string",
+                                    "enum": ["replace_in_file", "insert_line", "delete_lines", "delete_str"],
+                                    "description": "Kind of edit; takes the same fields as the tool of that name."
+                                },
+                                "old_string": {
+                                    "type": "string",
+                                    "description": "replace_in_file: exact text to replace."
+                                },
+                                "new_string": {
+                                    "type": "string",
+                                    "description": "replace_in_file: replacement text."
+                                },
+                                "insert_line": {
+                                    "type": "integer",
+                                    "description": "insert_line: line number AFTER which new_str is inserted (0 = beginning)."
+                                },
+                                "new_str": {
+                                    "type": "string",
+                                    "description": "insert_line: content to insert."
+                                },
+                                "target_line": {
+                                    "type": ["integer", "string"],
+                                    "description": "delete_lines: line number (e.g. 15) or range (e.g. '20-22'). 1-based."
+                                },
+                                "target_str": {
+                                    "type": "string",
+                                    "description": "delete_str: exact text to delete (must occur once)."
+                                }
+                            },
+                            "required": ["file_path", "type"]
+                        }
+                    }
+                },
+                "required": ["edits"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_files",
+            "description": "Search file contents under a directory in one call (ripgrep/grep). Use this to find definitions, usages, imports or strings instead of reading files one by one. Returns matching lines grouped by file with line numbers (':' = match, '-' = context line). Skips node_modules, .git, dist, build and binary files.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "Regular expression to search for (extended regex syntax). Example: 'function\\s+handleSubmit'"
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Directory to search, starting with /home/user/. Default: /home/user"
+                    },
+                    "glob": {
+                        "type": "string",
+                        "description": "Only search files whose name matches this glob. Example: '*.tsx'"
+                    },
+                    "ignore_case": {
+                        "type": "boolean",
+                        "description": "Case-insensitive search. Default: false."
+                    },
+                    "fixed_strings": {
+                        "type": "boolean",
+                        "description": "Treat pattern as literal text, not a regex. Default: false."
+                    },
+                    "context_lines": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Lines of context before and after each match (at most 10). Default: 0."
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of matching lines. Default: 100."
+                    }
+                },
+                "required": ["pattern"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "glob_files",
+            "description": "List files matching a glob pattern under a directory in one call. Use this to explore project structure or find files by name. '**' matches any number of directories; a pattern without '/' matches file names anywhere. Skips node_modules, .git, dist and build.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "pattern": {
+                        "type": "string",
+                        "description": "Glob pattern relative to path. Examples: '*.py', 'src/**/*.tsx', '**/test_*.py'"
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Directory to search, starting with /home/user/. Default: /home/user"
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of files to return. Default: 200."
+                    }
+                },
+                "required": ["pattern"]
+            }
+        }
+    },
     ]
\ No newline at end of file
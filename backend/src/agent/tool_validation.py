@@ -0,0 +1,334 @@
+"""
+Tool-argument validation and JSON repair.
+
+Runs between parsing a tool call and executing it, so a malformed call is
+answered with a precise error before any sandbox I/O:
+
+1. Parse: ``json.loads``; on failure, a cheap repair pass fixes the usual
+   model mistakes (raw newlines/control characters in strings, trailing
+   commas, code fences, unterminated strings and missing closers).
+2. Validate against ``TOOL_SCHEMAS`` with validators compiled once at
+   import: required fields, JSON types (numeric strings are coerced for
+   integer fields), enums, minimums, nested arrays/objects, and non-empty
+   paths/search strings.
+
+Outcomes are counted per model (valid / repaired / invalid) for
+``/api/providers/health``.
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .tool_schemas import TOOL_SCHEMAS
+
+# Fields that must not be empty strings even though the schema only says "string"
+NON_EMPTY_FIELDS = {"file_path", "old_string", "target_str", "pattern"}
+
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_INTEGER = re.compile(r"^-?\d+$")
+
+_JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+
+# ---------------------------------------------------------------------------
+# JSON repair
+# ---------------------------------------------------------------------------
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    i = len(out) - 1
+    while i >= 0 and out[i] in " \t\r\n":
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+        return True
+    return False
+
+
+def _repair_pass(text: str, repairs: List[str]) -> str:
+    """One string-aware pass over ``text`` applying structural repairs."""
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escape = False
+    control = trailing = False
+
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch < " ":
+                out.append(_CONTROL_ESCAPES.get(ch, f"\\u{ord(ch):04x}"))
+                control = True
+                continue
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            trailing |= _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+        out.append(ch)
+
+    if control:
+        repairs.append("control_characters")
+    if trailing:
+        repairs.append("trailing_comma")
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+        repairs.append("unterminated_string")
+    if stack:
+        if _strip_trailing_comma(out):
+            repairs.append("trailing_comma")
+        tail = "".join(out).rstrip()
+        if tail.endswith(":"):
+            out.append("null")
+        while stack:
+            out.append("}" if stack.pop() == "{" else "]")
+        repairs.append("missing_closers")
+    return "".join(out)
+
+
+def parse_arguments(raw: str) -> Tuple[Optional[Any], List[str], Optional[str]]:
+    """
+    Parse tool-call arguments, repairing them if needed.
+
+    Returns ``(value, repairs, error)``; ``value`` is None when even the
+    repaired text does not parse, and ``error`` describes the original
+    decode failure.
+    """
+    text = (raw or "").strip()
+    if not text:
+        return {}, [], None
+    try:
+        return json.loads(text), [], None
+    except json.JSONDecodeError as e:
+        error = f"{e.msg} at line {e.lineno} column {e.colno}"
+
+    repairs: List[str] = []
+    try:
+        # Raw newlines/tabs inside strings: the most common mistake, and cheap
+        value = json.loads(text, strict=False)
+        return value, ["control_characters"], None
+    except json.JSONDecodeError:
+        pass
+
+    if text.startswith("```"):
+        text = _CODE_FENCE.sub("", text)
+        repairs.append("code_fence")
+    repaired = _repair_pass(text, repairs)
+    try:
+        return json.loads(repaired), repairs, None
+    except json.JSONDecodeError:
+        return None, repairs, error
+
+
+# ---------------------------------------------------------------------------
+# Schema validators
+# ---------------------------------------------------------------------------
+
+# A compiled validator returns (possibly coerced value, errors, coercions)
+Validator = Callable[[Any, str], Tuple[Any, List[str], int]]
+
+
+def _type_name(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if value is None:
+        return "null"
+    for name in ("string", "integer", "number", "array", "object"):
+        if isinstance(value, _JSON_TYPES[name]):
+            return name
+    return type(value).__name__
+
+
+def _matches_type(value: Any, type_name: str) -> bool:
+    if isinstance(value, bool) and type_name in ("integer", "number"):
+        return False
+    return isinstance(value, _JSON_TYPES.get(type_name, (object,)))
+
+
+def _compile(schema: dict) -> Validator:
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    enum = schema.get("enum")
+    minimum = schema.get("minimum")
+    item_validator = _compile(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    properties = {
+        name: _compile(sub) for name, sub in (schema.get("properties") or {}).items()
+    }
+    required = tuple(schema.get("required") or ())
+
+    def validate(value: Any, path: str) -> Tuple[Any, List[str], int]:
+        coerced = 0
+        if types and not any(_matches_type(value, t) for t in types):
+            if "integer" in types and isinstance(value, str) and _INTEGER.match(value.strip()):
+                value, coerced = int(value.strip()), 1
+            else:
+                expected = " or ".join(types)
+                return value, [f"'{path}' must be {expected}, got {_type_name(value)}"], 0
+
+        errors: List[str] = []
+        if enum is not None and value not in enum:
+            errors.append(f"'{path}' must be one of {enum}, got {value!r}")
+        if minimum is not None and _matches_type(value, "number") and value < minimum:
+            errors.append(f"'{path}' must be >= {minimum}, got {value}")
+        if isinstance(value, str) and not value.strip() and path.rsplit(".", 1)[-1] in NON_EMPTY_FIELDS:
+            errors.append(f"'{path}' must not be empty")
+
+        if isinstance(value, list) and item_validator is not None:
+            items = []
+            for i, item in enumerate(value):
+                item, item_errors, item_coerced = item_validator(item, f"{path}[{i}]")
+                items.append(item)
+                errors.extend(item_errors)
+                coerced += item_coerced
+            value = items
+
+        if isinstance(value, dict) and (properties or required):
+            value = dict(value)
+            for name in required:
+                if name not in value:
+                    errors.append(f"missing required argument '{_join(path, name)}'")
+            for name, sub_validator in properties.items():
+                if name in value:
+                    value[name], sub_errors, sub_coerced = sub_validator(value[name], _join(path, name))
+                    errors.extend(sub_errors)
+                    coerced += sub_coerced
+        return value, errors, coerced
+
+    return validate
+
+
+def _join(path: str, name: str) -> str:
+    return f"{path}.{name}" if path else name
+
+
+# ---------------------------------------------------------------------------
+# Per-model statistics
+# ---------------------------------------------------------------------------
+
+class ToolCallStats:
+    """Counts valid / repaired / invalid tool calls per model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, dict] = {}
+
+    def record(self, model: str, repairs: List[str], invalid: bool) -> None:
+        with self._lock:
+            entry = self._models.setdefault(
+                model, {"calls": 0, "repaired": 0, "invalid": 0, "repairs": Counter()}
+            )
+            entry["calls"] += 1
+            if repairs:
+                entry["repaired"] += 1
+                entry["repairs"].update(repairs)
+            if invalid:
+                entry["invalid"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                model: {
+                    "calls": e["calls"],
+                    "repaired": e["repaired"],
+                    "invalid": e["invalid"],
+                    "repair_rate": round(e["repaired"] / e["calls"], 3) if e["calls"] else 0.0,
+                    "invalid_rate": round(e["invalid"] / e["calls"], 3) if e["calls"] else 0.0,
+                    "repairs": dict(e["repairs"]),
+                }
+                for model, e in self._models.items()
+            }
+
+
+# ---------------------------------------------------------------------------
+# Validator
+# ---------------------------------------------------------------------------
+
+class ToolArgumentValidator:
+    """Validators for every tool in ``schemas``, compiled once."""
+
+    def __init__(self, schemas: list, stats: Optional[ToolCallStats] = None):
+        self.validators: Dict[str, Validator] = {
+            tool["function"]["name"]: _compile(tool["function"].get("parameters") or {})
+            for tool in schemas
+        }
+        self.stats = stats or ToolCallStats()
+
+    def check(self, tool_call: dict, model: str = "") -> dict:
+        """
+        Return a copy of ``tool_call`` (parsed form) with repaired/coerced
+        ``parsed_arguments``. Invalid calls carry an ``invalid`` result
+        dict to send back to the model instead of executing them.
+        """
+        name = tool_call["function"]["name"]
+        raw = tool_call["function"].get("arguments", "")
+        checked = dict(tool_call)
+
+        validator = self.validators.get(name)
+        if validator is None:
+            available = ", ".join(sorted(self.validators))
+            return self._invalid(checked, model, [], f"Unknown tool '{name}'. Available tools: {available}.")
+
+        if "arguments_error" in tool_call:
+            arguments, repairs, error = parse_arguments(raw)
+        else:
+            arguments, repairs, error = tool_call["parsed_arguments"], [], None
+        if arguments is None:
+            return self._invalid(checked, model, repairs, f"Arguments for {name} are not valid JSON ({error}).")
+        if not isinstance(arguments, dict):
+            return self._invalid(
+                checked, model, repairs, f"Arguments for {name} must be a JSON object, got {_type_name(arguments)}."
+            )
+
+        arguments, errors, coerced = validator(arguments, "")
+        if coerced:
+            repairs = repairs + ["coerced_types"]
+        checked["parsed_arguments"] = arguments
+        if repairs:
+            checked["function"] = {"name": name, "arguments": json.dumps(arguments)}
+            checked["repairs"] = repairs
+        if errors:
+            return self._invalid(checked, model, repairs, f"Invalid arguments for {name}: " + "; ".join(errors) + ".")
+
+        self.stats.record(model, repairs, invalid=False)
+        return checked
+
+    def _invalid(self, checked: dict, model: str, repairs: List[str], message: str) -> dict:
+        self.stats.record(model, repairs, invalid=True)
+        try:
+            json.loads(checked["function"].get("arguments") or "{}")
+        except json.JSONDecodeError:
+            # Never put unparseable JSON into the conversation history
+            checked["function"] = {"name": checked["function"]["name"], "arguments": "{}"}
+        checked["invalid"] = {
+            "success": False,
+            "error": f"{message} The tool was not run; fix the arguments and call it again.",
+            "invalid_arguments": True,
+        }
+        return checked
+
+
+tool_call_stats = ToolCallStats()
+tool_validator = ToolArgumentValidator(TOOL_SCHEMAS, tool_call_stats)
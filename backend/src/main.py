@@ -1,21 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from contextlib import asynccontextmanager
 import json
 import asyncio
 import logging
 
+import anyio
+
 from .agent.react_agent import ReActAgent
-from .services.openrouter import fetch_models as openrouter_fetch_models
-from .services.groq import fetch_models as groq_fetch_models
-from .services.fireworks import fetch_models as fireworks_fetch_models
+from .agent.metrics import aggregate_metrics
+from .agent.tool_validation import tool_call_stats
+from .services.providers import get_provider, list_providers
 from .services.e2b_sandbox import sandbox_manager
+from .services.http_pool import provider_pool
+from .services.model_cache import model_cache, query_models
+from .services.resilience import FallbackTarget, resilient_client
+from .services.rate_limiter import admission_controller
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Vibe Coder API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared provider connection pool on startup and close it on shutdown."""
+    await provider_pool.start(warmup_urls=[p.base_url for p in list_providers()])
+    try:
+        yield
+    finally:
+        await provider_pool.close()
+
+
+app = FastAPI(title="Vibe Coder API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,11 +54,21 @@ class ChatRequest(BaseModel):
     e2b_api_key: Optional[str] = None
     e2b_template_id: Optional[str] = None
     provider: Optional[str] = "openrouter"
+    fallback_provider: Optional[str] = None
+    fallback_model: Optional[str] = None
+    fallback_api_key: Optional[str] = None
+    prompt_caching: bool = False
+    pipelined_tools: bool = False
 
 
 class ModelsRequest(BaseModel):
     api_key: str
     provider: Optional[str] = "openrouter"
+    search: Optional[str] = None
+    supports_tools: Optional[bool] = None
+    offset: int = 0
+    limit: Optional[int] = None
+    refresh: bool = False
 
 
 class FileReadRequest(BaseModel):
@@ -59,21 +87,63 @@ def health_check():
 
 @app.post("/api/models")
 async def get_models(request: ModelsRequest):
-    """Fetch all available models from the selected provider."""
-    provider = request.provider or "openrouter"
-    if provider == "groq":
-        result = await groq_fetch_models(request.api_key)
-    elif provider == "fireworks":
-        result = await fireworks_fetch_models(request.api_key)
-    else:
-        result = await openrouter_fetch_models(request.api_key)
+    """
+    Fetch available models from the selected provider.
+
+    Results come from the server-side model catalogue cache and can be
+    searched, filtered and paginated. Without ``limit`` the full
+    (filtered) list is returned.
+    """
+    provider = get_provider(request.provider)
+    result = await model_cache.get(provider, request.api_key, force_refresh=request.refresh)
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("error"))
-    return result
+
+    models, total = query_models(
+        result.get("models", []),
+        search=request.search,
+        supports_tools=request.supports_tools,
+        offset=request.offset,
+        limit=request.limit,
+    )
+    return {
+        **result,
+        "models": models,
+        "total": total,
+        "offset": request.offset,
+        "limit": request.limit,
+    }
+
+
+@app.get("/api/providers")
+def get_providers():
+    """List registered LLM providers and their capability flags."""
+    return {"providers": [p.describe() for p in list_providers()]}
+
+
+@app.get("/api/providers/health")
+def get_providers_health():
+    """Retry counters, circuit breaker states, rate-limit queues and tool-call repair rates."""
+    return {
+        "completions": resilient_client.get_stats(),
+        "rate_limits": admission_controller.get_stats(),
+        "model_cache": model_cache.get_stats(),
+        "pool": provider_pool.get_stats(),
+        "tool_calls": tool_call_stats.get_stats(),
+    }
+
+
+async def _stop_on_disconnect(http_request: Request, agent: ReActAgent, interval: float = 0.5):
+    """Stop the agent as soon as the SSE client goes away."""
+    while True:
+        await asyncio.sleep(interval)
+        if await http_request.is_disconnected():
+            agent.stop()
+            return
 
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Start a chat with the agent using SSE streaming.
     Requires E2B API key for sandbox operations.
@@ -97,6 +167,13 @@ async def chat(request: ChatRequest):
         )
     
     provider = request.provider or "openrouter"
+    fallback = None
+    if request.fallback_provider and request.fallback_model:
+        fallback = FallbackTarget(
+            provider=request.fallback_provider,
+            model=request.fallback_model,
+            api_key=request.fallback_api_key,
+        )
     
     if session_id not in agents:
         agents[session_id] = ReActAgent(
@@ -107,6 +184,9 @@ async def chat(request: ChatRequest):
             session_id=session_id,
             e2b_template_id=request.e2b_template_id or "",
             provider=provider,
+            fallback=fallback,
+            prompt_caching=request.prompt_caching,
+            pipelined_tools=request.pipelined_tools,
         )
     else:
         agents[session_id].api_key = request.api_key
@@ -115,18 +195,30 @@ async def chat(request: ChatRequest):
         agents[session_id].session_id = session_id
         agents[session_id].e2b_template_id = request.e2b_template_id or ""
         agents[session_id].provider = provider
+        agents[session_id].fallback = fallback
+        agents[session_id].prompt_caching = request.prompt_caching
+        agents[session_id].pipelined_tools = request.pipelined_tools
     
     agent = agents[session_id]
     
     async def event_generator():
+        events = agent.run(request.message)
+        watcher = asyncio.create_task(_stop_on_disconnect(http_request, agent))
         try:
-            async for event in agent.run(request.message):
+            async for event in events:
                 yield f"data: {json.dumps(event)}\n\n"
                 await asyncio.sleep(0.01)
             
             yield f"data: {json.dumps({'type': 'stream_end'})}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        finally:
+            watcher.cancel()
+            if agent.is_running:
+                # Client disconnected mid-run: abort the provider request and tools
+                agent.stop()
+            with anyio.CancelScope(shield=True):
+                await events.aclose()
     
     return StreamingResponse(
         event_generator(),
@@ -175,8 +267,10 @@ async def get_memory(session_id: str = "default"):
                 "tool_calls": 0,
                 "files_created": 0,
                 "files_in_context": [],
-                "file_types": {}
-            }
+                "file_types": {},
+                "usage": aggregate_metrics([]),
+            },
+            "usage": aggregate_metrics([]),
         }
     
     return agents[session_id].get_memory()
@@ -6,15 +6,61 @@ Uses the base template for maximum flexibility.
 """
 
 import asyncio
-from typing import Optional, Dict, List
-from e2b import AsyncSandbox
+import base64
+import difflib
+import inspect
+import json
+import os
+import posixpath
+import shlex
+import uuid
+from typing import Optional, Dict, List, Tuple
+from e2b import AsyncSandbox, CommandExitException, NotFoundException
 from e2b.sandbox.filesystem.filesystem import FileType
 
+from . import sandbox_edit_helper
+from .file_cache import CachedFile, file_cache
+from .sandbox_edit_helper import (
+    EditError,
+    apply_ops,
+    binary_type,
+    digest,
+    is_binary,
+    line_window,
+    total_lines,
+)
+
 
 # Maximum timeout: 24 hours for Pro users, 1 hour for Hobby users
 MAX_TIMEOUT_SECONDS = 86400  # 24 hours
 DEFAULT_TIMEOUT_SECONDS = 3600  # 1 hour (hobby plan safe default)
 
+# In-sandbox edit helper (see sandbox_edit_helper.py)
+SANDBOX_EDIT_HELPER = os.getenv("SANDBOX_EDIT_HELPER", "true").strip().lower() in ("1", "true", "yes", "on")
+# Larger requests fall back to read-modify-write (one argv string is capped at 128 KiB)
+SANDBOX_EDIT_MAX_PAYLOAD = int(os.getenv("SANDBOX_EDIT_MAX_PAYLOAD", "65536"))
+# Cached files smaller than this are edited with a plain write (one round trip either way)
+SANDBOX_EDIT_MIN_BYTES = int(os.getenv("SANDBOX_EDIT_MIN_BYTES", "16384"))
+EDIT_HELPER_PATH = "/tmp/.sandbox_edit_helper.py"
+EDIT_HELPER_SOURCE = inspect.getsource(sandbox_edit_helper)
+
+# Ranged file_read (see read_file)
+FILE_READ_MAX_BYTES = int(os.getenv("FILE_READ_MAX_BYTES", "65536"))
+FILE_READ_WINDOW_LINES = int(os.getenv("FILE_READ_WINDOW_LINES", "1000"))
+# Larger files are windowed inside the sandbox instead of being fetched (and cached)
+FILE_READ_FETCH_BYTES = int(os.getenv("FILE_READ_FETCH_BYTES", "1048576"))
+
+
+def _splice_hunks(old: str, new: str) -> List[list]:
+    """``splice`` op hunks turning ``old`` into ``new`` (line-based)."""
+    old_lines = old.splitlines(True)
+    new_lines = new.splitlines(True)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes()
+        if tag != "equal"
+    ]
+
 
 class E2BSandboxManager:
     """
@@ -28,12 +74,16 @@ class E2BSandboxManager:
     - Stores sandbox IDs for reconnection after server restart
     - Extends sandbox timeout on activity
     - File operations and command execution
+    - Write-through file content cache per session (see file_cache.py)
+    - Edits sent as ops to an in-sandbox helper (see sandbox_edit_helper.py)
     """
     
     def __init__(self):
         self.sandboxes: Dict[str, AsyncSandbox] = {}
         self.sandbox_info: Dict[str, dict] = {}
         self._api_keys: Dict[str, str] = {}  # Store API keys for reconnection
+        # Edit helper per session: True = installed, False = unavailable (python3 missing)
+        self._edit_helpers: Dict[str, bool] = {}
     
     async def create_sandbox(
         self,
@@ -118,6 +168,8 @@ class E2BSandboxManager:
                 raise template_error
             
             self.sandboxes[session_id] = sandbox
+            file_cache.invalidate(session_id)
+            self._edit_helpers.pop(session_id, None)
             
             # Get sandbox info
             info = await sandbox.get_info()
@@ -168,6 +220,8 @@ class E2BSandboxManager:
             is_running = await sandbox.is_running()
             if is_running:
                 self.sandboxes[session_id] = sandbox
+                file_cache.invalidate(session_id)
+                self._edit_helpers.pop(session_id, None)
                 # Extend timeout after reconnection
                 await self._extend_timeout(session_id)
                 return True
@@ -330,8 +384,24 @@ class E2BSandboxManager:
             if not file_path.startswith("/home/user/"):
                 file_path = f"/home/user/{file_path.lstrip('/')}"
             
+            # A small change to a large cached file is sent as a line splice
+            if await self._write_via_splice(session_id, sandbox, file_path, content):
+                return {
+                    "success": True,
+                    "message": f"Successfully created/wrote file at {file_path}",
+                    "file_path": file_path
+                }
+            
             # Write file to sandbox
-            await sandbox.files.write(file_path, content)
+            path = posixpath.normpath(file_path)
+            cache = file_cache.session(session_id)
+            token = cache.read_token(path) if cache is not None else None
+            try:
+                await sandbox.files.write(file_path, content)
+            except Exception:
+                file_cache.invalidate(session_id, path)
+                raise
+            await self._cache_written(session_id, sandbox, path, content, token)
             
             return {
                 "success": True,
@@ -346,10 +416,106 @@ class E2BSandboxManager:
                 "file_path": file_path
             }
     
-    async def read_file(
+    async def open_streaming_write(
         self,
         session_id: str,
         file_path: str
+    ) -> dict:
+        """
+        Start a background writer for a file whose content is still being generated.
+        
+        Content sent with ``append_streaming_write`` goes to a temp file next
+        to the target; ``finish_streaming_write`` closes stdin and the temp
+        file is renamed over the target in the same command, so readers never
+        see a partially written file.
+        
+        Returns:
+            Dictionary with the command handle and temp path
+        """
+        try:
+            sandbox = self.sandboxes.get(session_id)
+            if not sandbox:
+                return {
+                    "success": False,
+                    "error": "No sandbox found for session",
+                    "file_path": file_path
+                }
+            
+            if not file_path.startswith("/home/user/"):
+                file_path = f"/home/user/{file_path.lstrip('/')}"
+            
+            file_cache.invalidate(session_id, posixpath.normpath(file_path))
+            directory, name = posixpath.split(file_path)
+            temp_path = posixpath.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.partial")
+            command = (
+                f"mkdir -p {shlex.quote(directory)} && "
+                f"cat > {shlex.quote(temp_path)} && "
+                f"mv -f {shlex.quote(temp_path)} {shlex.quote(file_path)}"
+            )
+            handle = await sandbox.commands.run(command, background=True, stdin=True, timeout=600)
+            
+            return {
+                "success": True,
+                "handle": handle,
+                "temp_path": temp_path,
+                "file_path": file_path
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "file_path": file_path
+            }
+    
+    async def append_streaming_write(self, session_id: str, handle, data: str) -> dict:
+        """Send the next batch of content to a streaming writer."""
+        try:
+            await handle.send_stdin(data)
+            return {"success": True, "bytes": len(data.encode())}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def finish_streaming_write(self, session_id: str, handle, file_path: str) -> dict:
+        """Signal EOF, wait for the temp file to be moved into place."""
+        file_cache.invalidate(session_id, posixpath.normpath(file_path))
+        try:
+            await handle.close_stdin()
+            await handle.wait()
+            return {
+                "success": True,
+                "message": f"Successfully created/wrote file at {file_path}",
+                "file_path": file_path
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "file_path": file_path
+            }
+    
+    async def abort_streaming_write(self, session_id: str, handle, temp_path: str) -> dict:
+        """Kill a streaming writer and remove its temp file; the target is left untouched."""
+        try:
+            await handle.kill()
+        except Exception:
+            pass
+        try:
+            sandbox = self.sandboxes.get(session_id)
+            if sandbox:
+                await sandbox.files.remove(temp_path)
+            return {"success": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def read_file(
+        self,
+        session_id: str,
+        file_path: str,
+        window: bool = False,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        max_bytes: Optional[int] = None
     ) -> dict:
         """
         Read a file from the sandbox.
@@ -357,9 +523,15 @@ class E2BSandboxManager:
         Args:
             session_id: Session identifier
             file_path: Path in sandbox
+            window: Return a line window instead of the whole file (``file_read``)
+            offset: First line of the window (1-based)
+            limit: Number of lines in the window
+            max_bytes: Size cap of the window (default: FILE_READ_MAX_BYTES);
+                without offset/limit, a larger file gets a head window of
+                FILE_READ_WINDOW_LINES lines
             
         Returns:
-            Dictionary with file content
+            Dictionary with file content (binary files: size and type only)
         """
         try:
             sandbox = self.sandboxes.get(session_id)
@@ -373,18 +545,62 @@ class E2BSandboxManager:
             # Ensure path starts with /home/user/
             if not file_path.startswith("/home/user/"):
                 file_path = f"/home/user/{file_path.lstrip('/')}"
+            read = {
+                "offset": offset,
+                "limit": limit,
+                "max_bytes": max_bytes or FILE_READ_MAX_BYTES,
+                "default_lines": FILE_READ_WINDOW_LINES
+            } if window else None
             
-            # Check if file exists
-            exists = await sandbox.files.exists(file_path)
-            if not exists:
-                return {
-                    "success": False,
-                    "error": f"File not found: {file_path}",
-                    "file_path": file_path
-                }
+            cached = await self._cached_file(session_id, sandbox, file_path)
+            if cached is not None:
+                content, size = cached.content, cached.size
+            else:
+                path = posixpath.normpath(file_path)
+                cache = file_cache.session(session_id)
+                token = cache.read_token(path) if cache is not None else None
+                # Check that the file exists and how large it is
+                try:
+                    info = await sandbox.files.get_info(file_path)
+                except NotFoundException:
+                    return {
+                        "success": False,
+                        "error": f"File not found: {file_path}",
+                        "file_path": file_path
+                    }
+                if info.type == FileType.DIR:
+                    return {
+                        "success": False,
+                        "error": f"{file_path} is a directory",
+                        "file_path": file_path
+                    }
+                
+                # Too large to fetch for a window: cut it inside the sandbox
+                if read is not None and info.size > FILE_READ_FETCH_BYTES:
+                    try:
+                        response = await self._run_edit_helper(session_id, sandbox, {"path": path, "read": read})
+                    except Exception:
+                        response = None  # reading has no side effects: fetch the whole file instead
+                    if response is not None:
+                        return self._read_result(file_path, response)
+                
+                # Read file content
+                data = bytes(await sandbox.files.read(file_path, format="bytes"))
+                if is_binary(data):
+                    return self._read_result(file_path, {
+                        "success": True, "binary": True, "size": len(data), "mime_type": binary_type(data, path)
+                    })
+                content, size = data.decode("utf-8", "replace"), len(data)
+                entry = cache.put(path, content, token) if cache is not None else None
+                if entry is not None:
+                    entry.confirm(info.modified_time)
             
-            # Read file content
-            content = await sandbox.files.read(file_path, format="text")
+            if read is not None:
+                try:
+                    lines = line_window(content, **read)
+                except EditError as e:
+                    return {"success": False, "error": str(e), "file_path": file_path}
+                return self._read_result(file_path, {"success": True, "size": size, "window": lines})
             
             # Format with line numbers
             lines = content.split('\n')
@@ -408,6 +624,301 @@ class E2BSandboxManager:
                 "file_path": file_path
             }
     
+    def _read_result(self, file_path: str, response: dict) -> dict:
+        """``read_file`` result for a window or binary file (see ``sandbox_edit_helper.line_window``)."""
+        if not response.get("success"):
+            return {"success": False, "error": response.get("error", "Read failed"), "file_path": file_path}
+        result = {
+            "success": True,
+            "file_path": file_path,
+            "file_name": file_path.split('/')[-1],
+            "file_size": response.get("size")
+        }
+        if response.get("binary"):
+            result.update({
+                "binary": True,
+                "mime_type": response.get("mime_type"),
+                "content": "",
+                "message": f"Binary file ({response.get('mime_type')}, {response.get('size')} bytes); not shown"
+            })
+            return result
+        
+        window = response["window"]
+        start, end, total = window["start_line"], window["end_line"], window["total_lines"]
+        lines = window["text"].split('\n')
+        result.update({
+            "content": '\n'.join(f"{start + i:6d}\t{line}" for i, line in enumerate(lines)),
+            "raw_content": window["text"],
+            "total_lines": total,
+            "lines_read": end - start + 1,
+            "start_line": start,
+            "end_line": end
+        })
+        if window["truncated"]:
+            result["truncated"] = True
+            reason = " (max_bytes reached)" if window.get("cut_by_bytes") else ""
+            result["message"] = (
+                f"Showing lines {start}-{end} of {total}{reason}. "
+                f"Use offset/limit to read other lines."
+            )
+        return result
+    
+    async def _cached_file(self, session_id: str, sandbox: AsyncSandbox, file_path: str) -> Optional[CachedFile]:
+        """
+        Cached content of ``file_path`` if it can be trusted: unchanged
+        according to a single stat, or confirmed within the opt-in
+        ``FILE_CACHE_TRUST_SECONDS``.
+        """
+        cache = file_cache.session(session_id)
+        if cache is None:
+            return None
+        path = posixpath.normpath(file_path)
+        entry = cache.get(path)
+        if entry is None:
+            return None
+        if not cache.untrusted and entry.is_trusted(file_cache.trust_seconds):
+            cache.hits += 1
+            return entry
+        
+        cache.validations += 1
+        try:
+            info = await sandbox.files.get_info(path)
+        except Exception:
+            info = None
+        if info is None or not entry.matches(info.size, info.modified_time):
+            cache.stale += 1
+            cache.invalidate(path)
+            return None
+        entry.confirm(info.modified_time)
+        cache.hits += 1
+        return entry
+
+    async def _cache_written(
+        self,
+        session_id: str,
+        sandbox: AsyncSandbox,
+        path: str,
+        content: str,
+        token: Optional[Tuple[int, int]]
+    ) -> Optional[CachedFile]:
+        """
+        Cache ``content`` just written to ``path`` along with the file's
+        mtime, so the next use can validate it. Dropped if the stat fails or
+        the size disagrees; ``token`` is taken before the write.
+        """
+        cache = file_cache.session(session_id)
+        if cache is None:
+            return None
+        try:
+            info = await sandbox.files.get_info(path)
+        except Exception:
+            info = None
+        entry = cache.put(path, content, token)
+        if entry is None:
+            return None
+        if info is None or info.size != entry.size:
+            cache.invalidate(path)
+            return None
+        entry.confirm(info.modified_time)
+        return entry
+
+    async def edit_file(
+        self,
+        session_id: str,
+        file_path: str,
+        ops: List[dict],
+        missing_ok: bool = False
+    ) -> dict:
+        """
+        Apply edit ops (see sandbox_edit_helper.py) to a file, all or nothing.
+
+        Only the ops are sent to the in-sandbox helper, unless the file is
+        small and cached (a plain write is as fast) or the helper is
+        unavailable; then the file is read (through the cache), edited here
+        and written back.
+
+        Args:
+            session_id: Session identifier
+            file_path: Path in sandbox
+            ops: Edit ops, applied in order
+            missing_ok: Treat a missing file as empty (it is created)
+
+        Returns:
+            Dictionary with per-op ``results``, ``total_lines`` and ``sha256``;
+            on an op error, ``failed_op`` is its index
+        """
+        sandbox = self.sandboxes.get(session_id)
+        if not sandbox:
+            return {
+                "success": False,
+                "error": "No sandbox found for session",
+                "file_path": file_path
+            }
+
+        if not file_path.startswith("/home/user/"):
+            file_path = f"/home/user/{file_path.lstrip('/')}"
+
+        cache = file_cache.session(session_id)
+        entry = cache.entries.get(posixpath.normpath(file_path)) if cache is not None else None
+        if entry is None or entry.size >= SANDBOX_EDIT_MIN_BYTES:
+            result = await self._edit_via_helper(session_id, sandbox, file_path, ops, missing_ok)
+            if result is not None:
+                return result
+        return await self._edit_via_write(session_id, file_path, ops, missing_ok)
+
+    async def _edit_via_write(self, session_id: str, file_path: str, ops: List[dict], missing_ok: bool) -> dict:
+        """Read-modify-write fallback for ``edit_file``."""
+        read_result = await self.read_file(session_id, file_path)
+        if read_result.get("binary"):
+            return {"success": False, "error": f"Cannot edit {file_path}: {read_result['message']}", "file_path": file_path}
+        if read_result.get("success"):
+            content = read_result.get("raw_content", "")
+        elif missing_ok and str(read_result.get("error", "")).startswith("File not found"):
+            content = ""
+        else:
+            return {
+                "success": False,
+                "error": f"Could not read {file_path}: {read_result.get('error')}",
+                "file_path": file_path
+            }
+
+        try:
+            new_content, results = apply_ops(content, ops, file_path)
+        except EditError as e:
+            return {"success": False, "error": str(e), "failed_op": e.index, "file_path": file_path}
+
+        write_result = await self.write_file(session_id, file_path, new_content)
+        if not write_result.get("success"):
+            return {"success": False, "error": f"Write failed: {write_result.get('error')}", "file_path": file_path}
+        return {
+            "success": True,
+            "file_path": file_path,
+            "results": results,
+            "total_lines": total_lines(new_content),
+            "sha256": digest(new_content),
+            "via": "write"
+        }
+
+    async def _edit_via_helper(
+        self,
+        session_id: str,
+        sandbox: AsyncSandbox,
+        file_path: str,
+        ops: List[dict],
+        missing_ok: bool
+    ) -> Optional[dict]:
+        """
+        Apply ``ops`` with the in-sandbox helper and bring the file cache up
+        to date. None when the helper cannot be used (the caller falls back).
+        """
+        path = posixpath.normpath(file_path)
+        cache = file_cache.session(session_id)
+        token = cache.read_token(path) if cache is not None else None
+        try:
+            response = await self._run_edit_helper(
+                session_id, sandbox, {"path": path, "ops": ops, "missing_ok": missing_ok}
+            )
+        except Exception as e:
+            # The edit may or may not have been applied: report, never retry
+            file_cache.invalidate(session_id, path)
+            return {"success": False, "error": f"Edit failed: {e}", "file_path": file_path}
+        if response is None:
+            return None
+
+        if not response.get("success"):
+            if response.get("not_found"):
+                return {
+                    "success": False,
+                    "error": f"Could not read {file_path}: File not found: {file_path}",
+                    "file_path": file_path
+                }
+            return {
+                "success": False,
+                "error": response.get("error", "Edit failed"),
+                "failed_op": response.get("failed_op"),
+                "file_path": file_path
+            }
+
+        # Replay the ops on the cached copy if it was the file the helper edited
+        entry = cache.entries.get(path) if cache is not None else None
+        updated = None
+        if entry is not None and entry.digest == response.get("before_sha256"):
+            try:
+                new_content, _ = apply_ops(entry.content, ops, file_path)
+                if digest(new_content) == response.get("sha256"):
+                    updated = await self._cache_written(session_id, sandbox, path, new_content, token)
+            except EditError:
+                pass
+        if updated is None:
+            file_cache.invalidate(session_id, path)
+
+        return {
+            "success": True,
+            "file_path": file_path,
+            "results": response.get("results", []),
+            "total_lines": response.get("total_lines"),
+            "sha256": response.get("sha256"),
+            "via": "helper"
+        }
+
+    async def _write_via_splice(self, session_id: str, sandbox: AsyncSandbox, file_path: str, content: str) -> bool:
+        """
+        Write ``content`` as a line splice against the cached copy when that
+        is much smaller than the file. False if the caller should write the
+        whole file.
+        """
+        cache = file_cache.session(session_id)
+        path = posixpath.normpath(file_path)
+        entry = cache.entries.get(path) if cache is not None else None
+        if entry is None or entry.size < SANDBOX_EDIT_MIN_BYTES or self._edit_helpers.get(session_id) is False:
+            return False
+
+        hunks = await asyncio.to_thread(_splice_hunks, entry.content, content)
+        if sum(len(line) for _, _, lines in hunks for line in lines) > len(content) // 2:
+            return False
+
+        token = cache.read_token(path)
+        ops = [{"op": "splice", "hunks": hunks, "expect_sha256": entry.digest}]
+        try:
+            response = await self._run_edit_helper(session_id, sandbox, {"path": path, "ops": ops})
+        except Exception:
+            response = None
+        if not response or not response.get("success") or response.get("sha256") != digest(content):
+            # Stale cache, helper unavailable or failed: the full write replaces whatever is there
+            return False
+        await self._cache_written(session_id, sandbox, path, content, token)
+        return True
+
+    async def _run_edit_helper(self, session_id: str, sandbox: AsyncSandbox, request: dict) -> Optional[dict]:
+        """
+        Run one helper request. None if the helper is disabled, unavailable
+        or the request is too large; raises if the command's outcome is unknown.
+        """
+        if not SANDBOX_EDIT_HELPER or self._edit_helpers.get(session_id) is False:
+            return None
+        encoded = json.dumps(request, ensure_ascii=False).encode("utf-8", "surrogatepass")
+        payload = base64.b64encode(encoded).decode("ascii")
+        if len(payload) > SANDBOX_EDIT_MAX_PAYLOAD:
+            return None
+
+        for attempt in range(2):
+            if not self._edit_helpers.get(session_id):
+                await sandbox.files.write(EDIT_HELPER_PATH, EDIT_HELPER_SOURCE)
+                self._edit_helpers[session_id] = True
+            try:
+                result = await sandbox.commands.run(f"python3 {EDIT_HELPER_PATH} {payload}", timeout=60)
+            except CommandExitException as e:
+                if e.exit_code == 127:
+                    break  # no python3 in this sandbox
+                if e.exit_code != 2 or EDIT_HELPER_PATH not in (e.stderr or ""):
+                    raise  # the helper itself crashed: this request failed, the helper stays
+                # Helper file gone (/tmp cleaned) → reinstall once
+                self._edit_helpers.pop(session_id, None)
+                continue
+            return json.loads(result.stdout)
+        self._edit_helpers[session_id] = False
+        return None
+
     async def list_files(
         self,
         session_id: str,
@@ -493,7 +1004,8 @@ class E2BSandboxManager:
                 return {
                     "exists": True,
                     "is_running": is_running,
-                    "info": self.sandbox_info.get(session_id, {})
+                    "info": self.sandbox_info.get(session_id, {}),
+                    "file_cache": file_cache.get_stats(session_id)
                 }
             except Exception as e:
                 return {
@@ -512,6 +1024,7 @@ class E2BSandboxManager:
         command: str,
         wait_for_output: bool = True,
         timeout: int = 120,
+        read_only: bool = False,
     ) -> dict:
         """
         Execute a command in the sandbox using the E2B commands API.
@@ -522,6 +1035,8 @@ class E2BSandboxManager:
             command: Command to execute
             wait_for_output: Whether to wait for completion
             timeout: Command timeout in seconds
+            read_only: The command does not modify files (e.g. a search), so
+                cached file contents stay valid
             
         Returns:
             Dictionary with command output
@@ -536,7 +1051,12 @@ class E2BSandboxManager:
                 }
 
             if not wait_for_output:
-                # Run in background — don't wait
+                # Run in background — don't wait. The process may write files at
+                # any time from now on, so cached files are always re-validated.
+                file_cache.invalidate(session_id)
+                cache = file_cache.session(session_id)
+                if cache is not None:
+                    cache.untrusted = True
                 await sandbox.commands.run(
                     f"nohup {command} > /dev/null 2>&1 &",
                     timeout=10,
@@ -547,12 +1067,16 @@ class E2BSandboxManager:
                     "output": "Command started in background (no output captured).",
                 }
 
-            # Run command and capture output
-            result = await sandbox.commands.run(
-                command,
-                timeout=timeout,
-                cwd="/home/user",
-            )
+            # Run command and capture output; it may have changed any file
+            try:
+                result = await sandbox.commands.run(
+                    command,
+                    timeout=timeout,
+                    cwd="/home/user",
+                )
+            finally:
+                if not read_only:
+                    file_cache.invalidate(session_id)
 
             stdout = result.stdout or ""
             stderr = result.stderr or ""
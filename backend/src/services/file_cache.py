@@ -0,0 +1,177 @@
+"""
+Per-session file content cache.
+
+``E2BSandboxManager`` keeps the content of files it recently wrote or read
+so edit tools do not need a ``files.exists`` + ``files.read`` round trip
+before every write:
+
+- ``write_file`` / ``read_file`` populate the cache (write-through)
+- ``execute_command``, streaming writes, sandbox (re)creation invalidate it;
+  after a background command every entry is validated on each use
+- writes and reads record the file's mtime; every use is validated with a
+  single stat (size and mtime must match) and the entry dropped if the
+  file changed underneath or its mtime was never learned; opting in to
+  ``FILE_CACHE_TRUST_SECONDS`` skips the stat for entries confirmed that
+  recently, at the risk of missing changes made outside the edit tools
+  (dev servers, generators)
+- each session is bounded by ``FILE_CACHE_MAX_BYTES`` with LRU eviction
+
+Configuration (environment variables):
+- FILE_CACHE_ENABLED         Turn the cache on/off (default: true)
+- FILE_CACHE_MAX_BYTES       Cached content per session (default: 33554432)
+- FILE_CACHE_TRUST_SECONDS   Age below which entries skip the stat (default: 0 = always stat)
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .sandbox_edit_helper import encode_text
+
+FILE_CACHE_ENABLED = os.getenv("FILE_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+FILE_CACHE_MAX_BYTES = int(os.getenv("FILE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+FILE_CACHE_TRUST_SECONDS = float(os.getenv("FILE_CACHE_TRUST_SECONDS", "0"))
+
+
+@dataclass
+class CachedFile:
+    path: str
+    content: str
+    digest: str
+    size: int  # bytes, as stored in the sandbox
+    version: int
+    confirmed_at: float
+    mtime: Any = None  # sandbox mtime; until it is known the entry never validates
+
+    def is_trusted(self, trust_seconds: float) -> bool:
+        return time.monotonic() - self.confirmed_at < trust_seconds
+
+    def matches(self, size: int, mtime: Any) -> bool:
+        return self.mtime is not None and size == self.size and mtime == self.mtime
+
+    def confirm(self, mtime: Any = None) -> None:
+        self.confirmed_at = time.monotonic()
+        if mtime is not None:
+            self.mtime = mtime
+
+
+class SessionFileCache:
+    """LRU by bytes for one sandbox session."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = FILE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self.versions: Dict[str, int] = {}
+        self.epoch = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.validations = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Set once a background command runs: every use then needs a stat
+        self.untrusted = False
+
+    def get(self, path: str) -> Optional[CachedFile]:
+        entry = self.entries.get(path)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(path)
+        return entry
+
+    def read_token(self, path: str) -> Tuple[int, int]:
+        """Taken before reading a file; ``put`` with it is a no-op if the file was written or invalidated meanwhile."""
+        return self.epoch, self.versions.get(path, 0)
+
+    def put(self, path: str, content: str, token: Optional[Tuple[int, int]] = None) -> Optional[CachedFile]:
+        if token is not None and token != self.read_token(path):
+            return None
+        data = encode_text(content)
+        self.versions[path] = self.versions.get(path, 0) + 1
+        self._drop(path)
+        if len(data) > self.max_bytes:
+            return None
+        entry = CachedFile(
+            path=path,
+            content=content,
+            digest=hashlib.sha256(data).hexdigest(),
+            size=len(data),
+            version=self.versions[path],
+            confirmed_at=time.monotonic(),
+        )
+        self.entries[path] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+        return entry
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Forget ``path``, or every entry when ``path`` is None."""
+        if path is None:
+            self.epoch += 1
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.bytes = 0
+            return
+        self.versions[path] = self.versions.get(path, 0) + 1
+        if self._drop(path):
+            self.invalidations += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "validations": self.validations,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "untrusted": self.untrusted,
+        }
+
+    def _drop(self, path: str) -> bool:
+        entry = self.entries.pop(path, None)
+        if entry is None:
+            return False
+        self.bytes -= entry.size
+        return True
+
+
+class FileContentCache:
+    """Session id → ``SessionFileCache``."""
+
+    def __init__(self, enabled: Optional[bool] = None, trust_seconds: Optional[float] = None):
+        self.enabled = FILE_CACHE_ENABLED if enabled is None else enabled
+        self.trust_seconds = FILE_CACHE_TRUST_SECONDS if trust_seconds is None else trust_seconds
+        self.sessions: Dict[str, SessionFileCache] = {}
+
+    def session(self, session_id: str) -> Optional[SessionFileCache]:
+        if not self.enabled:
+            return None
+        cache = self.sessions.get(session_id)
+        if cache is None:
+            cache = self.sessions[session_id] = SessionFileCache()
+        return cache
+
+    def invalidate(self, session_id: str, path: Optional[str] = None) -> None:
+        cache = self.sessions.get(session_id)
+        if cache is not None:
+            cache.invalidate(path)
+
+    def get_stats(self, session_id: str) -> dict:
+        cache = self.sessions.get(session_id)
+        return {"enabled": self.enabled, **(cache.get_stats() if cache else {})}
+
+
+# Global file content cache instance
+file_cache = FileContentCache()
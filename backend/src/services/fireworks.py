@@ -4,192 +4,168 @@ Fireworks AI LLM Client.
 Handles communication with the Fireworks AI API for:
 - Fetching available models
 - Streaming chat completions with native tool/function calling
+  (shared OpenAI-compatible core in provider_base.py)
 
 Fireworks uses an OpenAI-compatible API at https://api.fireworks.ai/inference/v1
 Docs: https://docs.fireworks.ai/getting-started/introduction
 """
 
-import httpx
-import json
-from typing import AsyncGenerator
+import asyncio
+import os
+import time
+from typing import Tuple
+
+from .http_pool import provider_pool
+from .provider_base import OpenAICompatibleProvider, ProviderCapabilities
 
 FIREWORKS_API_URL = "https://api.fireworks.ai/inference/v1"
 FIREWORKS_MODELS_API_URL = "https://api.fireworks.ai/v1"
 
-
-async def fetch_models(api_key: str) -> dict:
-    """Fetch ALL models from Fireworks AI — no filtering, no limits.
-
-    Paginates through every page from the ``accounts/fireworks/models``
-    endpoint (public/serverless catalogue) as well as the caller's own
-    account models, returning the full combined list.
-    """
-    try:
+# Max concurrent requests while listing account models
+FIREWORKS_MODELS_CONCURRENCY = int(os.getenv("FIREWORKS_MODELS_CONCURRENCY", "4"))
+
+
+class FireworksProvider(OpenAICompatibleProvider):
+    name = "fireworks"
+    display_name = "Fireworks AI"
+    base_url = FIREWORKS_API_URL
+    error_label = "Fireworks API Error"
+    capabilities = ProviderCapabilities(parallel_tool_calls=True, usage_reporting=True, prompt_caching=True)
+
+    def apply_prompt_caching(self, payload: dict, headers: dict, cache_key: str) -> dict:
+        # Prefix caching is automatic; session affinity routes a session's
+        # requests to the same replica so its cached prefix is reused.
+        headers["x-session-affinity"] = cache_key
+        return payload
+
+    async def list_models(self, api_key: str) -> Tuple[list, dict]:
+        """Fetch ALL models from Fireworks AI — no filtering, no limits.
+
+        Paginates through every page from the ``accounts/fireworks/models``
+        endpoint (public/serverless catalogue) as well as the caller's own
+        account models, returning the full combined list.
+
+        The public catalogue walk starts immediately, in parallel with the
+        ``/accounts`` probe, and every discovered account is walked
+        concurrently (bounded by ``FIREWORKS_MODELS_CONCURRENCY``). Within an
+        account each page is requested as soon as its ``nextPageToken`` is
+        known. The result includes a ``timings`` breakdown in milliseconds.
+        """
+        started = time.perf_counter()
         all_models: list[dict] = []
         seen_names: set[str] = set()
-
-        async with httpx.AsyncClient() as client:
-            # Fetch from the public "fireworks" account (serverless catalogue)
-            # AND attempt to fetch the caller's own account models.
-            accounts = ["fireworks"]
-
-            # Try to detect the caller's account id via a small probe request
-            try:
+        timings: dict = {"accounts": {}}
+
+        client = provider_pool.get_client(FIREWORKS_API_URL)
+        headers = self.get_headers(api_key)
+        semaphore = asyncio.Semaphore(FIREWORKS_MODELS_CONCURRENCY)
+
+        async def _walk_account(account_id: str) -> None:
+            account_started = time.perf_counter()
+            pages = 0
+            models_added = 0
+            page_token: str | None = None
+            while True:
+                params: dict = {"pageSize": 200}
+                if page_token:
+                    params["pageToken"] = page_token
+
+                try:
+                    async with semaphore:
+                        response = await client.get(
+                            f"{FIREWORKS_MODELS_API_URL}/accounts/{account_id}/models",
+                            headers=headers,
+                            params=params,
+                            timeout=30.0,
+                        )
+                except Exception:
+                    break
+
+                if response.status_code != 200:
+                    # Skip this account on error and continue with others
+                    break
+
+                data = response.json()
+                pages += 1
+
+                # Deduplicate as pages arrive rather than after all accounts finish
+                for m in data.get("models", []):
+                    name_field = m.get("name", "")
+                    if name_field not in seen_names:
+                        seen_names.add(name_field)
+                        all_models.append(m)
+                        models_added += 1
+
+                page_token = data.get("nextPageToken")
+                if not page_token:
+                    break
+
+            timings["accounts"][account_id] = {
+                "pages": pages,
+                "models": models_added,
+                "ms": round((time.perf_counter() - account_started) * 1000, 1),
+            }
+
+        # Fetch from the public "fireworks" account (serverless catalogue)
+        # straight away, while probing for the caller's own accounts.
+        walks = [asyncio.create_task(_walk_account("fireworks"))]
+
+        # Try to detect the caller's account id via a small probe request
+        probe_started = time.perf_counter()
+        try:
+            async with semaphore:
                 probe = await client.get(
                     f"{FIREWORKS_MODELS_API_URL}/accounts",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json",
-                    },
+                    headers=headers,
                     timeout=15.0,
                 )
-                if probe.status_code == 200:
-                    probe_data = probe.json()
-                    for acct in probe_data.get("accounts", []):
-                        acct_name = acct.get("name", "")
-                        acct_id = acct_name.replace("accounts/", "") if acct_name.startswith("accounts/") else acct_name
-                        if acct_id and acct_id != "fireworks":
-                            accounts.append(acct_id)
-            except Exception:
-                pass  # Non-critical — proceed with "fireworks" only
-
-            for account_id in accounts:
-                page_token: str | None = None
-                while True:
-                    params: dict = {"pageSize": 200}
-                    if page_token:
-                        params["pageToken"] = page_token
-
-                    response = await client.get(
-                        f"{FIREWORKS_MODELS_API_URL}/accounts/{account_id}/models",
-                        headers={
-                            "Authorization": f"Bearer {api_key}",
-                            "Content-Type": "application/json",
-                        },
-                        params=params,
-                        timeout=30.0,
-                    )
-
-                    if response.status_code != 200:
-                        # Skip this account on error and continue with others
-                        break
-
-                    data = response.json()
-                    models_page = data.get("models", [])
-
-                    for m in models_page:
-                        name_field = m.get("name", "")
-                        if name_field not in seen_names:
-                            seen_names.add(name_field)
-                            all_models.append(m)
-
-                    page_token = data.get("nextPageToken")
-                    if not page_token:
-                        break
-
-        formatted = []
-        for m in all_models:
-            name_field = m.get("name", "")
-            display_name = m.get("displayName", name_field)
-
-            model_id = name_field
-            if not model_id.startswith("accounts/"):
-                if "/" not in model_id:
-                    model_id = f"accounts/fireworks/models/{model_id}"
-
-            context_length = m.get("contextLength", 0)
-            supports_tools = m.get("supportsTools", False)
-            supports_serverless = m.get("supportsServerless", False)
-            state = m.get("state", "")
-
-            desc_parts = []
-            if supports_tools:
-                desc_parts.append("Tools")
-            if m.get("supportsImageInput", False):
-                desc_parts.append("Vision")
-            if supports_serverless:
-                desc_parts.append("Serverless")
-            if state and state not in ("DEPLOYED", "READY"):
-                desc_parts.append(state.capitalize())
-            param_count = (m.get("baseModelDetails") or {}).get("parameterCount", "")
-            if param_count:
-                desc_parts.append(f"{param_count} params")
-            description = " · ".join(desc_parts) if desc_parts else ""
-
-            formatted.append(
-                {
-                    "id": model_id,
-                    "name": display_name or model_id.split("/")[-1],
-                    "context_length": context_length,
-                    "description": description,
-                    "supports_tools": supports_tools,
-                }
-            )
-
-        formatted.sort(key=lambda x: x.get("name", "").lower())
-        return {"success": True, "models": formatted}
-
-    except Exception as e:
-        return {"success": False, "error": str(e)}
-
-
-async def chat_completion(
-    api_key: str,
-    model: str,
-    messages: list,
-    tools: list = None,
-    stream: bool = True,
-) -> AsyncGenerator:
-    """
-    Streaming chat completion with native function/tool calling via Fireworks AI.
-
-    Fireworks' chat completions API is OpenAI-compatible so the request and
-    SSE response format is identical to OpenRouter / Groq.
-
-    Yields events:
-      {"type": "chunk", "data": <raw SSE chunk dict>}
-      {"type": "done"}
-      {"type": "error", "error": "..."}
-    """
-    payload: dict = {
-        "model": model,
-        "messages": messages,
-        "stream": stream,
-    }
-
-    if tools:
-        payload["tools"] = tools
-        payload["tool_choice"] = "auto"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    async with httpx.AsyncClient() as client:
-        async with client.stream(
-            "POST",
-            f"{FIREWORKS_API_URL}/chat/completions",
-            json=payload,
-            headers=headers,
-            timeout=120.0,
-        ) as response:
-            if response.status_code != 200:
-                error_text = await response.aread()
-                yield {
-                    "type": "error",
-                    "error": f"Fireworks API Error {response.status_code}: {error_text.decode()}",
-                }
-                return
-
-            async for line in response.aiter_lines():
-                if line.startswith("data: "):
-                    data = line[6:]
-                    if data == "[DONE]":
-                        yield {"type": "done"}
-                        break
-                    try:
-                        chunk = json.loads(data)
-                        yield {"type": "chunk", "data": chunk}
-                    except json.JSONDecodeError:
-                        continue
\ No newline at end of file
+            if probe.status_code == 200:
+                probe_data = probe.json()
+                for acct in probe_data.get("accounts", []):
+                    acct_name = acct.get("name", "")
+                    acct_id = acct_name.replace("accounts/", "") if acct_name.startswith("accounts/") else acct_name
+                    if acct_id and acct_id != "fireworks":
+                        walks.append(asyncio.create_task(_walk_account(acct_id)))
+        except Exception:
+            pass  # Non-critical — proceed with "fireworks" only
+        timings["probe_ms"] = round((time.perf_counter() - probe_started) * 1000, 1)
+
+        await asyncio.gather(*walks)
+        timings["fetch_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return all_models, {"timings": timings}
+
+    def format_model(self, model: dict) -> dict:
+        name_field = model.get("name", "")
+        display_name = model.get("displayName", name_field)
+
+        model_id = name_field
+        if not model_id.startswith("accounts/"):
+            if "/" not in model_id:
+                model_id = f"accounts/fireworks/models/{model_id}"
+
+        supports_tools = model.get("supportsTools", False)
+        state = model.get("state", "")
+
+        desc_parts = []
+        if supports_tools:
+            desc_parts.append("Tools")
+        if model.get("supportsImageInput", False):
+            desc_parts.append("Vision")
+        if model.get("supportsServerless", False):
+            desc_parts.append("Serverless")
+        if state and state not in ("DEPLOYED", "READY"):
+            desc_parts.append(state.capitalize())
+        param_count = (model.get("baseModelDetails") or {}).get("parameterCount", "")
+        if param_count:
+            desc_parts.append(f"{param_count} params")
+
+        return {
+            "id": model_id,
+            "name": display_name or model_id.split("/")[-1],
+            "context_length": model.get("contextLength", 0),
+            "description": " · ".join(desc_parts),
+            "supports_tools": supports_tools,
+        }
+
+
+fireworks_provider = FireworksProvider()
@@ -0,0 +1,177 @@
+"""
+Provider HTTP Client Pool.
+
+Keeps one long-lived ``httpx.AsyncClient`` per provider host so that chat
+completions and model listings reuse keep-alive connections instead of
+paying a fresh TCP+TLS handshake on every ReAct iteration.
+
+The pool is started and closed by the FastAPI lifespan in ``main.py``.
+Clients are created lazily, so scripts that never start the pool still work.
+
+Configuration (environment variables):
+- PROVIDER_HTTP2              Enable HTTP/2 when the ``h2`` package is installed (default: false)
+- PROVIDER_MAX_CONNECTIONS    Max open connections per provider host (default: 50)
+- PROVIDER_MAX_KEEPALIVE      Max idle keep-alive connections per host (default: 20)
+- PROVIDER_KEEPALIVE_EXPIRY   Seconds an idle connection is kept open (default: 120)
+- PROVIDER_WARMUP             Pre-resolve DNS and open a connection at startup (default: true)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ProviderClientPool:
+    """
+    Process-wide pool of pooled ``httpx.AsyncClient`` instances.
+
+    One client is kept per provider host (scheme + netloc), which gives each
+    provider its own connection limits and keep-alive pool.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        self.max_connections = max_connections or _env_int("PROVIDER_MAX_CONNECTIONS", 50)
+        self.max_keepalive_connections = max_keepalive_connections or _env_int("PROVIDER_MAX_KEEPALIVE", 20)
+        self.keepalive_expiry = keepalive_expiry or float(_env_int("PROVIDER_KEEPALIVE_EXPIRY", 120))
+
+        want_http2 = _env_bool("PROVIDER_HTTP2", False) if http2 is None else http2
+        if want_http2 and not _http2_available():
+            logger.warning("PROVIDER_HTTP2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            want_http2 = False
+        self.http2 = want_http2
+
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._warmup_results: Dict[str, dict] = {}
+
+    # ------------------------------------------------------------------
+    # Client access
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _host_key(base_url: str) -> str:
+        parts = urlsplit(base_url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """Return the pooled client for the host of ``base_url``, creating it on first use."""
+        key = self._host_key(base_url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(120.0, connect=15.0),
+            )
+            self._clients[key] = client
+        return client
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self, warmup_urls: Iterable[str] = ()) -> None:
+        """Create clients for the given providers and warm them up in the background."""
+        urls = list(warmup_urls)
+        for url in urls:
+            self.get_client(url)
+        if urls and _env_bool("PROVIDER_WARMUP", True):
+            self._warmup_task = asyncio.create_task(self.warmup(urls))
+
+    async def warmup(self, base_urls: Iterable[str]) -> Dict[str, dict]:
+        """
+        Resolve DNS and open one keep-alive connection per provider host.
+
+        Any HTTP response (even 401/404) means the TCP+TLS connection is now
+        established and parked in the pool, so status codes are ignored.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def _warm(url: str) -> None:
+            parts = urlsplit(url)
+            entry: dict = {"host": parts.hostname}
+            started = time.perf_counter()
+            try:
+                await loop.getaddrinfo(parts.hostname, parts.port or 443)
+                entry["dns_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                await self.get_client(url).head(url, timeout=10.0)
+                entry["connect_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                entry["success"] = True
+            except Exception as e:
+                entry["success"] = False
+                entry["error"] = str(e)
+            self._warmup_results[self._host_key(url)] = entry
+
+        await asyncio.gather(*(_warm(url) for url in base_urls))
+        return self._warmup_results
+
+    async def close(self) -> None:
+        """Cancel any pending warmup and close every pooled client."""
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._warmup_task = None
+
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+    def get_stats(self) -> dict:
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "hosts": sorted(self._clients.keys()),
+            "warmup": self._warmup_results,
+        }
+
+
+# Global provider client pool instance
+provider_pool = ProviderClientPool()
@@ -0,0 +1,168 @@
+"""
+Model Catalogue Cache.
+
+Caches ``Provider.fetch_models`` results per provider and API key so that
+``/api/models`` does not hit the upstream provider on every call.
+
+- Entries are keyed by provider name and a SHA-256 hash of the API key
+  (the key itself is never stored).
+- Fresh entries (younger than the TTL) are served directly.
+- Stale entries (within the stale window) are served immediately while a
+  background refresh updates them.
+- Concurrent misses for the same key share a single upstream fetch.
+
+Configuration (environment variables):
+- MODEL_CACHE_TTL          Seconds an entry is considered fresh (default: 600)
+- MODEL_CACHE_STALE_TTL    Extra seconds a stale entry may still be served (default: 3600)
+- MODEL_CACHE_MAX_ENTRIES  Max cached provider/key combinations (default: 256)
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .provider_base import Provider
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+
+class ModelCatalogCache:
+    """TTL + stale-while-revalidate cache with request coalescing."""
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("MODEL_CACHE_TTL", "600"))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(os.getenv("MODEL_CACHE_STALE_TTL", "3600"))
+        self.max_entries = max_entries or int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "256"))
+        self._entries: Dict[Tuple[str, str], dict] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, provider: "Provider", api_key: str, force_refresh: bool = False) -> dict:
+        """
+        Return the provider's model list, using the cache where possible.
+
+        The returned dict is the ``fetch_models`` result plus a ``cache``
+        block describing the entry's age and whether it was stale.
+        """
+        key = (provider.name, hash_api_key(api_key))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry and not force_refresh:
+            age = now - entry["fetched_at"]
+            if age < self.ttl:
+                self.hits += 1
+                return self._with_meta(entry, age, stale=False)
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh(key, provider, api_key)
+                return self._with_meta(entry, age, stale=True)
+
+        self.misses += 1
+        result = await asyncio.shield(self._refresh(key, provider, api_key))
+        if not result.get("success"):
+            # Upstream failed: fall back to whatever we still have
+            if entry:
+                return self._with_meta(entry, now - entry["fetched_at"], stale=True)
+            return result
+        return self._with_meta(self._entries[key], 0.0, stale=False)
+
+    def invalidate(self, provider_name: Optional[str] = None) -> None:
+        for key in list(self._entries):
+            if provider_name is None or key[0] == provider_name:
+                del self._entries[key]
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _refresh(self, key: Tuple[str, str], provider: "Provider", api_key: str) -> asyncio.Task:
+        """Start (or join) the single upstream fetch for ``key``."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, provider, api_key))
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: Tuple[str, str], provider: "Provider", api_key: str) -> dict:
+        try:
+            result = await provider.fetch_models(api_key)
+            if result.get("success"):
+                self._entries[key] = {"result": result, "fetched_at": time.monotonic()}
+                self._evict()
+            return result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            self._inflight.pop(key, None)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            oldest = min(self._entries, key=lambda k: self._entries[k]["fetched_at"])
+            del self._entries[oldest]
+
+    @staticmethod
+    def _with_meta(entry: dict, age: float, stale: bool) -> dict:
+        return {**entry["result"], "cache": {"age_seconds": round(age, 1), "stale": stale}}
+
+
+def query_models(
+    models: list,
+    search: Optional[str] = None,
+    supports_tools: Optional[bool] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Tuple[list, int]:
+    """
+    Filter and paginate a model list.
+
+    ``search`` matches case-insensitively against id, name and description.
+    ``supports_tools`` only excludes models that explicitly declare the
+    opposite; providers that do not report tool support are kept.
+
+    Returns ``(page, total_matching)``.
+    """
+    results = models
+    if search:
+        needle = search.strip().lower()
+        results = [
+            m for m in results
+            if needle in (m.get("id") or "").lower()
+            or needle in (m.get("name") or "").lower()
+            or needle in (m.get("description") or "").lower()
+        ]
+    if supports_tools is not None:
+        results = [m for m in results if m.get("supports_tools", supports_tools) == supports_tools]
+
+    total = len(results)
+    offset = max(offset, 0)
+    if limit is not None:
+        return results[offset : offset + max(limit, 0)], total
+    return results[offset:], total
+
+
+# Global model catalogue cache instance
+model_cache = ModelCatalogCache()
@@ -0,0 +1,85 @@
+"""
+Prompt Caching Helpers.
+
+The ReAct loop resends the system prompt, the tool schemas and the whole
+(append-only) history on every iteration, so almost every request shares a
+long byte-identical prefix with the previous one. Providers can serve that
+prefix from cache:
+
+- Anthropic (and Gemini) models via OpenRouter need explicit
+  ``cache_control`` breakpoints on message content blocks.
+- OpenAI-style backends cache prefixes automatically; they only need the
+  prefix to stay stable and, where supported, a routing/affinity hint so
+  consecutive requests land on the same cache.
+
+These helpers never mutate the caller's messages — the stored
+``ContextWindow`` must stay in plain-string form.
+"""
+
+from typing import Optional, Tuple
+
+EPHEMERAL = {"type": "ephemeral"}
+
+# Model id prefixes (OpenRouter naming) that require explicit breakpoints
+BREAKPOINT_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
+
+def needs_cache_breakpoints(model: str) -> bool:
+    return model.lower().startswith(BREAKPOINT_MODEL_PREFIXES)
+
+
+def _with_cache_control(message: dict) -> dict:
+    content = message.get("content")
+    if isinstance(content, str) and content:
+        blocks = [{"type": "text", "text": content, "cache_control": EPHEMERAL}]
+    elif isinstance(content, list) and content:
+        blocks = [dict(block) for block in content]
+        blocks[-1]["cache_control"] = EPHEMERAL
+    else:
+        return message
+    return {**message, "content": blocks}
+
+
+def add_cache_breakpoints(messages: list) -> list:
+    """
+    Return a copy of ``messages`` with cache breakpoints on:
+
+    1. the system prompt (caches tool schemas + system prompt), and
+    2. the last message with text content — the end of the stable prefix.
+       The next iteration only appends after it, so its request reads
+       everything up to here from cache and writes the new tail.
+    """
+    if not messages:
+        return messages
+    result = list(messages)
+
+    if result[0].get("role") == "system":
+        result[0] = _with_cache_control(result[0])
+
+    for i in range(len(result) - 1, 0, -1):
+        msg = result[i]
+        if msg.get("role") in ("user", "tool") and msg.get("content"):
+            result[i] = _with_cache_control(msg)
+            break
+
+    return result
+
+
+def extract_cache_tokens(usage: Optional[dict]) -> Tuple[int, int]:
+    """
+    Return ``(cache_read_tokens, cache_write_tokens)`` from a usage block.
+
+    Understands the OpenAI/OpenRouter ``prompt_tokens_details`` shape as
+    well as Anthropic-style ``cache_*_input_tokens`` fields.
+    """
+    if not usage:
+        return 0, 0
+    details = usage.get("prompt_tokens_details") or {}
+    read = (
+        details.get("cached_tokens")
+        or usage.get("cache_read_input_tokens")
+        or usage.get("cached_tokens")
+        or 0
+    )
+    write = details.get("cache_write_tokens") or usage.get("cache_creation_input_tokens") or 0
+    return int(read), int(write)
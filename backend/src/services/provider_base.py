@@ -0,0 +1,261 @@
+"""
+LLM Provider Interface.
+
+Every chat backend is a ``Provider``. Providers that speak the
+OpenAI-compatible ``/chat/completions`` protocol subclass
+``OpenAICompatibleProvider`` and only describe what differs (base URL,
+headers, capabilities, model listing). The request building and SSE
+streaming loop live here once, so connection pooling and stream parsing
+improvements apply to every backend.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, Optional, Tuple
+
+from .http_pool import provider_pool
+from .rate_limiter import admission_controller
+from .token_estimator import estimate_messages_tokens
+from .sse import DONE_SENTINEL, JSON_DECODE_ERRORS, iter_sse_data, json_loads
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    """Feature flags describing what a provider's API supports."""
+
+    parallel_tool_calls: bool = True  # Model may return several tool calls in one turn
+    usage_reporting: bool = False     # Streams token usage at the end of a completion
+    prompt_caching: bool = False      # Accepts cache_control breakpoints / prefix caching
+
+
+class ModelListError(Exception):
+    """Model listing failed; the message becomes the ``fetch_models`` error."""
+
+
+class Provider(ABC):
+    """Base interface for an LLM provider."""
+
+    name: str = ""
+    display_name: str = ""
+    base_url: str = ""
+    capabilities: ProviderCapabilities = ProviderCapabilities()
+
+    @abstractmethod
+    async def fetch_models(self, api_key: str) -> dict:
+        """Return ``{"success": True, "models": [...]}`` or ``{"success": False, "error": ...}``."""
+
+    @abstractmethod
+    async def chat_completion(
+        self,
+        api_key: str,
+        model: str,
+        messages: list,
+        tools: Optional[list] = None,
+        stream: bool = True,
+        prompt_cache_key: Optional[str] = None,
+    ) -> AsyncGenerator:
+        """
+        Streaming chat completion with native function/tool calling.
+
+        When ``prompt_cache_key`` is set and the provider supports prompt
+        caching, provider-specific caching hints are added to the request.
+
+        Yields events:
+          {"type": "admission", "queue_wait": <seconds queued by the rate limiter>}
+          {"type": "chunk", "data": <raw SSE chunk dict>}
+          {"type": "done"}
+          {"type": "error", "error": "...", "status_code": int, "retry_after": float | None}
+        """
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "display_name": self.display_name or self.name,
+            "base_url": self.base_url,
+            "capabilities": {
+                "parallel_tool_calls": self.capabilities.parallel_tool_calls,
+                "usage_reporting": self.capabilities.usage_reporting,
+                "prompt_caching": self.capabilities.prompt_caching,
+            },
+        }
+
+
+class OpenAICompatibleProvider(Provider):
+    """Shared implementation for providers exposing an OpenAI-compatible API."""
+
+    error_label: str = "API Error"
+
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        base_url: Optional[str] = None,
+        display_name: Optional[str] = None,
+        capabilities: Optional[ProviderCapabilities] = None,
+    ):
+        if name is not None:
+            self.name = name
+        if base_url is not None:
+            self.base_url = base_url.rstrip("/")
+        if display_name is not None:
+            self.display_name = display_name
+        if capabilities is not None:
+            self.capabilities = capabilities
+
+    # ------------------------------------------------------------------
+    # Request building
+    # ------------------------------------------------------------------
+
+    def get_headers(self, api_key: str) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        return headers
+
+    def build_payload(self, model: str, messages: list, tools: Optional[list], stream: bool) -> dict:
+        payload: dict = {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+        }
+        if tools:
+            payload["tools"] = tools
+            payload["tool_choice"] = "auto"
+            if not self.capabilities.parallel_tool_calls:
+                payload["parallel_tool_calls"] = False
+        return payload
+
+    def apply_prompt_caching(self, payload: dict, headers: dict, cache_key: str) -> dict:
+        """Add provider-specific prompt caching hints. Prefix caching is automatic by default."""
+        return payload
+
+    def request_usage(self, payload: dict) -> None:
+        """Ask the provider to stream a final usage chunk."""
+        payload["stream_options"] = {"include_usage": True}
+
+    # ------------------------------------------------------------------
+    # Model listing
+    # ------------------------------------------------------------------
+
+    async def fetch_models(self, api_key: str) -> dict:
+        """List models with ``list_models``, format each with ``format_model`` and sort by name."""
+        try:
+            models, extra = await self.list_models(api_key)
+            formatted = [self.format_model(m) for m in models]
+            formatted.sort(key=lambda x: (x.get("name") or "").lower())
+            return {"success": True, "models": formatted, **extra}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def list_models(self, api_key: str) -> Tuple[list, dict]:
+        """
+        Raw model entries from the standard ``GET /models`` endpoint, plus
+        extra fields for the ``fetch_models`` result. Override for catalogues
+        that paginate or live elsewhere; raise ``ModelListError`` on failure.
+        """
+        client = provider_pool.get_client(self.base_url)
+        response = await client.get(
+            f"{self.base_url}/models",
+            headers=self.get_headers(api_key),
+            timeout=30.0,
+        )
+        if response.status_code != 200:
+            raise ModelListError(f"Failed to fetch models: {response.status_code}")
+        return response.json().get("data", []), {}
+
+    def format_model(self, model: dict) -> dict:
+        """One raw model entry as ``{"id", "name", "context_length", "description", ...}``."""
+        model_id = model.get("id", "")
+        return {
+            "id": model_id,
+            "name": model.get("name", model_id),
+            "context_length": model.get("context_length") or model.get("context_window") or 0,
+            "description": f"{self.display_name or self.name} - {model.get('owned_by', 'unknown')}",
+        }
+
+    # ------------------------------------------------------------------
+    # Streaming core
+    # ------------------------------------------------------------------
+
+    async def chat_completion(
+        self,
+        api_key: str,
+        model: str,
+        messages: list,
+        tools: Optional[list] = None,
+        stream: bool = True,
+        prompt_cache_key: Optional[str] = None,
+    ) -> AsyncGenerator:
+        payload = self.build_payload(model, messages, tools, stream)
+        headers = self.get_headers(api_key)
+        if self.capabilities.usage_reporting:
+            self.request_usage(payload)
+        if prompt_cache_key and self.capabilities.prompt_caching:
+            payload = self.apply_prompt_caching(payload, headers, prompt_cache_key)
+        client = provider_pool.get_client(self.base_url)
+
+        estimated_tokens = estimate_messages_tokens(messages, tools)
+        queue_wait = await admission_controller.acquire(self.name, api_key, estimated_tokens)
+        # Admitted but never answered (cancelled, connection failure): give the capacity back
+        responded = False
+        try:
+            if queue_wait > 0.001:
+                yield {"type": "admission", "queue_wait": queue_wait}
+
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=headers,
+                timeout=120.0,
+            ) as response:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                admission_controller.observe(self.name, api_key, response.status_code, response.headers, retry_after)
+                responded = True
+
+                if response.status_code != 200:
+                    # Rejected: the request counts, the prompt was not processed
+                    admission_controller.refund(self.name, api_key, estimated_tokens, request=False)
+                    error_text = await response.aread()
+                    yield {
+                        "type": "error",
+                        "error": f"{self.error_label} {response.status_code}: {error_text.decode(errors='replace')}",
+                        "status_code": response.status_code,
+                        "retry_after": retry_after,
+                    }
+                    return
+
+                usage = None
+                async for data in iter_sse_data(response.aiter_bytes()):
+                    if data == DONE_SENTINEL:
+                        yield {"type": "done"}
+                        break
+                    try:
+                        chunk = json_loads(data)
+                    except JSON_DECODE_ERRORS:
+                        continue
+                    if chunk.get("usage"):
+                        usage = chunk["usage"]
+                    yield {"type": "chunk", "data": chunk}
+
+                if usage and usage.get("total_tokens"):
+                    admission_controller.record_usage(self.name, api_key, estimated_tokens, usage["total_tokens"])
+        finally:
+            if not responded:
+                admission_controller.refund(self.name, api_key, estimated_tokens)
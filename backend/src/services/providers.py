@@ -0,0 +1,78 @@
+"""
+Provider Registry.
+
+Maps provider names (as sent by the frontend in ``provider``) to ``Provider``
+instances. The built-in OpenRouter, Groq and Fireworks providers are always
+registered. A local/offline OpenAI-compatible server (Ollama, llama.cpp,
+vLLM, LM Studio, ...) is registered as ``local`` when ``LOCAL_LLM_API_URL``
+is set, and further backends can be added at runtime with
+``register_provider``.
+
+Configuration (environment variables):
+- LOCAL_LLM_API_URL            Base URL of a local OpenAI-compatible API, e.g. http://localhost:11434/v1
+- LOCAL_LLM_NAME               Display name for the local provider (default: "Local")
+- LOCAL_LLM_PARALLEL_TOOLS     Whether the local model supports parallel tool calls (default: false)
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from .provider_base import OpenAICompatibleProvider, Provider, ProviderCapabilities
+from .openrouter import openrouter_provider
+from .groq import groq_provider
+from .fireworks import fireworks_provider
+
+DEFAULT_PROVIDER = "openrouter"
+
+_registry: Dict[str, Provider] = {}
+
+
+def register_provider(provider: Provider, replace: bool = False) -> Provider:
+    """Register a provider under ``provider.name``."""
+    if not provider.name:
+        raise ValueError("Provider must have a name")
+    if provider.name in _registry and not replace:
+        raise ValueError(f"Provider '{provider.name}' is already registered")
+    _registry[provider.name] = provider
+    return provider
+
+
+def unregister_provider(name: str) -> None:
+    _registry.pop(name, None)
+
+
+def get_provider(name: Optional[str]) -> Provider:
+    """Look up a provider by name, falling back to the default provider."""
+    provider = _registry.get(name or DEFAULT_PROVIDER)
+    if provider is None:
+        provider = _registry[DEFAULT_PROVIDER]
+    return provider
+
+
+def has_provider(name: str) -> bool:
+    return name in _registry
+
+
+def list_providers() -> List[Provider]:
+    return list(_registry.values())
+
+
+def _register_local_provider() -> None:
+    base_url = os.getenv("LOCAL_LLM_API_URL", "").strip()
+    if not base_url:
+        return
+    parallel = os.getenv("LOCAL_LLM_PARALLEL_TOOLS", "false").strip().lower() in ("1", "true", "yes", "on")
+    register_provider(
+        OpenAICompatibleProvider(
+            name="local",
+            base_url=base_url,
+            display_name=os.getenv("LOCAL_LLM_NAME", "Local"),
+            capabilities=ProviderCapabilities(parallel_tool_calls=parallel),
+        ),
+        replace=True,
+    )
+
+
+for _provider in (openrouter_provider, groq_provider, fireworks_provider):
+    register_provider(_provider)
+_register_local_provider()
@@ -0,0 +1,251 @@
+"""
+Client-side Admission Control.
+
+Many sessions can share one provider API key. Instead of letting them all
+hit the provider at once and trip a 429 storm, every chat completion first
+passes through a process-wide admission controller keyed by provider and
+a hash of the API key. Each key has two token buckets:
+
+- requests per minute (RPM)
+- tokens per minute (TPM), charged with the estimated prompt size and
+  corrected with the real usage when the provider reports it
+
+Limits come from configuration, or are learned from the provider's
+``x-ratelimit-*`` response headers. A 429 with ``Retry-After`` pauses the
+key for everyone. A request that is admitted but never reaches the
+provider (cancelled, connection failure) is refunded; one the provider
+rejects gets its tokens back. Callers queue (FIFO) for at most ``RATE_LIMIT_MAX_WAIT``
+seconds and are then let through anyway — the retry layer handles any
+remaining 429s.
+
+Configuration (environment variables):
+- RATE_LIMIT_<PROVIDER>_RPM   e.g. RATE_LIMIT_GROQ_RPM=30
+- RATE_LIMIT_<PROVIDER>_TPM   e.g. RATE_LIMIT_GROQ_TPM=6000
+- RATE_LIMIT_MAX_WAIT         Max seconds an iteration queues (default: 30)
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+from .model_cache import hash_api_key
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Continuous-refill token bucket. ``capacity=None`` means unlimited."""
+
+    def __init__(self, per_minute: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.capacity: Optional[float] = None
+        self.refill_per_second = 0.0
+        self.tokens = 0.0
+        self.updated = clock()
+        if per_minute:
+            self.set_rate(per_minute)
+
+    def set_rate(self, per_minute: float) -> None:
+        self._refill()
+        first = self.capacity is None
+        self.capacity = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.tokens = self.capacity if first else min(self.tokens, self.capacity)
+
+    def _refill(self) -> None:
+        now = self.clock()
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.capacity is None:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        if self.capacity is None:
+            return
+        self._refill()
+        self.tokens -= amount  # May go negative; later callers then wait longer
+
+    def refund(self, amount: float) -> None:
+        if self.capacity is None:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def clamp(self, remaining: float) -> None:
+        """Align the bucket with the provider's view of what is left."""
+        if self.capacity is None:
+            return
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+
+
+class KeyLimiter:
+    """Admission state for one provider/API key pair."""
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.tpm_configured = tpm is not None
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.admitted = 0
+        self.queued = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.timeouts = 0
+        self.refunds = 0
+
+    async def acquire(self, estimated_tokens: int, max_wait: float) -> float:
+        started = self.clock()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = self.clock()
+                    wait = max(
+                        self.blocked_until - now,
+                        self.requests.wait_time(1),
+                        self.tokens.wait_time(estimated_tokens),
+                    )
+                    remaining_budget = max_wait - (now - started)
+                    if wait <= 0:
+                        break
+                    if remaining_budget <= 0:
+                        self.timeouts += 1
+                        break
+                    await self.sleep(min(wait, remaining_budget))
+                self.requests.consume(1)
+                self.tokens.consume(estimated_tokens)
+        finally:
+            self.waiting -= 1
+
+        waited = self.clock() - started
+        self.admitted += 1
+        if waited > 0.001:
+            self.queued += 1
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+        return waited
+
+    def observe(self, status_code: int, headers: Mapping[str, str], retry_after: Optional[float]) -> None:
+        limit_tokens = _parse_number(headers.get("x-ratelimit-limit-tokens"))
+        remaining_requests = _parse_number(headers.get("x-ratelimit-remaining-requests"))
+        remaining_tokens = _parse_number(headers.get("x-ratelimit-remaining-tokens"))
+
+        # Request limits are often per day, so only the token limit is learned
+        # as a per-minute rate; "remaining" values keep both buckets honest.
+        if limit_tokens and not self.tpm_configured:
+            if self.tokens.capacity != limit_tokens:
+                self.tokens.set_rate(limit_tokens)
+        if remaining_requests is not None:
+            self.requests.clamp(remaining_requests)
+        if remaining_tokens is not None:
+            self.tokens.clamp(remaining_tokens)
+
+        if status_code == 429:
+            pause = retry_after if retry_after is not None else 1.0
+            self.blocked_until = max(self.blocked_until, self.clock() + pause)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def refund(self, estimated_tokens: int, request: bool = True) -> None:
+        """Give back what ``acquire`` charged for a request the provider did not process."""
+        self.refunds += 1
+        if request:
+            self.requests.refund(1)
+        self.tokens.refund(estimated_tokens)
+
+    def snapshot(self) -> dict:
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "requests_available": round(self.requests.tokens, 1) if self.requests.capacity else None,
+            "tokens_available": round(self.tokens.tokens) if self.tokens.capacity else None,
+            "blocked_for": round(max(self.blocked_until - self.clock(), 0.0), 2),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+            "refunds": self.refunds,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_wait_seen * 1000, 1),
+        }
+
+
+class AdmissionController:
+    """Process-wide registry of per-provider/per-key limiters."""
+
+    def __init__(self, max_wait: Optional[float] = None):
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+        self._limiters: Dict[Tuple[str, str], KeyLimiter] = {}
+
+    def get_limiter(self, provider: str, api_key: str) -> KeyLimiter:
+        key = (provider, hash_api_key(api_key))
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            prefix = f"RATE_LIMIT_{provider.upper()}"
+            limiter = KeyLimiter(
+                rpm=_parse_number(os.getenv(f"{prefix}_RPM")),
+                tpm=_parse_number(os.getenv(f"{prefix}_TPM")),
+            )
+            self._limiters[key] = limiter
+        return limiter
+
+    async def acquire(self, provider: str, api_key: str, estimated_tokens: int) -> float:
+        """Wait for admission; returns the time spent queued in seconds."""
+        return await self.get_limiter(provider, api_key).acquire(estimated_tokens, self.max_wait)
+
+    def observe(
+        self,
+        provider: str,
+        api_key: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        retry_after: Optional[float] = None,
+    ) -> None:
+        self.get_limiter(provider, api_key).observe(status_code, headers, retry_after)
+
+    def record_usage(self, provider: str, api_key: str, estimated_tokens: int, actual_tokens: int) -> None:
+        self.get_limiter(provider, api_key).record_usage(estimated_tokens, actual_tokens)
+
+    def refund(self, provider: str, api_key: str, estimated_tokens: int, request: bool = True) -> None:
+        self.get_limiter(provider, api_key).refund(estimated_tokens, request)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_wait": self.max_wait,
+            "keys": [
+                {"provider": provider, "key_hash": key_hash, **limiter.snapshot()}
+                for (provider, key_hash), limiter in sorted(self._limiters.items())
+            ],
+        }
+
+
+# Global admission controller instance
+admission_controller = AdmissionController()
@@ -0,0 +1,302 @@
+"""
+Resilient Chat Completions.
+
+Wraps ``Provider.chat_completion`` with:
+- jittered exponential backoff that honours ``Retry-After``
+- a circuit breaker per provider/model
+- optional failover to a fallback provider/model
+
+Retries only happen before the first chunk has been yielded, so callers
+never see duplicated or partial tokens from an abandoned attempt. Once a
+stream has started, a failure is passed through as a normal error event.
+
+Besides the provider's own events, the wrapper yields:
+  {"type": "retry", "provider", "model", "attempt", "delay", "error"}
+  {"type": "failover", "from_provider", "from_model", "provider", "model", "error"}
+
+Configuration (environment variables):
+- PROVIDER_RETRY_MAX_ATTEMPTS      Attempts per provider/model (default: 4)
+- PROVIDER_RETRY_BASE_DELAY        First backoff step in seconds (default: 0.5)
+- PROVIDER_RETRY_MAX_DELAY         Backoff cap in seconds (default: 20)
+- PROVIDER_RETRY_MAX_RETRY_AFTER   Longest Retry-After we are willing to wait (default: 60)
+- CIRCUIT_BREAKER_THRESHOLD        Consecutive failures that open a breaker (default: 5)
+- CIRCUIT_BREAKER_RESET_SECONDS    Seconds before an open breaker lets a trial through (default: 30)
+- FALLBACK_PROVIDER / FALLBACK_MODEL / FALLBACK_API_KEY
+                                   Default failover target when a request does not set one
+"""
+
+import asyncio
+import os
+import random
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, Optional, Tuple
+
+import httpx
+
+from .providers import get_provider, has_provider
+
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 520, 522, 524, 529}
+
+# Request-level problems that another provider/model would reject as well
+NO_FAILOVER_STATUS_CODES = {400, 413, 422}
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = int(os.getenv("PROVIDER_RETRY_MAX_ATTEMPTS", "4"))
+    base_delay: float = float(os.getenv("PROVIDER_RETRY_BASE_DELAY", "0.5"))
+    max_delay: float = float(os.getenv("PROVIDER_RETRY_MAX_DELAY", "20"))
+    max_retry_after: float = float(os.getenv("PROVIDER_RETRY_MAX_RETRY_AFTER", "60"))
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Delay before retry number ``attempt`` (0-based), or None to give up.
+
+        Uses full jitter; a server-provided ``Retry-After`` is a lower bound.
+        """
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+@dataclass
+class FallbackTarget:
+    provider: str
+    model: str
+    api_key: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["FallbackTarget"]:
+        provider = os.getenv("FALLBACK_PROVIDER", "").strip()
+        model = os.getenv("FALLBACK_MODEL", "").strip()
+        if not provider or not model:
+            return None
+        return cls(provider=provider, model=model, api_key=os.getenv("FALLBACK_API_KEY") or None)
+
+
+class CircuitBreaker:
+    """Classic closed → open → half-open breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+        self.reset_timeout = reset_timeout or float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - (self.opened_at or 0) >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial that ended without an outcome (cancelled, non-retryable error)."""
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_seconds_ago": round(time.monotonic() - self.opened_at, 1) if self.opened_at else None,
+        }
+
+
+class _AttemptFailed(Exception):
+    def __init__(self, error: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+
+class ResilientChatClient:
+    """Retrying, circuit-breaking, failing-over front for provider chat completions."""
+
+    def __init__(self, policy: Optional[RetryPolicy] = None):
+        self.policy = policy or RetryPolicy()
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._stats: Dict[Tuple[str, str], dict] = {}
+
+    def get_breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker()
+        return self._breakers[key]
+
+    def _stat(self, provider: str, model: str) -> dict:
+        key = (provider, model)
+        if key not in self._stats:
+            self._stats[key] = {"requests": 0, "retries": 0, "failures": 0, "failovers": 0, "breaker_rejections": 0}
+        return self._stats[key]
+
+    async def chat_completion(
+        self,
+        provider: str,
+        api_key: str,
+        model: str,
+        messages: list,
+        tools: Optional[list] = None,
+        fallback: Optional[FallbackTarget] = None,
+        prompt_cache_key: Optional[str] = None,
+    ) -> AsyncGenerator:
+        targets = [(provider, api_key, model)]
+        fallback = fallback or FallbackTarget.from_env()
+        if fallback and has_provider(fallback.provider) and (fallback.provider, fallback.model) != (provider, model):
+            targets.append((fallback.provider, fallback.api_key or api_key, fallback.model))
+
+        last_error = "No provider available"
+        last_failure: Optional[_AttemptFailed] = None
+        for index, (target_provider, target_key, target_model) in enumerate(targets):
+            if index > 0:
+                self._stat(provider, model)["failovers"] += 1
+                yield {
+                    "type": "failover",
+                    "from_provider": provider,
+                    "from_model": model,
+                    "provider": target_provider,
+                    "model": target_model,
+                    "error": last_error,
+                }
+
+            breaker = self.get_breaker(target_provider, target_model)
+            stats = self._stat(target_provider, target_model)
+
+            attempt = 0
+            while True:
+                if not breaker.allow():
+                    stats["breaker_rejections"] += 1
+                    last_error = f"Circuit open for {target_provider}/{target_model}: {last_error}"
+                    break
+
+                stats["requests"] += 1
+                started = False
+                # This attempt is the half-open trial; it must be settled or released
+                trial = breaker.state == breaker.HALF_OPEN
+                settled = False
+                try:
+                    stream = get_provider(target_provider).chat_completion(
+                        api_key=target_key,
+                        model=target_model,
+                        messages=messages,
+                        tools=tools,
+                        stream=True,
+                        prompt_cache_key=prompt_cache_key,
+                    )
+                    async with aclosing(stream):
+                        async for event in stream:
+                            if event.get("type") == "error":
+                                if started:
+                                    breaker.record_failure()
+                                    yield event
+                                    return
+                                raise _AttemptFailed(
+                                    event.get("error", "Unknown error"),
+                                    event.get("status_code"),
+                                    event.get("retry_after"),
+                                )
+                            if not started and event.get("type") in ("chunk", "done"):
+                                started = True
+                                breaker.record_success()
+                                settled = True
+                            yield event
+                    if not started:
+                        breaker.record_success()
+                        settled = True
+                    return
+                except _AttemptFailed as e:
+                    failure = e
+                except httpx.TransportError as e:
+                    if started:
+                        breaker.record_failure()
+                        yield {"type": "error", "error": f"Stream interrupted: {e}"}
+                        return
+                    failure = _AttemptFailed(f"{type(e).__name__}: {e}")
+                finally:
+                    if trial and not settled:
+                        breaker.release_trial()
+
+                last_error = failure.error
+                last_failure = failure
+                stats["failures"] += 1
+                if failure.retryable:
+                    breaker.record_failure()
+                else:
+                    break
+
+                delay = self.policy.backoff(attempt, failure.retry_after)
+                attempt += 1
+                if delay is None or attempt >= self.policy.max_attempts:
+                    break
+
+                stats["retries"] += 1
+                yield {
+                    "type": "retry",
+                    "provider": target_provider,
+                    "model": target_model,
+                    "attempt": attempt,
+                    "delay": round(delay, 2),
+                    "error": failure.error,
+                }
+                await asyncio.sleep(delay)
+
+            if last_failure is not None and last_failure.status_code in NO_FAILOVER_STATUS_CODES:
+                break
+
+        yield {"type": "error", "error": last_error}
+
+    def get_stats(self) -> dict:
+        keys = set(self._stats) | set(self._breakers)
+        return {
+            "policy": {
+                "max_attempts": self.policy.max_attempts,
+                "base_delay": self.policy.base_delay,
+                "max_delay": self.policy.max_delay,
+            },
+            "models": [
+                {
+                    "provider": provider,
+                    "model": model,
+                    **self._stat(provider, model),
+                    "breaker": self.get_breaker(provider, model).snapshot(),
+                }
+                for provider, model in sorted(keys)
+            ],
+        }
+
+
+# Global resilient chat client instance
+resilient_client = ResilientChatClient()
@@ -0,0 +1,378 @@
+"""
+In-sandbox edit helper.
+
+This module is standard-library only: ``E2BSandboxManager`` uploads its own
+source into the sandbox once per session and runs it as
+
+    python3 /tmp/.sandbox_edit_helper.py <base64 JSON request>
+
+so an edit sends only the operation (a string replacement, a line splice,
+…) instead of moving the whole file over the network twice. The same
+``apply_ops`` runs in the backend for the read-modify-write fallback and
+to keep the file content cache in sync, so both paths produce identical
+results and error messages.
+
+Request: ``{"path": str, "ops": [op, ...], "missing_ok": bool}``. Ops are
+applied in order to the file's content; if any op fails nothing is written.
+Otherwise the new content is written to a temp file next to the target
+and renamed over it (mode preserved), so readers never see a partial file.
+
+Ops (each a dict with an ``op`` key); line numbers always refer to the
+content before the first op (see ``LineMap``):
+- ``replace``       ``old``, ``new``: replace every occurrence
+- ``insert``        ``line``, ``text``: insert after line ``line`` (0 = top)
+- ``delete_lines``  ``start``, ``end``: delete the 1-based inclusive range
+- ``delete_str``    ``target``: delete the single occurrence of ``target``
+- ``append``        ``text``
+- ``splice``        ``hunks``: ``[[start, end, [lines]], ...]`` replacing
+                    ``lines[start:end]`` (lines keep their line endings),
+                    computed against the content with digest ``expect_sha256``
+
+Response (one JSON line on stdout, exit code 0 unless the helper itself
+crashed): ``{"success", "before_sha256", "sha256", "size", "total_lines",
+"results": [per-op dict]}`` or ``{"success": false, "error", "failed_op"}``.
+
+``{"path": str, "read": {"offset", "limit", "max_bytes", "default_lines"}}``
+instead returns a line window of a file too large to fetch whole
+(``{"success", "size", "window"}``, see ``line_window``), or
+``{"success", "binary": true, "size", "mime_type"}``.
+"""
+
+import base64
+import codecs
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import tempfile
+
+
+class EditError(Exception):
+    """An op cannot be applied to the current content; nothing is written."""
+
+    index = None  # position of the failing op, set by apply_ops
+
+
+def encode_text(content):
+    """UTF-8 bytes of ``content`` for hashing and sizing; shared with the file cache so digests agree."""
+    return content.encode("utf-8", "surrogatepass")
+
+
+def digest(content):
+    return hashlib.sha256(encode_text(content)).hexdigest()
+
+
+class LineMap:
+    """
+    Line numbers in a batch of ops refer to the content before the batch.
+    Every op records the lines it changed (lines ``[first, first + removed)``
+    became ``added`` lines); later line numbers are mapped through them.
+    """
+
+    def __init__(self, content):
+        self.total = content.count("\n") + 1
+        self.changes = []
+
+    def record(self, first, removed, added):
+        if removed != added:
+            self.changes.append((first, removed, added))
+
+    def boundary(self, position, after_inserted=True):
+        """
+        Map the boundary below line ``position`` (0 = top of file). Lines
+        inserted exactly there by earlier ops end up before the mapped
+        boundary when ``after_inserted``, after it otherwise.
+        """
+        original = position
+        for first, removed, added in self.changes:
+            if position < first or (position == first and (removed or not after_inserted)):
+                continue
+            if position >= first + removed:
+                position += added - removed
+            else:
+                raise EditError("Line %d was changed by an earlier edit in this batch" % original)
+        return position
+
+
+def _occurrence_lines(content, needle):
+    """0-based line of each occurrence of ``needle``, bottom-up."""
+    found, line, offset = [], 0, 0
+    while needle:
+        index = content.find(needle, offset)
+        if index < 0:
+            break
+        line += content.count("\n", offset, index)
+        found.append(line)
+        line += needle.count("\n")
+        offset = index + len(needle)
+    return found[::-1]
+
+
+def _replace(content, op, path, lines):
+    old, new = op.get("old", ""), op.get("new", "")
+    occurrences = content.count(old)
+    if occurrences == 0:
+        raise EditError("old_string not found in %s" % path)
+    for line in _occurrence_lines(content, old):
+        lines.record(line, old.count("\n") + 1, new.count("\n") + 1)
+    return content.replace(old, new), {"occurrences": occurrences}
+
+
+def _insert(content, op, path, lines):
+    insert_at, text = op.get("line", 0), op.get("text", "")
+    if insert_at < 0 or insert_at > lines.total:
+        raise EditError("Line %d out of range (0-%d)" % (insert_at, lines.total))
+    insert_at = lines.boundary(insert_at)
+    current = content.split("\n")
+    if insert_at == 0:
+        new_content = text + "\n" + content
+    else:
+        before = "\n".join(current[:insert_at])
+        after = "\n".join(current[insert_at:])
+        # Inserting after the last line keeps the file's trailing newline, if any
+        new_content = before + "\n" + text + ("\n" + after if insert_at < len(current) else "")
+    inserted = len(text.split("\n"))
+    lines.record(insert_at, 0, inserted)
+    return new_content, {"lines_inserted": inserted}
+
+
+def _delete_lines(content, op, path, lines):
+    start, end = op.get("start"), op.get("end")
+    total = lines.total
+    if start < 1 or end < start or start > total or end > total:
+        raise EditError("Line range %d-%d out of bounds (1-%d)" % (start, end, total))
+    first, last = lines.boundary(start - 1), lines.boundary(end, after_inserted=False)
+    current = content.split("\n")
+    deleted = current[first:last]
+    lines.record(first, last - first, 0)
+    return "\n".join(current[:first] + current[last:]), {"deleted_lines": "\n".join(deleted)}
+
+
+def _delete_str(content, op, path, lines):
+    target = op.get("target", "")
+    count = content.count(target)
+    if count == 0:
+        raise EditError("target_str not found in %s" % path)
+    if count > 1:
+        raise EditError("Multiple occurrences (%d) found — aborting" % count)
+    for line in _occurrence_lines(content, target):
+        lines.record(line, target.count("\n") + 1, 1)
+    return content.replace(target, "", 1), {}
+
+
+def _append(content, op, path, lines):
+    text = op.get("text", "")
+    lines.record(content.count("\n"), 1, text.count("\n") + 1)
+    return content + text, {}
+
+
+def _splice(content, op, path, lines):
+    expected = op.get("expect_sha256")
+    if expected and digest(content) != expected:
+        raise EditError("%s changed since the patch was computed" % path)
+    current = content.splitlines(True)
+    # Apply bottom-up so earlier hunk offsets stay valid
+    for start, end, replacement in sorted(op.get("hunks", []), key=lambda h: h[0], reverse=True):
+        if start < 0 or end < start or end > len(current):
+            raise EditError("Hunk %d-%d out of bounds (0-%d)" % (start, end, len(current)))
+        current[start:end] = replacement
+        lines.record(start, end - start, len(replacement))
+    return "".join(current), {}
+
+
+OPS = {
+    "replace": _replace,
+    "insert": _insert,
+    "delete_lines": _delete_lines,
+    "delete_str": _delete_str,
+    "append": _append,
+    "splice": _splice,
+}
+
+
+def apply_ops(content, ops, path=""):
+    """
+    Apply ``ops`` in order. Returns ``(new_content, results)``; raises
+    ``EditError`` (with ``index`` set to the failing op).
+    """
+    lines = LineMap(content)
+    results = []
+    for index, op in enumerate(ops):
+        handler = OPS.get(op.get("op"))
+        try:
+            if handler is None:
+                raise EditError("Unknown edit op: %r" % op.get("op"))
+            content, result = handler(content, op, path, lines)
+        except EditError as e:
+            e.index = index
+            raise
+        results.append(result)
+    return content, results
+
+
+def total_lines(content):
+    return content.count("\n") + 1
+
+
+# Leading bytes → type of common binary files
+_MAGIC = (
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "audio/x-wav or image/webp"),
+    (b"%PDF", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"\x7fELF", "application/x-elf"),
+    (b"\x00asm", "application/wasm"),
+    (b"SQLite format 3", "application/x-sqlite3"),
+)
+_SNIFF_BYTES = 8192
+
+
+def is_binary(data):
+    """NUL bytes or invalid UTF-8 in the first 8 KiB."""
+    sample = data[:_SNIFF_BYTES]
+    if b"\x00" in sample:
+        return True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=len(data) <= _SNIFF_BYTES)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def binary_type(data, path=""):
+    for magic, mime_type in _MAGIC:
+        if data.startswith(magic):
+            return mime_type
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def line_window(content, offset=None, limit=None, max_bytes=None, default_lines=None):
+    """
+    The lines of ``content`` to return for a ranged read.
+
+    ``offset`` (1-based) and ``limit`` select lines; without them the whole
+    file is returned if it fits in ``max_bytes``, else the first
+    ``default_lines``. The window is then cut to whole lines within
+    ``max_bytes`` (a single longer line is cut mid-line). Returns a dict
+    with ``text``, ``start_line``, ``end_line``, ``total_lines``,
+    ``truncated`` and, for cut windows, ``cut_by_bytes``; raises
+    ``EditError`` for an offset past the end.
+    """
+    lines = content.split("\n")
+    total = len(lines)
+    if offset is None and limit is None and max_bytes and len(content.encode("utf-8", "surrogateescape")) > max_bytes:
+        limit = default_lines
+    start = offset or 1
+    if start > total:
+        raise EditError("offset %d is past the end of the file (%d lines)" % (start, total))
+    end = min(total, start + limit - 1) if limit else total
+
+    selected, used, cut = [], 0, False
+    for line in lines[start - 1:end]:
+        size = len(line.encode("utf-8", "surrogateescape")) + 1
+        if max_bytes and used + size > max_bytes:
+            if not selected:
+                selected.append(line.encode("utf-8", "surrogateescape")[:max_bytes].decode("utf-8", "ignore"))
+            cut = True
+            break
+        selected.append(line)
+        used += size
+    end = start + len(selected) - 1
+    window = {
+        "text": "\n".join(selected),
+        "start_line": start,
+        "end_line": end,
+        "total_lines": total,
+        "truncated": start > 1 or end < total or cut,
+    }
+    if cut:
+        window["cut_by_bytes"] = True
+    return window
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+    fd, temp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".partial", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", errors="surrogateescape", newline="") as handle:
+            handle.write(content)
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read(request):
+    """Ranged read of a large file: only the window leaves the sandbox."""
+    path = request["path"]
+    read = request["read"]
+    try:
+        with open(path, "rb") as handle:
+            data = handle.read()
+    except FileNotFoundError:
+        return {"success": False, "error": "File not found: %s" % path, "not_found": True}
+    if is_binary(data):
+        return {"success": True, "binary": True, "size": len(data), "mime_type": binary_type(data, path)}
+    content = data.decode("utf-8", "replace")
+    try:
+        window = line_window(content, read.get("offset"), read.get("limit"), read.get("max_bytes"), read.get("default_lines"))
+    except EditError as e:
+        return {"success": False, "error": str(e)}
+    return {"success": True, "size": len(data), "window": window}
+
+
+def run(request):
+    path = request["path"]
+    if "read" in request:
+        return _read(request)
+    # Edit the target of a symlink, not the link itself
+    real_path = os.path.realpath(path)
+    try:
+        with open(real_path, encoding="utf-8", errors="surrogateescape", newline="") as handle:
+            content = handle.read()
+    except FileNotFoundError:
+        if not request.get("missing_ok"):
+            return {"success": False, "error": "File not found: %s" % path, "not_found": True}
+        content = ""
+    before = digest(content)
+    try:
+        new_content, results = apply_ops(content, request.get("ops", []), path)
+    except EditError as e:
+        return {"success": False, "error": str(e), "failed_op": e.index, "before_sha256": before}
+    if new_content != content or not os.path.exists(real_path):
+        _write_atomic(real_path, new_content)
+    return {
+        "success": True,
+        "before_sha256": before,
+        "sha256": digest(new_content),
+        "size": len(new_content.encode("utf-8", "surrogateescape")),
+        "total_lines": total_lines(new_content),
+        "results": results,
+    }
+
+
+def main(argv):
+    try:
+        request = json.loads(base64.b64decode(argv[1]).decode("utf-8", "surrogatepass"))
+        response = run(request)
+    except Exception as e:
+        response = {"success": False, "error": "%s: %s" % (type(e).__name__, e)}
+    sys.stdout.write(json.dumps(response))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
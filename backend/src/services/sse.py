@@ -0,0 +1,97 @@
+"""
+Server-Sent Events decoding for provider streams.
+
+Frames the raw response bytes directly instead of going through
+``aiter_lines()`` (which decodes every chunk to text and allocates a string
+per line), and decodes JSON payloads with the fastest available backend:
+``orjson`` → ``msgspec`` → stdlib ``json``.
+
+Framing follows the SSE spec for what providers actually send:
+- lines end in ``\\n`` or ``\\r\\n``
+- consecutive ``data:`` lines are joined with ``\\n`` into one event
+- a blank line dispatches the event
+- comment lines (``: OPENROUTER PROCESSING``) and other fields are ignored
+"""
+
+import json
+from typing import AsyncIterator, Callable, List, Tuple, Type
+
+try:
+    import orjson
+
+    json_loads: Callable[[bytes], object] = orjson.loads
+    JSON_DECODE_ERRORS: Tuple[Type[Exception], ...] = (orjson.JSONDecodeError,)
+    JSON_BACKEND = "orjson"
+except ImportError:  # pragma: no cover - depends on installed extras
+    try:
+        import msgspec
+
+        json_loads = msgspec.json.Decoder().decode
+        JSON_DECODE_ERRORS = (msgspec.DecodeError,)
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        json_loads = json.loads
+        JSON_DECODE_ERRORS = (ValueError,)
+        JSON_BACKEND = "json"
+
+DONE_SENTINEL = b"[DONE]"
+
+
+class SSEDecoder:
+    """Incremental byte-level SSE decoder that yields ``data`` payloads."""
+
+    __slots__ = ("_buffer", "_data")
+
+    def __init__(self):
+        self._buffer = b""
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Consume a chunk of bytes and return the payloads of completed events."""
+        if self._buffer:
+            chunk = self._buffer + chunk
+        events: List[bytes] = []
+        data = self._data
+        pos = 0
+        end = len(chunk)
+
+        while pos < end:
+            nl = chunk.find(b"\n", pos)
+            if nl == -1:
+                break
+            line_end = nl - 1 if nl > pos and chunk[nl - 1] == 13 else nl  # strip "\r"
+
+            if line_end == pos:
+                # Blank line: dispatch the pending event
+                if data:
+                    events.append(data[0] if len(data) == 1 else b"\n".join(data))
+                    data.clear()
+            elif chunk.startswith(b"data:", pos):
+                start = pos + 5
+                if start < line_end and chunk[start] == 32:  # optional single space
+                    start += 1
+                data.append(chunk[start:line_end])
+            # Comments (":") and other fields (event/id/retry) are ignored
+
+            pos = nl + 1
+
+        self._buffer = chunk[pos:] if pos < end else b""
+        return events
+
+    def flush(self) -> List[bytes]:
+        """Dispatch any event left pending when the stream ends without a blank line."""
+        events = self.feed(b"\n") if self._buffer else []
+        if self._data:
+            events.append(b"\n".join(self._data))
+            self._data.clear()
+        return events
+
+
+async def iter_sse_data(byte_stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yield the ``data`` payload of every SSE event in ``byte_stream``."""
+    decoder = SSEDecoder()
+    async for chunk in byte_stream:
+        for payload in decoder.feed(chunk):
+            yield payload
+    for payload in decoder.flush():
+        yield payload
@@ -0,0 +1,62 @@
+"""
+Local token estimation.
+
+A cheap, dependency-free estimate of how many tokens a chat request will
+use, for admission control and context budgeting. It does not need to be
+exact — it only has to be in the right ballpark and fast enough to run
+on every iteration.
+"""
+
+import json
+from typing import Optional
+
+# Average characters per token for English prose and source code
+CHARS_PER_TOKEN = 4.0
+
+# Per-message framing overhead (role, separators) in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_text_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _content_chars(content) -> int:
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content)
+    if isinstance(content, list):
+        # Multi-part content (e.g. text blocks with cache_control)
+        return sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return len(str(content))
+
+
+def estimate_message_tokens(message: dict) -> int:
+    chars = _content_chars(message.get("content"))
+    for tc in message.get("tool_calls") or []:
+        fn = tc.get("function", {})
+        chars += len(fn.get("name", "")) + len(fn.get("arguments", ""))
+    return int(chars / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_messages_tokens(messages: list, tools: Optional[list] = None) -> int:
+    total = sum(estimate_message_tokens(m) for m in messages)
+    if tools:
+        total += estimate_tools_tokens(tools)
+    return total
+
+
+_tools_cache: dict = {}
+
+
+def estimate_tools_tokens(tools: list) -> int:
+    """Tool schemas rarely change, so the estimate is cached per list object."""
+    key = id(tools)
+    cached = _tools_cache.get(key)
+    if cached is None or cached[0] is not tools:
+        cached = (tools, estimate_text_tokens(json.dumps(tools)))
+        _tools_cache[key] = cached
+    return cached[1]
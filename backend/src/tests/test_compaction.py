@@ -0,0 +1,33 @@
+import pytest
+
+from src.agent import compaction
+from src.agent.compaction import ContextCompactor
+from src.agent.models import ContextWindow
+
+
+@pytest.mark.asyncio
+async def test_model_switch_resolves_new_context_length(monkeypatch):
+    lengths = {("p1", "small"): 8000, ("p2", "large"): 200000}
+    seen = []
+
+    async def fake_resolve(provider, api_key, model):
+        seen.append((provider, api_key, model))
+        return lengths[(provider, model)]
+
+    monkeypatch.setattr(compaction, "resolve_context_length", fake_resolve)
+    compactor = ContextCompactor("p1", "key1", "small")
+    context = ContextWindow()
+
+    await compactor.maybe_compact(context, fixed_tokens=10)
+    assert compactor.context_length == 8000
+
+    compactor.use_model("p1", "key2", "small")
+    await compactor.maybe_compact(context, fixed_tokens=10)
+    assert compactor.context_length == 8000
+    assert compactor.api_key == "key2"
+    assert len(seen) == 1
+
+    compactor.use_model("p2", "key3", "large")
+    await compactor.maybe_compact(context, fixed_tokens=10)
+    assert compactor.context_length == 200000
+    assert seen[-1] == ("p2", "key3", "large")
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import e2b_sandbox
+from src.services.e2b_sandbox import E2BSandboxManager
+from src.services.file_cache import FileContentCache, SessionFileCache
+
+
+class FakeFiles:
+    def __init__(self):
+        self.info = {}
+        self.stats = 0
+        self.clock = 0
+
+    async def write(self, path, content):
+        self.clock += 1
+        self.info[path] = SimpleNamespace(size=len(content.encode()), modified_time=self.clock)
+
+    async def get_info(self, path):
+        self.stats += 1
+        return self.info[path]
+
+
+def _sandbox_with(monkeypatch, trust_seconds=0.0):
+    cache = FileContentCache(enabled=True, trust_seconds=trust_seconds)
+    monkeypatch.setattr(e2b_sandbox, "file_cache", cache)
+    sandbox = SimpleNamespace(files=FakeFiles())
+    manager = E2BSandboxManager()
+    manager.sandboxes["s"] = sandbox
+    return manager, sandbox, cache
+
+
+def test_default_always_validates():
+    assert FileContentCache(enabled=True).trust_seconds == 0
+
+
+@pytest.mark.asyncio
+async def test_external_change_is_detected(monkeypatch):
+    manager, sandbox, cache = _sandbox_with(monkeypatch)
+    assert (await manager.write_file("s", "/home/user/a.py", "x = 1\n"))["success"]
+    assert cache.session("s").get("/home/user/a.py").mtime == 1
+
+    assert (await manager._cached_file("s", sandbox, "/home/user/a.py")).content == "x = 1\n"
+
+    # Rewritten by a command (sed, git checkout, formatter...) behind the cache's back, same size
+    sandbox.files.info["/home/user/a.py"] = SimpleNamespace(size=6, modified_time=2)
+    assert await manager._cached_file("s", sandbox, "/home/user/a.py") is None
+    assert sandbox.files.stats == 3
+    assert cache.session("s").get("/home/user/a.py") is None
+
+
+@pytest.mark.asyncio
+async def test_entry_without_mtime_is_not_trusted(monkeypatch):
+    manager, sandbox, cache = _sandbox_with(monkeypatch)
+    cache.session("s").put("/home/user/a.py", "x = 1\n")
+    sandbox.files.info["/home/user/a.py"] = SimpleNamespace(size=6, modified_time=1)
+
+    assert await manager._cached_file("s", sandbox, "/home/user/a.py") is None
+    assert cache.session("s").get("/home/user/a.py") is None
+
+
+@pytest.mark.asyncio
+async def test_trust_window_is_opt_in(monkeypatch):
+    manager, sandbox, cache = _sandbox_with(monkeypatch, trust_seconds=60)
+    cache.session("s").put("/home/user/a.py", "x = 1\n")
+
+    assert await manager._cached_file("s", sandbox, "/home/user/a.py") is not None
+    assert sandbox.files.stats == 0
+
+
+def test_read_token_rejects_put_after_invalidate():
+    cache = SessionFileCache(max_bytes=1024)
+    token = cache.read_token("/a")
+    cache.invalidate()
+    assert cache.put("/a", "stale", token) is None
+    assert cache.get("/a") is None
+
+
+def test_lru_eviction_by_bytes():
+    cache = SessionFileCache(max_bytes=10)
+    cache.put("/a", "aaaa")
+    cache.put("/b", "bbbb")
+    cache.get("/a")
+    cache.put("/c", "cccc")
+    assert cache.get("/b") is None
+    assert cache.get("/a") is not None and cache.get("/c") is not None
+    assert cache.bytes == 8
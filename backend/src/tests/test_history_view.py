@@ -0,0 +1,62 @@
+import json
+
+from src.agent.history_view import HistoryView
+from src.agent.result_format import format_tool_result
+
+BODY = "print('héllo')\n" * 20
+
+
+def _call(call_id, name, arguments):
+    return {"role": "assistant", "content": "", "tool_calls": [
+        {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}},
+    ]}
+
+
+def _result(call_id, name, result):
+    return {"role": "tool", "tool_call_id": call_id, "content": format_tool_result(name, result)}
+
+
+def _write_then_read():
+    return [
+        {"role": "user", "content": "go"},
+        _call("c1", "file_write", {"file_path": "/home/user/a.py", "content": BODY}),
+        _result("c1", "file_write", {"success": True, "file_path": "/home/user/a.py"}),
+        _call("c2", "file_read", {"file_path": "/home/user/a.py"}),
+        _result("c2", "file_read", {"success": True, "file_path": "/home/user/a.py", "content": BODY}),
+    ]
+
+
+def test_superseded_write_is_elided():
+    messages = _write_then_read()
+    view = HistoryView().apply(messages)
+
+    arguments = view[1]["tool_calls"][0]["function"]["arguments"]
+    assert arguments == '{"file_path":"/home/user/a.py","content":"[contents of /home/user/a.py at version 1 superseded]"}'
+    assert view[4] is messages[4]
+    assert json.loads(messages[1]["tool_calls"][0]["function"]["arguments"])["content"] == BODY
+
+
+def test_elided_results_keep_the_result_encoding():
+    messages = [
+        _call("c1", "file_read", {"file_path": "/home/user/a.py"}),
+        _result("c1", "file_read", {"success": True, "file_path": "/home/user/é.py", "content": BODY, "note": "ünïcode"}),
+        _call("c2", "file_read", {"file_path": "/home/user/é.py"}),
+        _result("c2", "file_read", {"success": True, "file_path": "/home/user/é.py", "content": BODY}),
+    ]
+    content = HistoryView().apply(messages)[1]["content"]
+    assert content == '{"success":true,"file_path":"/home/user/é.py",' \
+        '"content":"[contents of /home/user/é.py at version 1 superseded]","note":"ünïcode"}'
+
+
+def test_elided_form_is_stable_across_turns():
+    view = HistoryView()
+    messages = _write_then_read()
+    first = json.dumps(view.apply(messages), ensure_ascii=False)
+
+    # The next turn's request must repeat the elided prefix byte for byte
+    messages += [
+        _call("c3", "replace_in_file", {"file_path": "/home/user/a.py", "old_string": "héllo", "new_string": "bye"}),
+        _result("c3", "replace_in_file", {"success": True, "file_path": "/home/user/a.py"}),
+    ]
+    assert json.dumps(view.apply(messages)[:5], ensure_ascii=False) == first
+    assert json.dumps(HistoryView().apply(messages)[:5], ensure_ascii=False) == first
@@ -0,0 +1,142 @@
+import pytest
+
+from src.agent import tool_executor
+from src.services.e2b_sandbox import E2BSandboxManager
+from src.services.sandbox_edit_helper import EditError, apply_ops
+
+TEN_LINES = "".join(f"{i}\n" for i in range(1, 11))
+
+
+class MemoryManager(E2BSandboxManager):
+    """``edit_file`` through the read-modify-write path, over an in-memory file dict."""
+
+    def __init__(self, files):
+        super().__init__()
+        self.files = files
+
+    async def read_file(self, session_id, file_path, **kwargs):
+        if file_path not in self.files:
+            return {"success": False, "error": f"File not found: {file_path}"}
+        return {"success": True, "raw_content": self.files[file_path]}
+
+    async def write_file(self, session_id, file_path, content):
+        self.files[file_path] = content
+        return {"success": True}
+
+    async def edit_file(self, session_id, file_path, ops, missing_ok=False):
+        return await self._edit_via_write(session_id, file_path, ops, missing_ok)
+
+
+@pytest.fixture
+def files(monkeypatch):
+    files = {"/home/user/a.txt": TEN_LINES, "/home/user/b.txt": "x\ny\n"}
+    monkeypatch.setattr(tool_executor, "sandbox_manager", MemoryManager(files))
+    return files
+
+
+# ---------------------------------------------------------------------------
+# Line mapping
+# ---------------------------------------------------------------------------
+
+def test_original_line_numbers_across_inserts_and_deletes():
+    content, _ = apply_ops(TEN_LINES, [
+        {"op": "insert", "line": 2, "text": "A"},
+        {"op": "delete_lines", "start": 4, "end": 5},
+        {"op": "insert", "line": 7, "text": "B1\nB2"},
+        {"op": "delete_lines", "start": 9, "end": 9},
+        {"op": "insert", "line": 0, "text": "TOP"},
+        {"op": "insert", "line": 10, "text": "END"},
+    ])
+    assert content == "TOP\n1\n2\nA\n3\n6\n7\nB1\nB2\n8\n10\nEND\n"
+
+
+def test_order_of_edits_does_not_change_the_result():
+    edits = [
+        {"op": "delete_lines", "start": 8, "end": 10},
+        {"op": "insert", "line": 5, "text": "mid"},
+        {"op": "delete_lines", "start": 1, "end": 2},
+    ]
+    forward, _ = apply_ops(TEN_LINES, edits)
+    backward, _ = apply_ops(TEN_LINES, edits[::-1])
+    assert forward == backward == "3\n4\n5\nmid\n6\n7\n"
+
+
+def test_insert_then_delete_of_the_same_boundary():
+    # Text inserted after line 3 survives deleting line 4, and deleting line 3
+    content, _ = apply_ops(TEN_LINES, [
+        {"op": "insert", "line": 3, "text": "new"},
+        {"op": "delete_lines", "start": 4, "end": 4},
+        {"op": "delete_lines", "start": 3, "end": 3},
+    ])
+    assert content.split("\n")[:4] == ["1", "2", "new", "5"]
+
+
+def test_line_inside_an_earlier_change_is_rejected():
+    with pytest.raises(EditError, match="Line 3 was changed by an earlier edit in this batch") as error:
+        apply_ops(TEN_LINES, [
+            {"op": "delete_lines", "start": 2, "end": 4},
+            {"op": "insert", "line": 3, "text": "x"},
+        ])
+    assert error.value.index == 1
+
+
+def test_replace_that_adds_lines_shifts_later_edits():
+    content, _ = apply_ops(TEN_LINES, [
+        {"op": "replace", "old": "2\n", "new": "2a\n2b\n"},
+        {"op": "delete_lines", "start": 5, "end": 5},
+    ])
+    assert content.split("\n")[:5] == ["1", "2a", "2b", "3", "4"]
+    assert "5" not in content.split("\n")
+
+
+# ---------------------------------------------------------------------------
+# multi_edit
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_multi_edit_uses_original_line_numbers(files):
+    result = await tool_executor.execute_multi_edit("s", {"edits": [
+        {"file_path": "/home/user/a.txt", "type": "insert_line", "insert_line": 1, "new_str": "after 1"},
+        {"file_path": "/home/user/a.txt", "type": "delete_lines", "target_line": "3-4"},
+        {"file_path": "a.txt", "type": "insert_line", "insert_line": 6, "new_str": "after 6"},
+        {"file_path": "/home/user/a.txt", "type": "delete_lines", "target_line": 10},
+    ]})
+
+    assert result["success"], result
+    assert files["/home/user/a.txt"] == "1\nafter 1\n2\n5\n6\nafter 6\n7\n8\n9\n"
+    assert [entry.get("lines_inserted") or entry.get("lines_deleted") for entry in result["results"]] == [1, 2, 1, 1]
+    assert result["files"] == [{"file_path": "/home/user/a.txt", "success": True, "edits": 4, "total_lines": 10}]
+
+
+@pytest.mark.asyncio
+async def test_failed_edit_leaves_its_file_untouched(files):
+    result = await tool_executor.execute_multi_edit("s", {"edits": [
+        {"file_path": "/home/user/a.txt", "type": "insert_line", "insert_line": 1, "new_str": "kept?"},
+        {"file_path": "/home/user/b.txt", "type": "replace_in_file", "old_string": "x", "new_string": "X"},
+        {"file_path": "/home/user/a.txt", "type": "delete_str", "target_str": "not there"},
+    ]})
+
+    assert not result["success"]
+    assert files["/home/user/a.txt"] == TEN_LINES
+    assert files["/home/user/b.txt"] == "X\ny\n"
+    first, second, third = result["results"]
+    assert first["error"] == "Not applied: edit 2 in this file failed"
+    assert second["success"]
+    assert third["error"] == "target_str not found in /home/user/a.txt"
+    assert result["message"] == "Applied 1 of 3 edit(s) in 1 of 2 file(s)"
+    assert result["error"] == "/home/user/a.txt: target_str not found in /home/user/a.txt"
+
+
+@pytest.mark.asyncio
+async def test_malformed_edit_applies_nothing(files):
+    result = await tool_executor.execute_multi_edit("s", {"edits": [
+        {"file_path": "/home/user/b.txt", "type": "replace_in_file", "old_string": "x", "new_string": "X"},
+        {"file_path": "/home/user/a.txt", "type": "delete_lines", "target_line": "two"},
+        {"type": "delete_str", "target_str": "x"},
+    ]})
+
+    assert result == {
+        "success": False,
+        "error": "Invalid edits, nothing applied: edits[1]: Invalid target_line: 'two'; edits[2]: missing file_path",
+    }
+    assert files["/home/user/b.txt"] == "x\ny\n"
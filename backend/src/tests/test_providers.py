@@ -0,0 +1,83 @@
+import httpx
+import pytest
+
+from src.services import provider_base
+from src.services.fireworks import FireworksProvider
+from src.services.groq import GroqProvider
+from src.services.openrouter import OpenRouterProvider
+from src.services.provider_base import OpenAICompatibleProvider, Provider
+
+
+def _serve(monkeypatch, handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(provider_base.provider_pool, "get_client", lambda base_url: client)
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        Provider()
+
+
+@pytest.mark.asyncio
+async def test_models_are_formatted_and_sorted(monkeypatch):
+    _serve(monkeypatch, lambda request: httpx.Response(200, json={"data": [
+        {"id": "b-model", "owned_by": "meta", "context_window": 8192},
+        {"id": "a-model", "owned_by": "openai", "context_window": 4096, "active": False},
+    ]}))
+
+    result = await GroqProvider().fetch_models("key")
+
+    assert result == {"success": True, "models": [
+        {"id": "a-model", "name": "a-model", "context_length": 4096, "description": "Groq - openai (inactive)"},
+        {"id": "b-model", "name": "b-model", "context_length": 8192, "description": "Groq - meta"},
+    ]}
+
+
+@pytest.mark.asyncio
+async def test_provider_headers_are_used_for_listing(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={"data": [{"id": "x/y", "name": "Y", "supported_parameters": ["tools"]}]})
+
+    _serve(monkeypatch, handler)
+    result = await OpenRouterProvider().fetch_models("key")
+
+    assert result["models"][0]["supports_tools"] is True
+    assert seen[0].url == "https://openrouter.ai/api/v1/models"
+    assert seen[0].headers["authorization"] == "Bearer key"
+    assert seen[0].headers["x-title"] == "Vibe Coder"
+
+
+@pytest.mark.asyncio
+async def test_listing_failure(monkeypatch):
+    _serve(monkeypatch, lambda request: httpx.Response(401))
+    provider = OpenAICompatibleProvider(name="local", base_url="http://localhost:11434/v1")
+    assert await provider.fetch_models("") == {"success": False, "error": "Failed to fetch models: 401"}
+
+
+@pytest.mark.asyncio
+async def test_fireworks_walks_every_page_and_account(monkeypatch):
+    pages = {
+        ("fireworks", None): {"models": [{"name": "accounts/fireworks/models/b", "displayName": "B"}], "nextPageToken": "2"},
+        ("fireworks", "2"): {"models": [{"name": "accounts/fireworks/models/a", "supportsTools": True}]},
+        ("me", None): {"models": [{"name": "accounts/me/models/c", "displayName": "C", "state": "CREATING"}]},
+    }
+
+    def handler(request):
+        if request.url.path == "/v1/accounts":
+            return httpx.Response(200, json={"accounts": [{"name": "accounts/me"}, {"name": "accounts/fireworks"}]})
+        account = request.url.path.split("/")[3]
+        return httpx.Response(200, json=pages[(account, request.url.params.get("pageToken"))])
+
+    _serve(monkeypatch, handler)
+    result = await FireworksProvider().fetch_models("key")
+
+    assert [(m["id"], m["name"], m["description"]) for m in result["models"]] == [
+        ("accounts/fireworks/models/a", "accounts/fireworks/models/a", "Tools"),
+        ("accounts/fireworks/models/b", "B", ""),
+        ("accounts/me/models/c", "C", "Creating"),
+    ]
+    assert result["timings"]["accounts"]["fireworks"]["pages"] == 2
+    assert result["timings"]["accounts"]["me"]["models"] == 1
@@ -0,0 +1,241 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.services import provider_base
+from src.services.rate_limiter import AdmissionController, KeyLimiter, TokenBucket
+from src.services.token_estimator import estimate_messages_tokens
+
+
+class FakeClock:
+    """Monotonic clock that only moves when someone sleeps on it."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def _limiter(clock, rpm=None, tpm=None):
+    return KeyLimiter(rpm=rpm, tpm=tpm, clock=clock, sleep=clock.sleep)
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+def test_bucket_refills_continuously():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.consume(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.now += 0.5
+    assert bucket.wait_time(1) == 0.5
+    clock.now += 100
+    assert bucket.wait_time(60) == 0.0
+    assert bucket.tokens == 60
+
+
+def test_oversized_request_waits_for_a_full_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock)
+    bucket.consume(300)
+    assert bucket.wait_time(10_000) == 30.0
+
+
+def test_unlimited_bucket():
+    bucket = TokenBucket(None, FakeClock())
+    bucket.consume(10 ** 9)
+    assert bucket.wait_time(10 ** 9) == 0.0
+
+
+# ---------------------------------------------------------------------------
+# Admission
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_admission_waits_for_rpm_and_tpm():
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm=60, tpm=6000)
+
+    assert await limiter.acquire(3000, max_wait=30) == 0
+    assert await limiter.acquire(3000, max_wait=30) == 0
+    # Requests left, tokens exhausted: 3000 tokens refill in 30 s
+    assert await limiter.acquire(3000, max_wait=60) == 30.0
+    assert limiter.snapshot()["queued"] == 1
+
+
+@pytest.mark.asyncio
+async def test_max_wait_lets_the_call_through():
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm=1)
+    await limiter.acquire(0, max_wait=30)
+
+    assert await limiter.acquire(0, max_wait=5) == 5.0
+    assert limiter.timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_the_key():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    limiter.observe(429, {}, retry_after=12)
+    assert await limiter.acquire(10, max_wait=30) == 12.0
+
+
+@pytest.mark.asyncio
+async def test_headers_learn_tpm_and_clamp_remaining():
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm=100)
+    limiter.observe(200, {
+        "x-ratelimit-limit-tokens": "6000",
+        "x-ratelimit-remaining-tokens": "600",
+        "x-ratelimit-remaining-requests": "0",
+    }, None)
+    assert limiter.tokens.capacity == 6000
+    assert limiter.tokens.tokens == 600
+    assert limiter.requests.wait_time(1) == 0.6
+
+
+@pytest.mark.asyncio
+async def test_queue_is_fifo():
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm=60)
+    limiter.requests.consume(60)
+    admitted = []
+
+    async def call(name):
+        await limiter.acquire(0, max_wait=60)
+        admitted.append((name, clock.now))
+
+    tasks = [asyncio.create_task(call(name)) for name in "abcd"]
+    await asyncio.gather(*tasks)
+
+    assert admitted == [("a", 1001.0), ("b", 1002.0), ("c", 1003.0), ("d", 1004.0)]
+    assert limiter.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_not_charged_and_frees_the_queue():
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm=60, tpm=6000)
+    limiter.requests.consume(60)
+    gate = asyncio.Event()
+
+    async def slow_sleep(seconds):
+        await gate.wait()
+        await clock.sleep(seconds)
+
+    limiter.sleep = slow_sleep
+    first = asyncio.create_task(limiter.acquire(1000, max_wait=60))
+    second = asyncio.create_task(limiter.acquire(1000, max_wait=60))
+    await asyncio.sleep(0)
+    assert limiter.waiting == 2
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    gate.set()
+    assert await second == 1.0
+
+    assert limiter.admitted == 1
+    assert limiter.waiting == 0
+    assert limiter.tokens.tokens == 5000
+
+
+@pytest.mark.asyncio
+async def test_refund_returns_unused_capacity():
+    clock = FakeClock()
+    limiter = _limiter(clock, rpm=2, tpm=1000)
+    await limiter.acquire(800, max_wait=0)
+
+    # Cancelled before the provider answered: request and tokens come back
+    limiter.refund(800)
+    assert limiter.requests.tokens == 2
+    assert limiter.tokens.tokens == 1000
+
+    # Rejected by the provider: the request counts, the tokens do not
+    await limiter.acquire(800, max_wait=0)
+    limiter.refund(800, request=False)
+    assert limiter.requests.tokens == 1
+    assert limiter.tokens.tokens == 1000
+    assert limiter.snapshot()["refunds"] == 2
+
+
+def test_refund_never_exceeds_capacity():
+    limiter = _limiter(FakeClock(), rpm=2, tpm=1000)
+    limiter.refund(5000)
+    assert limiter.requests.tokens == 2
+    assert limiter.tokens.tokens == 1000
+
+
+def test_usage_correction():
+    limiter = _limiter(FakeClock(), tpm=1000)
+    limiter.tokens.consume(500)
+    limiter.record_usage(estimated_tokens=500, actual_tokens=700)
+    assert limiter.tokens.tokens == 300
+
+
+# ---------------------------------------------------------------------------
+# Provider wiring
+# ---------------------------------------------------------------------------
+
+def _provider(monkeypatch, handler):
+    controller = AdmissionController(max_wait=0)
+    limiter = controller.get_limiter("fake", "key")
+    limiter.requests.set_rate(10)
+    limiter.tokens.set_rate(100_000)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(provider_base, "admission_controller", controller)
+    monkeypatch.setattr(provider_base.provider_pool, "get_client", lambda base_url: client)
+    provider = provider_base.OpenAICompatibleProvider(name="fake", base_url="https://fake.test/v1")
+    return provider, limiter
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+async def _drain(provider):
+    return [event async for event in provider.chat_completion("key", "m", MESSAGES)]
+
+
+@pytest.mark.asyncio
+async def test_provider_refunds_a_request_that_never_got_an_answer(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    provider, limiter = _provider(monkeypatch, handler)
+    with pytest.raises(httpx.ConnectError):
+        await _drain(provider)
+
+    assert limiter.requests.tokens == pytest.approx(10)
+    assert limiter.tokens.tokens == pytest.approx(100_000)
+
+
+@pytest.mark.asyncio
+async def test_provider_refunds_tokens_of_a_rejected_request(monkeypatch):
+    provider, limiter = _provider(monkeypatch, lambda request: httpx.Response(503, text="overloaded"))
+
+    events = await _drain(provider)
+
+    assert events[-1]["status_code"] == 503
+    assert limiter.requests.tokens == pytest.approx(9, abs=0.01)
+    assert limiter.tokens.tokens == pytest.approx(100_000)
+
+
+@pytest.mark.asyncio
+async def test_provider_keeps_the_charge_of_an_answered_request(monkeypatch):
+    body = 'data: {"choices": [{"delta": {"content": "hi"}}]}\n\ndata: [DONE]\n\n'
+    provider, limiter = _provider(monkeypatch, lambda request: httpx.Response(200, text=body))
+
+    events = await _drain(provider)
+
+    assert [event["type"] for event in events] == ["chunk", "done"]
+    assert limiter.requests.tokens == pytest.approx(9, abs=0.01)
+    assert limiter.tokens.tokens == pytest.approx(100_000 - estimate_messages_tokens(MESSAGES), abs=1)
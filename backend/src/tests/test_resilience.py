@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services import resilience
+from src.services.resilience import CircuitBreaker, ResilientChatClient, RetryPolicy
+
+
+class FakeProvider:
+    def __init__(self, events=(), block=False):
+        self.events = list(events)
+        self.block = block
+        self.started = asyncio.Event()
+
+    async def chat_completion(self, **kwargs):
+        self.started.set()
+        if self.block:
+            await asyncio.Event().wait()
+        for event in self.events:
+            yield event
+
+
+def _half_open_client(monkeypatch, provider):
+    monkeypatch.setattr(resilience, "get_provider", lambda name: provider)
+    client = ResilientChatClient(RetryPolicy(max_attempts=1))
+    breaker = client.get_breaker("fake", "model")
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    return client, breaker
+
+
+async def _collect(client):
+    return [event async for event in client.chat_completion("fake", "key", "model", [], fallback=None)]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_is_released(monkeypatch):
+    provider = FakeProvider(block=True)
+    client, breaker = _half_open_client(monkeypatch, provider)
+
+    task = asyncio.create_task(_collect(client))
+    await provider.started.wait()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_closed_generator_releases_trial(monkeypatch):
+    provider = FakeProvider(events=[{"type": "retry_hint"}, {"type": "chunk", "content": "x"}])
+    client, breaker = _half_open_client(monkeypatch, provider)
+
+    stream = client.chat_completion("fake", "key", "model", [], fallback=None)
+    assert (await stream.__anext__())["type"] == "retry_hint"
+    await stream.aclose()
+
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_trial_is_released(monkeypatch):
+    provider = FakeProvider(events=[{"type": "error", "error": "bad request", "status_code": 400}])
+    client, breaker = _half_open_client(monkeypatch, provider)
+
+    events = await _collect(client)
+
+    assert events[-1]["type"] == "error"
+    assert breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_trial_success_closes_breaker(monkeypatch):
+    provider = FakeProvider(events=[{"type": "chunk", "content": "hi"}, {"type": "done"}])
+    client, breaker = _half_open_client(monkeypatch, provider)
+
+    events = await _collect(client)
+
+    assert [event["type"] for event in events] == ["chunk", "done"]
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_only_one_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
@@ -0,0 +1,383 @@
+import base64
+import json
+import os
+import stat
+from types import SimpleNamespace
+
+import pytest
+from e2b import CommandExitException
+
+from src.services import e2b_sandbox
+from src.services import sandbox_edit_helper as helper
+from src.services.e2b_sandbox import E2BSandboxManager, _splice_hunks
+from src.services.file_cache import FileContentCache
+from src.services.sandbox_edit_helper import EditError, apply_ops, digest
+
+
+def _apply(content, *ops):
+    return apply_ops(content, list(ops), "/home/user/a.py")
+
+
+# ---------------------------------------------------------------------------
+# Ops
+# ---------------------------------------------------------------------------
+
+def test_replace_every_occurrence():
+    content, results = _apply("a = 1\nb = a\n", {"op": "replace", "old": "a", "new": "x"})
+    assert content == "x = 1\nb = x\n"
+    assert results == [{"occurrences": 2}]
+
+
+def test_replace_missing():
+    with pytest.raises(EditError, match="old_string not found in /home/user/a.py"):
+        _apply("a\n", {"op": "replace", "old": "zzz", "new": "x"})
+
+
+def test_insert_top_middle_and_end():
+    assert _apply("a\nb\n", {"op": "insert", "line": 0, "text": "top"})[0] == "top\na\nb\n"
+    assert _apply("a\nb\n", {"op": "insert", "line": 1, "text": "x\ny"}) == ("a\nx\ny\nb\n", [{"lines_inserted": 2}])
+    assert _apply("a\nb\n", {"op": "insert", "line": 2, "text": "c"})[0] == "a\nb\nc\n"
+
+
+def test_insert_out_of_range():
+    with pytest.raises(EditError, match=r"Line 5 out of range \(0-3\)"):
+        _apply("a\nb\n", {"op": "insert", "line": 5, "text": "x"})
+
+
+def test_delete_lines():
+    content, results = _apply("1\n2\n3\n4\n", {"op": "delete_lines", "start": 2, "end": 3})
+    assert content == "1\n4\n"
+    assert results == [{"deleted_lines": "2\n3"}]
+    with pytest.raises(EditError, match="out of bounds"):
+        _apply("1\n2\n", {"op": "delete_lines", "start": 2, "end": 7})
+
+
+def test_delete_str_single_occurrence_only():
+    assert _apply("keep drop keep", {"op": "delete_str", "target": " drop"})[0] == "keep keep"
+    with pytest.raises(EditError, match=r"Multiple occurrences \(2\)"):
+        _apply("x x", {"op": "delete_str", "target": "x"})
+    with pytest.raises(EditError, match="target_str not found"):
+        _apply("x", {"op": "delete_str", "target": "y"})
+
+
+def test_append_and_unknown_op():
+    assert _apply("a\n", {"op": "append", "text": "b\n"})[0] == "a\nb\n"
+    with pytest.raises(EditError) as error:
+        _apply("a\n", {"op": "append", "text": "b"}, {"op": "rename"})
+    assert error.value.index == 1
+
+
+# ---------------------------------------------------------------------------
+# Line endings
+# ---------------------------------------------------------------------------
+
+def test_crlf_is_preserved():
+    crlf = "one\r\ntwo\r\nthree\r\n"
+    assert _apply(crlf, {"op": "replace", "old": "two", "new": "TWO"})[0] == "one\r\nTWO\r\nthree\r\n"
+    assert _apply(crlf, {"op": "delete_lines", "start": 2, "end": 2})[0] == "one\r\nthree\r\n"
+    assert _apply(crlf, {"op": "delete_str", "target": "two\r\n"})[0] == "one\r\nthree\r\n"
+
+
+def test_no_trailing_newline():
+    assert _apply("a\nb", {"op": "insert", "line": 2, "text": "c"})[0] == "a\nb\nc"
+    assert _apply("a\nb", {"op": "delete_lines", "start": 2, "end": 2})[0] == "a"
+    assert _apply("a\nb", {"op": "replace", "old": "b", "new": "B"})[0] == "a\nB"
+
+
+def test_run_keeps_crlf_bytes_and_mode(tmp_path):
+    target = tmp_path / "script.sh"
+    target.write_bytes(b"#!/bin/sh\r\necho one\r\necho two")
+    target.chmod(0o755)
+
+    response = helper.run({"path": str(target), "ops": [{"op": "replace", "old": "one", "new": "1"}]})
+
+    assert response["success"]
+    assert target.read_bytes() == b"#!/bin/sh\r\necho 1\r\necho two"
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o755
+    assert response["sha256"] == digest("#!/bin/sh\r\necho 1\r\necho two")
+    assert [p.name for p in tmp_path.iterdir()] == ["script.sh"]
+
+
+def test_run_edits_symlink_target(tmp_path):
+    real = tmp_path / "real.txt"
+    real.write_text("a\n")
+    link = tmp_path / "link.txt"
+    link.symlink_to(real)
+
+    assert helper.run({"path": str(link), "ops": [{"op": "append", "text": "b\n"}]})["success"]
+
+    assert link.is_symlink()
+    assert real.read_text() == "a\nb\n"
+
+
+def test_run_failure_writes_nothing(tmp_path):
+    target = tmp_path / "a.txt"
+    target.write_text("a\nb\n")
+
+    response = helper.run({"path": str(target), "ops": [
+        {"op": "append", "text": "c\n"},
+        {"op": "replace", "old": "zzz", "new": "y"},
+    ]})
+
+    assert response["success"] is False
+    assert response["failed_op"] == 1
+    assert target.read_text() == "a\nb\n"
+
+
+def test_main_reports_undecodable_requests(capsys):
+    helper.main(["helper", "not base64!"])
+    response = json.loads(capsys.readouterr().out)
+    assert response["success"] is False
+    assert response["error"]
+
+
+def test_main_accepts_lone_surrogates(tmp_path, capsys):
+    # The backend encodes requests with surrogatepass
+    target = tmp_path / "a.txt"
+    target.write_text("a\n")
+    request = {"path": str(target), "ops": [{"op": "replace", "old": "zzz\ud83d", "new": "x"}]}
+    payload = base64.b64encode(json.dumps(request, ensure_ascii=False).encode("utf-8", "surrogatepass")).decode()
+
+    helper.main(["helper", payload])
+
+    response = json.loads(capsys.readouterr().out)
+    assert response["error"] == "old_string not found in %s" % target
+
+
+def test_digest_agrees_with_the_file_cache():
+    content = "caf\xe9 \udce9 \ud83d"
+    assert FileContentCache(enabled=True).session("s").put("/a", content).digest == digest(content)
+
+
+def test_run_missing_file(tmp_path):
+    path = str(tmp_path / "new" / "a.txt")
+    assert helper.run({"path": path, "ops": []})["not_found"]
+    assert helper.run({"path": path, "ops": [{"op": "append", "text": "x"}], "missing_ok": True})["success"]
+    assert open(path).read() == "x"
+
+
+# ---------------------------------------------------------------------------
+# Binary detection
+# ---------------------------------------------------------------------------
+
+def test_binary_detection():
+    assert helper.is_binary(b"\x89PNG\r\n\x1a\n\x00\x00")
+    assert helper.is_binary(b"text\x00more")
+    assert helper.is_binary(b"caf\xe9")
+    assert not helper.is_binary("plain café 中\n".encode())
+    assert not helper.is_binary(b"")
+
+
+def test_multibyte_character_cut_by_the_sniff_window_is_text():
+    data = b"a" * (helper._SNIFF_BYTES - 1) + "é".encode() + b"tail"
+    assert not helper.is_binary(data)
+
+
+def test_binary_type():
+    assert helper.binary_type(b"\x89PNG\r\n") == "image/png"
+    assert helper.binary_type(b"%PDF-1.7") == "application/pdf"
+    assert helper.binary_type(b"\x00\x01", "font.woff2") == "font/woff2"
+    assert helper.binary_type(b"\x00\x01", "blob") == "application/octet-stream"
+
+
+# ---------------------------------------------------------------------------
+# Splice
+# ---------------------------------------------------------------------------
+
+def test_splice_hunks_round_trip():
+    old = "".join(f"line {i}\n" for i in range(50))
+    new = old.replace("line 3\n", "LINE 3\nextra\n").replace("line 40\n", "") + "end"
+    hunks = _splice_hunks(old, new)
+    assert _apply(old, {"op": "splice", "hunks": hunks, "expect_sha256": digest(old)})[0] == new
+
+
+def test_splice_expect_sha256_mismatch():
+    old = "a\nb\n"
+    hunks = _splice_hunks(old, "a\nB\n")
+    with pytest.raises(EditError, match="changed since the patch was computed"):
+        _apply("a\nb\nc\n", {"op": "splice", "hunks": hunks, "expect_sha256": digest(old)})
+
+
+class LocalFiles:
+    """``sandbox.files.get_info`` over a temp directory."""
+
+    def __init__(self, root):
+        self.root = root
+
+    async def get_info(self, path):
+        info = os.stat(self.root / path.lstrip("/"))
+        return SimpleNamespace(size=info.st_size, modified_time=info.st_mtime_ns)
+
+
+class SpliceManager(E2BSandboxManager):
+    """Runs helper requests locally, against a temp directory."""
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+        self.requests = []
+        self.sandbox = SimpleNamespace(files=LocalFiles(root))
+
+    async def _run_edit_helper(self, session_id, sandbox, request):
+        self.requests.append(request)
+        return helper.run({**request, "path": str(self.root / request["path"].lstrip("/"))})
+
+
+@pytest.fixture
+def splice_setup(monkeypatch, tmp_path):
+    cache = FileContentCache(enabled=True)
+    monkeypatch.setattr(e2b_sandbox, "file_cache", cache)
+    monkeypatch.setattr(e2b_sandbox, "SANDBOX_EDIT_MIN_BYTES", 16)
+    manager = SpliceManager(tmp_path)
+    old = "".join(f"line {i}\n" for i in range(200))
+    target = tmp_path / "home/user/big.txt"
+    target.parent.mkdir(parents=True)
+    target.write_text(old)
+    cache.session("s").put("/home/user/big.txt", old)
+    return manager, cache, target, old
+
+
+@pytest.mark.asyncio
+async def test_write_via_splice_sends_only_the_change(splice_setup):
+    manager, cache, target, old = splice_setup
+    new = old.replace("line 100\n", "changed\n")
+
+    assert await manager._write_via_splice("s", manager.sandbox, "/home/user/big.txt", new)
+
+    assert target.read_text() == new
+    entry = cache.session("s").get("/home/user/big.txt")
+    assert entry.content == new
+    assert entry.mtime == os.stat(target).st_mtime_ns
+    assert manager.requests[0]["ops"][0]["hunks"] == [[100, 101, ["changed\n"]]]
+
+
+@pytest.mark.asyncio
+async def test_write_via_splice_refuses_a_stale_cache(splice_setup):
+    manager, cache, target, old = splice_setup
+    target.write_text(old + "written by a command\n")
+
+    assert not await manager._write_via_splice("s", manager.sandbox, "/home/user/big.txt", old.replace("line 1\n", "x\n"))
+
+    assert target.read_text() == old + "written by a command\n"
+
+
+@pytest.mark.asyncio
+async def test_write_via_splice_skips_large_rewrites(splice_setup):
+    manager, cache, target, old = splice_setup
+    assert not await manager._write_via_splice("s", manager.sandbox, "/home/user/big.txt", old.upper())
+    assert manager.requests == []
+
+
+class FakeCommands:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.runs = 0
+
+    async def run(self, command, timeout=None):
+        self.runs += 1
+        if self.failures:
+            exit_code, stderr = self.failures.pop(0)
+            raise CommandExitException(stderr=stderr, stdout="", exit_code=exit_code, error=None)
+        return SimpleNamespace(stdout='{"success": true}')
+
+
+class FakeFiles:
+    def __init__(self):
+        self.writes = 0
+
+    async def write(self, path, content):
+        self.writes += 1
+
+
+def _helper_sandbox(*failures):
+    return SimpleNamespace(files=FakeFiles(), commands=FakeCommands(failures))
+
+
+MISSING_HELPER = (2, "python3: can't open file '%s': [Errno 2] No such file or directory" % e2b_sandbox.EDIT_HELPER_PATH)
+
+
+@pytest.mark.asyncio
+async def test_missing_helper_file_is_reinstalled():
+    manager = E2BSandboxManager()
+    sandbox = _helper_sandbox(MISSING_HELPER)
+
+    assert await manager._run_edit_helper("s", sandbox, {"path": "/a"}) == {"success": True}
+    assert sandbox.files.writes == 2
+    assert manager._edit_helpers["s"] is True
+
+
+@pytest.mark.asyncio
+async def test_missing_python_disables_the_helper():
+    manager = E2BSandboxManager()
+    sandbox = _helper_sandbox((127, "sh: 1: python3: not found"))
+
+    assert await manager._run_edit_helper("s", sandbox, {"path": "/a"}) is None
+    assert manager._edit_helpers["s"] is False
+    assert await manager._run_edit_helper("s", sandbox, {"path": "/a"}) is None
+    assert sandbox.commands.runs == 1
+
+
+@pytest.mark.asyncio
+async def test_helper_crash_fails_the_request_only():
+    manager = E2BSandboxManager()
+    sandbox = _helper_sandbox((1, "Traceback (most recent call last): ... MemoryError"))
+
+    with pytest.raises(CommandExitException):
+        await manager._run_edit_helper("s", sandbox, {"path": "/a"})
+    assert manager._edit_helpers["s"] is True
+    assert await manager._run_edit_helper("s", sandbox, {"path": "/a"}) == {"success": True}
+    assert sandbox.files.writes == 1
+
+
+# ---------------------------------------------------------------------------
+# Read-modify-write fallback
+# ---------------------------------------------------------------------------
+
+class FallbackManager(E2BSandboxManager):
+    """Backend-side read → apply_ops → write, over an in-memory file dict."""
+
+    def __init__(self, files):
+        super().__init__()
+        self.files = files
+
+    async def read_file(self, session_id, file_path, **kwargs):
+        if file_path not in self.files:
+            return {"success": False, "error": f"File not found: {file_path}"}
+        return {"success": True, "raw_content": self.files[file_path]}
+
+    async def write_file(self, session_id, file_path, content):
+        self.files[file_path] = content
+        return {"success": True}
+
+
+@pytest.mark.asyncio
+async def test_fallback_applies_all_ops_or_none():
+    manager = FallbackManager({"/home/user/a.py": "a\r\nb\r\n"})
+
+    result = await manager._edit_via_write("s", "/home/user/a.py", [
+        {"op": "replace", "old": "a", "new": "A"},
+        {"op": "delete_lines", "start": 2, "end": 2},
+    ], missing_ok=False)
+    assert result["success"] and result["via"] == "write"
+    assert manager.files["/home/user/a.py"] == "A\r\n"
+
+    result = await manager._edit_via_write("s", "/home/user/a.py", [
+        {"op": "append", "text": "x"},
+        {"op": "delete_str", "target": "nope"},
+    ], missing_ok=False)
+    assert result == {
+        "success": False,
+        "error": "target_str not found in /home/user/a.py",
+        "failed_op": 1,
+        "file_path": "/home/user/a.py",
+    }
+    assert manager.files["/home/user/a.py"] == "A\r\n"
+
+
+@pytest.mark.asyncio
+async def test_fallback_missing_file():
+    manager = FallbackManager({})
+    result = await manager._edit_via_write("s", "/home/user/new.py", [{"op": "append", "text": "x"}], missing_ok=False)
+    assert result["error"].startswith("Could not read /home/user/new.py")
+    result = await manager._edit_via_write("s", "/home/user/new.py", [{"op": "append", "text": "x"}], missing_ok=True)
+    assert result["success"] and manager.files["/home/user/new.py"] == "x"
@@ -0,0 +1,37 @@
+from src.agent.react_agent import ReActAgent
+
+
+class FakeWriter:
+    def __init__(self):
+        self.discarded = False
+
+    def discard(self):
+        self.discarded = True
+
+
+def _call(call_id, **extra):
+    return {"id": call_id, "function": {"name": "file_write", "arguments": "{}"}, "parsed_arguments": {}, **extra}
+
+
+def test_skipped_call_discards_its_streaming_write():
+    agent = ReActAgent(api_key="key")
+    writer = FakeWriter()
+    stream_writes = {"call_1": writer}
+
+    runner = agent._runner_for(stream_writes, _call("call_1", invalid={"success": False, "error": "bad"}))
+
+    assert runner is not None
+    assert writer.discarded
+    assert "call_1" not in stream_writes
+
+
+def test_valid_call_keeps_its_streaming_write():
+    agent = ReActAgent(api_key="key")
+    writer = FakeWriter()
+    writer.commit = object()
+    stream_writes = {"call_1": writer}
+
+    runner = agent._runner_for(stream_writes, _call("call_1"))
+
+    assert runner is writer.commit
+    assert not writer.discarded
@@ -0,0 +1,135 @@
+import json
+import random
+
+import pytest
+
+from src.agent.streaming_json import IncrementalJSONParser
+
+SAMPLE = {
+    "file_path": "/home/user/project/src/été.py",
+    "content": 'line "one"\n\tline\\two\r\né中\U0001F600 \\u0041 end\b\f/',
+    "insert_line": 12,
+    "flags": {"nested": [1, 2.5, {"k": "v}\\\""}], "ok": True, "none": None},
+    "empty": "",
+}
+
+ALPHABET = ['a', ' ', '"', '\\', '/', '\n', '\t', '\r', '\x01', '{', '}', ',', ':', 'é', '中', '\U0001F600', '\U00010348']
+
+
+def _feed(text, cuts):
+    parser = IncrementalJSONParser()
+    streamed = {}
+    previous = 0
+    for cut in list(cuts) + [len(text)]:
+        for key, delta in parser.feed(text[previous:cut]).items():
+            streamed[key] = streamed.get(key, "") + delta
+        previous = cut
+    return parser, streamed
+
+
+def _check(obj, text, cuts):
+    parser, streamed = _feed(text, cuts)
+    assert parser.error is None
+    assert parser.complete
+    assert parser.values == obj == json.loads(text)
+    for key, value in obj.items():
+        if isinstance(value, str):
+            assert streamed.get(key, "") == value
+            assert parser.get_string(key) == value
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_every_single_split(ensure_ascii):
+    text = json.dumps(SAMPLE, ensure_ascii=ensure_ascii)
+    for cut in range(len(text) + 1):
+        _check(SAMPLE, text, [cut])
+
+
+def test_char_by_char():
+    text = json.dumps(SAMPLE)
+    _check(SAMPLE, text, range(1, len(text)))
+
+
+@pytest.mark.parametrize("escaped", [
+    "\\ud83d\\ude00", "\\u00e9", "\\n", "\\\\", '\\"', "\\/",
+    # Lone high surrogates followed by something other than a low half
+    "\\ud83d\\\\", "\\ud83d\\n", "\\ud83d\\u00e9", "\\ud83d\\ud83d", "\\ud83dA",
+])
+def test_splits_inside_escapes(escaped):
+    text = '{"content": "a' + escaped + 'b"}'
+    for first in range(len(text) + 1):
+        for second in range(first, len(text) + 1):
+            _check(json.loads(text), text, [first, second])
+
+
+def test_lone_surrogate_before_another_escape():
+    # The escaped backslash completes inside the carried tail; "b" must survive every split
+    text = '{"a": "\\ud83d\\\\", "b": 1}'
+    for first in range(len(text) + 1):
+        for second in range(first, len(text) + 1):
+            _check(json.loads(text), text, [first, second])
+
+
+def test_lone_surrogate_at_chunk_end():
+    text = '{"content": "x\\ud83d", "n": 1}'
+    for cut in range(len(text) + 1):
+        parser, _ = _feed(text, [cut])
+        assert parser.complete
+        assert parser.values == json.loads(text)
+
+
+def _random_value(rng, depth=0):
+    kind = rng.randrange(6 if depth < 2 else 4)
+    if kind == 0:
+        return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(20)))
+    if kind == 1:
+        return rng.choice([0, -7, 3.25, 1e100, True, False, None])
+    if kind == 2:
+        return rng.randrange(-1000, 1000)
+    if kind == 3:
+        return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(200)))
+    if kind == 4:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": _random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def test_random_splits_match_json_loads():
+    rng = random.Random(1234)
+    for _ in range(300):
+        obj = {f"field{i}": _random_value(rng) for i in range(rng.randrange(1, 5))}
+        text = json.dumps(obj, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 1]))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text), rng.randrange(1, 12))))
+        _check(obj, text, cuts)
+
+
+def test_complete_only_at_closing_brace_and_ignores_trailing_text():
+    parser = IncrementalJSONParser()
+    parser.feed('{"file_path": "/home/user/a.py", "content": "x"')
+    assert not parser.complete
+    assert parser.has_field("content")
+    parser.feed('}\n{"other": 1}')
+    assert parser.complete
+    assert parser.values == {"file_path": "/home/user/a.py", "content": "x"}
+
+
+def test_streaming_string_is_visible_before_it_closes():
+    parser = IncrementalJSONParser()
+    parser.feed('{"content": "hel')
+    assert parser.in_string("content")
+    assert not parser.has_field("content")
+    assert parser.feed("lo wor") == {"content": "lo wor"}
+    assert parser.get_string("content") == "hello wor"
+
+
+def test_raw_control_characters_are_kept():
+    parser = IncrementalJSONParser()
+    parser.feed('{"content": "a\nb\tc"}')
+    assert parser.complete
+    assert parser.values["content"] == "a\nb\tc"
+
+
+def test_not_an_object():
+    parser = IncrementalJSONParser()
+    parser.feed('["a"]')
+    assert parser.error is not None
+    assert not parser.complete
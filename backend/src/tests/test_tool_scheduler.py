@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+
+from src.agent.tool_scheduler import EXCLUSIVE, READ, SCAN, WRITE, ToolAccess, ToolScheduler, classify_tool_call
+
+
+def _call(name, **arguments):
+    return {"id": f"call_{name}", "function": {"name": name}, "parsed_arguments": arguments}
+
+
+class Recorder:
+    """Tool runner that logs start/end per call and how many calls overlapped."""
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.log = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, tool_name, arguments):
+        label = arguments.get("label", tool_name)
+        self.log.append(("start", label))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(label, 0.01))
+            if label in self.failing:
+                raise RuntimeError(f"{label} failed")
+            return {"success": True, "label": label}
+        finally:
+            self.running -= 1
+            self.log.append(("end", label))
+
+    def span(self, label):
+        return self.log.index(("start", label)), self.log.index(("end", label))
+
+
+async def _results(batch):
+    return [(await task)[0] for task in batch.tasks]
+
+
+# ---------------------------------------------------------------------------
+# Classification
+# ---------------------------------------------------------------------------
+
+def test_classification():
+    assert classify_tool_call("file_read", {"file_path": "a.py"}) == ToolAccess(READ, "/home/user/a.py")
+    assert classify_tool_call("insert_line", {"file_path": "/home/user/src/../a.py"}) == ToolAccess(WRITE, "/home/user/a.py")
+    assert classify_tool_call("search_files", {"pattern": "x"}) == ToolAccess(SCAN)
+    assert classify_tool_call("shell", {"command": "ls"}) == ToolAccess(EXCLUSIVE)
+    assert classify_tool_call("file_write", {}) == ToolAccess(EXCLUSIVE)
+
+
+def test_conflicts():
+    read_a, write_a = ToolAccess(READ, "/a"), ToolAccess(WRITE, "/a")
+    assert not read_a.conflicts_with(ToolAccess(READ, "/a"))
+    assert write_a.conflicts_with(read_a) and read_a.conflicts_with(write_a)
+    assert not write_a.conflicts_with(ToolAccess(WRITE, "/b"))
+    assert ToolAccess(SCAN).conflicts_with(ToolAccess(WRITE, "/b"))
+    assert not ToolAccess(SCAN).conflicts_with(read_a)
+    assert ToolAccess(EXCLUSIVE).conflicts_with(read_a)
+
+
+# ---------------------------------------------------------------------------
+# Concurrent batches
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_results_come_back_in_the_original_order():
+    # The first call is the slowest; awaiting in order still pairs every result with its call
+    run = Recorder(delays={"a": 0.05, "b": 0.0, "c": 0.02})
+    calls = [_call("file_read", file_path=f"/home/user/{x}.py", label=x) for x in "abc"]
+
+    batch = ToolScheduler().launch(calls, run)
+
+    assert [r["label"] for r in await _results(batch)] == ["a", "b", "c"]
+    assert batch.calls == calls
+    assert run.log.index(("end", "b")) < run.log.index(("end", "a"))
+    assert run.peak == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_to_a_path_are_exclusive_and_ordered():
+    run = Recorder(delays={"w1": 0.03})
+    batch = ToolScheduler().launch([
+        _call("file_read", file_path="a.py", label="r1"),
+        _call("file_write", file_path="a.py", label="w1"),
+        _call("file_read", file_path="/home/user/a.py", label="r2"),
+        _call("replace_in_file", file_path="a.py", label="w2"),
+        _call("file_write", file_path="b.py", label="other"),
+    ], run)
+    await _results(batch)
+
+    # Each call on a.py starts only after the previous one ended
+    order = ["r1", "w1", "r2", "w2"]
+    for before, after in zip(order, order[1:]):
+        assert run.span(before)[1] < run.span(after)[0]
+    # A write to another file overlaps the first write
+    assert run.span("other")[0] < run.span("w1")[1]
+
+
+@pytest.mark.asyncio
+async def test_scans_wait_for_writes_and_exclusive_calls_for_everything():
+    run = Recorder()
+    batch = ToolScheduler().launch([
+        _call("file_write", file_path="a.py", label="w"),
+        _call("search_files", pattern="x", label="scan"),
+        _call("file_read", file_path="b.py", label="r"),
+        _call("shell", command="ls", label="sh"),
+        _call("file_read", file_path="c.py", label="after"),
+    ], run)
+    await _results(batch)
+
+    assert run.span("w")[1] < run.span("scan")[0]
+    assert run.span("r")[0] < run.span("scan")[1]
+    assert max(run.span(x)[1] for x in ("w", "scan", "r")) < run.span("sh")[0]
+    assert run.span("sh")[1] < run.span("after")[0]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    run = Recorder()
+    batch = ToolScheduler(max_concurrency=2).launch(
+        [_call("file_read", file_path=f"{i}.py", label=str(i)) for i in range(6)], run
+    )
+    await _results(batch)
+    assert run.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_mid_batch():
+    run = Recorder(failing={"w1"})
+    batch = ToolScheduler().launch([
+        _call("file_read", file_path="a.py", label="r1"),
+        _call("file_write", file_path="a.py", label="w1"),
+        _call("file_read", file_path="a.py", label="r2"),
+        _call("file_read", file_path="b.py", label="r3"),
+    ], run)
+
+    outcomes = [await task for task in batch.tasks]
+
+    # The failure becomes that call's result; later calls still run, in order
+    results = [result for result, _ in outcomes]
+    assert results[1] == {"success": False, "error": "w1 failed"}
+    assert [r.get("label") for r in results] == ["r1", None, "r2", "r3"]
+    assert run.span("w1")[1] < run.span("r2")[0]
+    assert all(seconds > 0 for _, seconds in outcomes)
+
+
+# ---------------------------------------------------------------------------
+# Pipelined submission
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_pipelined_calls_start_before_the_turn_ends():
+    run = Recorder(delays={"first": 0.02})
+    batch = ToolScheduler().batch(run)
+
+    first = batch.submit(_call("file_read", file_path="a.py", label="first"))
+    await asyncio.sleep(0.005)  # the LLM is still streaming the next call
+    assert run.log == [("start", "first")]
+
+    second = batch.submit(_call("file_write", file_path="a.py", label="second"))
+    third = batch.submit(_call("file_read", file_path="b.py", label="third"))
+    await asyncio.gather(first, second, third)
+
+    assert run.span("first")[1] < run.span("second")[0]
+    assert run.span("third")[0] < run.span("first")[1]
+    assert [(await task)[0]["label"] for task in batch.tasks] == ["first", "second", "third"]
+
+
+@pytest.mark.asyncio
+async def test_per_call_runner_override():
+    run = Recorder()
+
+    async def streamed(tool_name, arguments):
+        return {"success": True, "label": "streamed"}
+
+    batch = ToolScheduler().batch(run)
+    batch.submit(_call("file_write", file_path="a.py", label="w"), run=streamed)
+    batch.submit(_call("file_read", file_path="a.py", label="r"))
+
+    assert [r["label"] for r in await _results(batch)] == ["streamed", "r"]
+    assert run.log == [("start", "r"), ("end", "r")]
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_pending_calls():
+    run = Recorder(delays={"slow": 1.0})
+    batch = ToolScheduler().launch([
+        _call("file_write", file_path="a.py", label="slow"),
+        _call("file_read", file_path="a.py", label="blocked"),
+    ], run)
+    await asyncio.sleep(0.01)
+
+    batch.cancel()
+
+    await asyncio.gather(*batch.tasks, return_exceptions=True)
+    assert all(task.cancelled() for task in batch.tasks)
+    assert ("start", "blocked") not in run.log
@@ -0,0 +1,160 @@
+import json
+
+import pytest
+
+from src.agent.tool_schemas import TOOL_SCHEMAS
+from src.agent.tool_validation import ToolArgumentValidator, ToolCallStats, parse_arguments
+
+
+def _call(name, arguments):
+    """Tool call in the parsed form the streaming parser produces."""
+    raw = arguments if isinstance(arguments, str) else json.dumps(arguments)
+    call = {"id": "call_1", "function": {"name": name, "arguments": raw}}
+    try:
+        call["parsed_arguments"] = json.loads(raw)
+    except json.JSONDecodeError as e:
+        call["parsed_arguments"] = {}
+        call["arguments_error"] = str(e)
+    return call
+
+
+@pytest.fixture
+def validator():
+    return ToolArgumentValidator(TOOL_SCHEMAS, ToolCallStats())
+
+
+# ---------------------------------------------------------------------------
+# Repair
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("raw, expected, repairs", [
+    ('{"content": "a\nb\tc"}', {"content": "a\nb\tc"}, ["control_characters"]),
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}, ["trailing_comma"]),
+    ('```json\n{"a": 1}\n```', {"a": 1}, ["code_fence"]),
+    ('{"file_path": "/home/user/a.py", "content": "print(1)', {"file_path": "/home/user/a.py", "content": "print(1)"},
+     ["unterminated_string", "missing_closers"]),
+    ('{"edits": [{"type": "delete_str"', {"edits": [{"type": "delete_str"}]}, ["missing_closers"]),
+    ('{"a": {"b": 1},', {"a": {"b": 1}}, ["trailing_comma", "missing_closers"]),
+    ('{"a":', {"a": None}, ["missing_closers"]),
+    ('{"content": "ends with backslash \\', {"content": "ends with backslash "},
+     ["unterminated_string", "missing_closers"]),
+])
+def test_repairs(raw, expected, repairs):
+    value, applied, error = parse_arguments(raw)
+    assert value == expected
+    assert applied == repairs
+    assert error is None
+
+
+def test_control_characters_with_other_damage():
+    value, repairs, _ = parse_arguments('{"content": "a\nb", "x": 1,')
+    assert value == {"content": "a\nb", "x": 1}
+    assert repairs == ["control_characters", "trailing_comma", "missing_closers"]
+
+
+def test_valid_and_empty_arguments_need_no_repair():
+    assert parse_arguments('{"a": "}"}') == ({"a": "}"}, [], None)
+    assert parse_arguments("") == ({}, [], None)
+
+
+def test_unrepairable_arguments_report_the_original_error():
+    value, _, error = parse_arguments('{"a" 1}')
+    assert value is None
+    assert error.startswith("Expecting ':' delimiter at line 1 column 6")
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+def test_valid_call_is_returned_unchanged(validator):
+    call = _call("file_read", {"file_path": "/home/user/a.py"})
+    checked = validator.check(call, "m")
+    assert "invalid" not in checked and "repairs" not in checked
+    assert checked["function"] == call["function"]
+    assert validator.stats.get_stats()["m"]["calls"] == 1
+
+
+def test_integer_strings_are_coerced(validator):
+    checked = validator.check(_call("insert_line", {"file_path": "/home/user/a.py", "insert_line": " 12 ", "new_str": "x"}))
+    assert "invalid" not in checked
+    assert checked["parsed_arguments"]["insert_line"] == 12
+    assert checked["repairs"] == ["coerced_types"]
+    assert json.loads(checked["function"]["arguments"])["insert_line"] == 12
+
+
+def test_nested_items_are_coerced_and_checked(validator):
+    checked = validator.check(_call("multi_edit", {"edits": [
+        {"file_path": "/home/user/a.py", "type": "insert_line", "insert_line": "3", "new_str": "x"},
+        {"file_path": "/home/user/a.py", "type": "rename"},
+    ]}))
+    assert checked["parsed_arguments"]["edits"][0]["insert_line"] == 3
+    assert "'edits[1].type' must be one of" in checked["invalid"]["error"]
+
+
+def test_booleans_are_not_integers(validator):
+    checked = validator.check(_call("insert_line", {"file_path": "/home/user/a.py", "insert_line": True, "new_str": "x"}))
+    assert "'insert_line' must be integer, got boolean" in checked["invalid"]["error"]
+
+
+def test_minimum(validator):
+    checked = validator.check(_call("file_read", {"file_path": "/home/user/a.py", "offset": 0}))
+    assert "'offset' must be >= 1, got 0" in checked["invalid"]["error"]
+
+
+@pytest.mark.parametrize("name, arguments, field", [
+    ("file_read", {"file_path": "  "}, "file_path"),
+    ("replace_in_file", {"file_path": "/home/user/a.py", "old_string": "", "new_string": "x"}, "old_string"),
+    ("delete_str", {"file_path": "/home/user/a.py", "target_str": ""}, "target_str"),
+    ("search_files", {"pattern": ""}, "pattern"),
+])
+def test_non_empty_fields(validator, name, arguments, field):
+    checked = validator.check(_call(name, arguments))
+    assert f"'{field}' must not be empty" in checked["invalid"]["error"]
+
+
+def test_empty_replacement_is_allowed(validator):
+    checked = validator.check(_call("replace_in_file", {"file_path": "/home/user/a.py", "old_string": "x", "new_string": ""}))
+    assert "invalid" not in checked
+
+
+def test_missing_required_and_unknown_tool(validator):
+    checked = validator.check(_call("file_write", {"file_path": "/home/user/a.py"}))
+    assert "missing required argument 'content'" in checked["invalid"]["error"]
+    assert checked["invalid"]["invalid_arguments"] is True
+
+    checked = validator.check(_call("rm_rf", {}))
+    assert checked["invalid"]["error"].startswith("Unknown tool 'rm_rf'. Available tools:")
+
+
+def test_repaired_call_is_rewritten(validator):
+    checked = validator.check(_call("file_write", '{"file_path": "/home/user/a.py", "content": "x\ny",}'))
+    assert "invalid" not in checked
+    assert checked["repairs"] == ["control_characters", "trailing_comma"]
+    assert json.loads(checked["function"]["arguments"]) == {"file_path": "/home/user/a.py", "content": "x\ny"}
+
+
+def test_invalid_json_is_never_written_to_history(validator):
+    checked = validator.check(_call("file_write", '{"file_path" "/home/user/a.py"'))
+    assert "not valid JSON" in checked["invalid"]["error"]
+    assert checked["function"]["arguments"] == "{}"
+
+
+def test_invalid_call_keeps_parseable_arguments(validator):
+    checked = validator.check(_call("file_read", {"file_path": "/home/user/a.py", "limit": 0}))
+    assert checked["invalid"]
+    assert json.loads(checked["function"]["arguments"]) == {"file_path": "/home/user/a.py", "limit": 0}
+
+
+def test_non_object_arguments(validator):
+    checked = validator.check(_call("file_read", "[1, 2]"))
+    assert "must be a JSON object, got array" in checked["invalid"]["error"]
+
+
+def test_stats(validator):
+    validator.check(_call("file_read", {"file_path": "/home/user/a.py"}), "m")
+    validator.check(_call("insert_line", {"file_path": "/home/user/a.py", "insert_line": "1", "new_str": "x"}), "m")
+    validator.check(_call("file_read", {}), "m")
+    stats = validator.stats.get_stats()["m"]
+    assert (stats["calls"], stats["repaired"], stats["invalid"]) == (3, 1, 1)
+    assert stats["repairs"] == {"coerced_types": 1}
@@ -243,6 +243,8 @@ export function ChatPanel() {
               }
               setCodeStreaming({ isStreaming: false });
               fetchFileTree();
+            } else if (event.tool_name === "file_append" || event.tool_name === "multi_edit") {
+              fetchFileTree();
             }
             break;
           
@@ -589,6 +591,18 @@ export function ChatPanel() {
             setCodeStreaming({ isStreaming: false, isDiffView: false, isInsertView: false, isDeleteView: false, isDeleteStrView: false });
             break;
             
+          case "loop_detected":
+            if (event.action === "stop") {
+              addChatEntry({
+                id: crypto.randomUUID(),
+                type: "assistant",
+                content: `The agent was stopped because it kept repeating itself: ${event.detail}`,
+                timestamp: new Date(),
+              });
+              setCodeStreaming({ isStreaming: false, isDiffView: false, isInsertView: false, isDeleteView: false, isDeleteStrView: false });
+            }
+            break;
+            
           case "error":
             addChatEntry({
               id: crypto.randomUUID(),
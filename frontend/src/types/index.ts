@@ -52,6 +52,10 @@ export interface ReadFileResult {
   file_size?: number;
   total_lines?: number;
   lines_read?: number;
+  start_line?: number;
+  end_line?: number;
+  binary?: boolean;
+  mime_type?: string;
   truncated?: boolean;
   message?: string;
   error?: string;
@@ -126,7 +130,15 @@ export interface AgentEvent {
     | "delete_lines_start"
     | "delete_lines_end"
     | "delete_str_from_file_start"
-    | "delete_str_from_file_end";
+    | "delete_str_from_file_end"
+    | "provider_retry"
+    | "provider_failover"
+    | "rate_limit_wait"
+    | "iteration_metrics"
+    | "stopped"
+    | "generation_truncated"
+    | "loop_detected"
+    | "context_compacted";
   content?: string;
   error?: string;
   iteration?: number;
@@ -145,6 +157,8 @@ export interface AgentEvent {
   new_str?: string;  // For insert_line tool
   target_line?: number | string;  // For delete_lines_from_file tool
   target_str?: string;  // For delete_str_from_file tool
+  action?: "feedback" | "backoff" | "stop";  // For loop_detected
+  detail?: string;  // For loop_detected
 }
 
 export interface Model {